@@ -0,0 +1,317 @@
+import argparse
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from features import UnitEncoder
+from model_artifact import ARTIFACT_DIR, is_forest, load_artifact
+
+# Column name constants
+UN_COL = 'UN'
+VN_COL = 'VN'
+EBITDA_COL = 'EBITDA'
+ANO_COL = 'ANO'
+TURNOVER = 'Turnover'
+HEADCOUNT = 'HEADCOUNT'
+CRESCIMENTO_VN = 'Crescimento_VN'
+CRESCIMENTO_HEADCOUNT = 'Crescimento_Headcount'
+MARGEN_EBITDA = 'Margem_EBITDA'
+
+# Scenario inputs used to derive the growth features
+VN_ANTERIOR = 'VN_ANTERIOR'
+HEADCOUNT_ANTERIOR = 'HEADCOUNT_ANTERIOR'
+
+# Output columns
+PREDICTED_HEADCOUNT = 'predicted_headcount'
+ADDITIONAL_NEEDED = 'additional_needed'
+
+# Legacy pickle with (model, scaler, features); train_model.py now writes ARTIFACT_DIR
+MODEL_FILENAME = 'random_forest_model.pkl'
+HISTORY_FILE = 'previsao_necessidades_contratacao_atualizado.csv'
+
+
+def add_derived_features(scenarios):
+    """
+    Computes the derived features for all rows at once.
+
+    - Crescimento_VN: from VN and VN_ANTERIOR (previous year's VN), in %.
+    - Margem_EBITDA: EBITDA / VN, in %.
+    - Crescimento_Headcount: from HEADCOUNT and HEADCOUNT_ANTERIOR, or 0 if unknown. Only models
+      saved before it was dropped from the training features use it.
+
+    Columns already present in the input are kept as they are.
+    """
+    scenarios = scenarios.copy()
+    vn = scenarios[VN_COL].to_numpy(dtype=np.float64)
+    if CRESCIMENTO_VN not in scenarios.columns:
+        if VN_ANTERIOR not in scenarios.columns:
+            raise ValueError(f"Scenarios need either '{CRESCIMENTO_VN}' or '{VN_ANTERIOR}'.")
+        scenarios[CRESCIMENTO_VN] = (vn / scenarios[VN_ANTERIOR].to_numpy(dtype=np.float64) - 1) * 100
+    if MARGEN_EBITDA not in scenarios.columns:
+        scenarios[MARGEN_EBITDA] = scenarios[EBITDA_COL].to_numpy(dtype=np.float64) / vn * 100
+    if CRESCIMENTO_HEADCOUNT not in scenarios.columns:
+        if HEADCOUNT in scenarios.columns and HEADCOUNT_ANTERIOR in scenarios.columns:
+            previous = scenarios[HEADCOUNT_ANTERIOR].to_numpy(dtype=np.float64)
+            scenarios[CRESCIMENTO_HEADCOUNT] = (scenarios[HEADCOUNT].to_numpy(dtype=np.float64) / previous - 1) * 100
+        else:
+            scenarios[CRESCIMENTO_HEADCOUNT] = 0.0
+    return scenarios
+
+
+class HeadcountPredictor:
+    """
+    Loads the trained model once and scores batches of scenarios.
+
+    `unit_classes` are the business unit names in the order of their codes at
+    training time, so scenarios can use either the unit name or its numeric
+    code in the 'UN' column. For units the model has not seen, `unknown_units`
+    decides: 'average' predicts the mean over all known units, 'error' raises.
+    """
+
+    def __init__(self, model, scaler, features, unit_classes=None, n_jobs=-1, unknown_units='average'):
+        if unknown_units not in ('average', 'error'):
+            raise ValueError(f"Unknown option for unknown_units: {unknown_units}. Options: average, error")
+        self.model = model
+        self.scaler = scaler
+        self.features = features
+        self.unit_classes = list(unit_classes) if unit_classes is not None else None
+        self.unknown_units = unknown_units
+        # Spread the work across all cores for large batches: the trees of a scikit-learn
+        # forest, or the row batches of a forest artifact (ForestArrays)
+        if n_jobs is not None and hasattr(self.model, 'n_jobs'):
+            self.model.n_jobs = n_jobs
+
+    @classmethod
+    def load(cls, model_path=None, history_file=HISTORY_FILE, **kwargs):
+        """
+        Loads a model artifact folder (see model_artifact.py) or a legacy pickle.
+
+        Without `model_path`, uses ARTIFACT_DIR if it exists and MODEL_FILENAME otherwise.
+        """
+        if model_path is None:
+            model_path = ARTIFACT_DIR if os.path.isdir(ARTIFACT_DIR) else MODEL_FILENAME
+        unit_classes = None
+        if os.path.isdir(model_path):
+            model, scaler, metadata = load_artifact(model_path)
+            features, unit_classes = metadata['features'], metadata['unit_classes']
+        else:
+            import joblib
+            model, scaler, features = joblib.load(model_path)
+        if unit_classes is None and history_file and os.path.exists(history_file):
+            unit_classes = sorted(pd.read_csv(history_file, usecols=[UN_COL])[UN_COL].astype(str).unique())
+        return cls(model, scaler, features, unit_classes=unit_classes, **kwargs)
+
+    @property
+    def n_units(self):
+        """Number of business units the model was trained with."""
+        if self.unit_classes is not None:
+            return len(self.unit_classes)
+        # Without the names, the highest code seen by the scaler (fitted on the codes 0..n-1)
+        un = self.features.index(UN_COL)
+        if hasattr(self.scaler, 'data_max_'):
+            return int(round(self.scaler.data_max_[un])) + 1
+        return int(round((1 - self.scaler.min_[un]) / self.scaler.scale_[un])) + 1
+
+    def encode_units(self, units):
+        """
+        Numeric codes for the 'UN' column; units the model has not seen get -1.
+
+        Numbers (of any numeric type) are codes and anything else is a unit name,
+        so a column can mix both.
+        """
+        units = pd.Series(units).reset_index(drop=True)
+        kind = 'floating' if pd.api.types.is_numeric_dtype(units) else pd.api.types.infer_dtype(units, skipna=False)
+        if kind in ('integer', 'integer-na', 'floating', 'mixed-integer-float', 'decimal'):
+            is_code = np.ones(len(units), dtype=bool)
+        elif kind in ('mixed', 'mixed-integer'):
+            # Only a column that mixes names and numbers needs the type of every value
+            is_code = units.map(lambda unit: isinstance(unit, (int, float, np.number)) and not isinstance(unit, bool))
+            is_code = is_code.to_numpy(dtype=bool)
+        else:
+            is_code = np.zeros(len(units), dtype=bool)
+
+        codes = np.full(len(units), -1.0)
+        if is_code.any():
+            numbers = units[is_code].to_numpy(dtype=np.float64)
+            valid = (numbers >= 0) & (numbers < self.n_units) & (numbers == np.floor(numbers))
+            codes[is_code] = np.where(valid, numbers, -1)
+        if not is_code.all():
+            if self.unit_classes is None:
+                raise ValueError(f"Unit names need the historical data ({HISTORY_FILE}) to be encoded.")
+            codes[~is_code] = UnitEncoder(self.unit_classes).transform(units[~is_code])
+
+        if (codes < 0).any():
+            unknown = sorted(set(units[codes < 0].astype(str)))
+            if self.unknown_units == 'error':
+                raise ValueError(f"Unknown business units: {unknown}")
+            warnings.warn(f"Unknown business units {unknown}: predicting the average over the known units.")
+        return codes
+
+    def feature_matrix(self, scenarios):
+        """Model inputs (before scaling) for the scenarios, one column per feature; unknown units are -1."""
+        scenarios = add_derived_features(scenarios)
+        missing_cols = [col for col in self.features if col not in scenarios.columns]
+        if missing_cols:
+            raise ValueError(f"Missing columns in scenarios: {missing_cols}")
+
+        X = np.empty((len(scenarios), len(self.features)), dtype=np.float64)
+        for i, col in enumerate(self.features):
+            X[:, i] = self.encode_units(scenarios[col]) if col == UN_COL else scenarios[col].to_numpy(dtype=np.float64)
+        return X
+
+    def _scale(self, X):
+        # Both were fitted on DataFrames, so keep the feature names to match
+        return pd.DataFrame(self.scaler.transform(pd.DataFrame(X, columns=self.features)), columns=self.features)
+
+    def _predict_matrix(self, X):
+        return self.model.predict(self._scale(X))
+
+    def predict(self, scenarios):
+        """Returns the predicted headcount for every row of the scenarios DataFrame."""
+        X = self.feature_matrix(scenarios)
+        if UN_COL not in self.features:
+            return self._predict_matrix(X)
+
+        un = self.features.index(UN_COL)
+        unknown = X[:, un] < 0
+        predictions = np.empty(len(X), dtype=np.float64)
+        if (~unknown).any():
+            predictions[~unknown] = self._predict_matrix(X[~unknown])
+        if unknown.any():
+            # Score each unknown-unit row once per known unit and average
+            n_units = self.n_units
+            expanded = np.repeat(X[unknown], n_units, axis=0)
+            expanded[:, un] = np.tile(np.arange(n_units), int(unknown.sum()))
+            predictions[unknown] = self._predict_matrix(expanded).reshape(-1, n_units).mean(axis=1)
+        return predictions
+
+    @property
+    def has_trees(self):
+        """True if the model gives per-tree predictions (see `predict_trees`)."""
+        return hasattr(self.model, 'predict_trees') or is_forest(self.model)
+
+    def predict_trees(self, scenarios):
+        """
+        Returns the prediction of every tree of the forest, shape (rows, trees).
+
+        Their spread gives prediction intervals; the mean is `predict`. Needs a
+        forest model and known business units.
+        """
+        if not self.has_trees:
+            raise ValueError(f"Per-tree predictions need a forest model, not {type(self.model).__name__}.")
+        X = self.feature_matrix(scenarios)
+        if UN_COL in self.features and (X[:, self.features.index(UN_COL)] < 0).any():
+            raise ValueError("Per-tree predictions need business units known to the model.")
+        X = self._scale(X)
+        if hasattr(self.model, 'predict_trees'):
+            return self.model.predict_trees(X)
+        X = X.to_numpy(dtype=np.float32)
+        return np.column_stack([estimator.predict(X) for estimator in self.model.estimators_])
+
+    def score(self, scenarios):
+        """Adds the predicted headcount and, if HEADCOUNT is given, the number of hires needed."""
+        result = scenarios.copy()
+        result[PREDICTED_HEADCOUNT] = self.predict(scenarios)
+        if HEADCOUNT in result.columns:
+            gap = np.ceil(result[PREDICTED_HEADCOUNT].to_numpy() - result[HEADCOUNT].to_numpy(dtype=np.float64))
+            result[ADDITIONAL_NEEDED] = np.maximum(gap, 0).astype(np.int64)
+        return result
+
+
+def read_batches(source, batch_size, file_format=None):
+    """Reads a CSV or Parquet file (path or file object) in batches of rows."""
+    if file_format is None:
+        file_format = 'parquet' if str(source).endswith('.parquet') else 'csv'
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=batch_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=batch_size)
+
+
+class ResultWriter:
+    """Writes scored batches to CSV or Parquet as they are produced."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet_writer = None
+        self.rows = 0
+
+    def write(self, batch):
+        if self.path.endswith('.parquet'):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(batch, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.path, table.schema, compression='zstd')
+            self.parquet_writer.write_table(table)
+        else:
+            batch.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        self.rows += len(batch)
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+
+
+def predict_file(predictor, input_path, output_path, batch_size=100000):
+    """Scores a scenarios file batch by batch and streams the results to `output_path`."""
+    writer = ResultWriter(output_path)
+    try:
+        for batch in read_batches(input_path, batch_size):
+            writer.write(predictor.score(batch))
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def save_charts(scored, history_file, chart_dir, max_charts=20):
+    """Saves one chart per scenario (at most `max_charts`) without opening a window."""
+    import predict_model_chart
+
+    os.makedirs(chart_dir, exist_ok=True)
+    historical_data = pd.read_csv(history_file)
+    for i, row in enumerate(scored.head(max_charts).itertuples(index=False)):
+        row = row._asdict()
+        predict_model_chart.plot_historical_and_predicted_headcount(
+            historical_data=historical_data,
+            predicted_year=row[ANO_COL],
+            predicted_headcount=row[PREDICTED_HEADCOUNT],
+            current_headcount=row.get(HEADCOUNT, 0),
+            output_path=os.path.join(chart_dir, f"scenario_{i}.png"),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predicts the headcount for a CSV or Parquet file of scenarios.")
+    parser.add_argument("input", help="Scenarios file (.csv or .parquet)")
+    parser.add_argument("--output", default="predictions.csv", help="Output file (.csv or .parquet)")
+    parser.add_argument("--model", help=f"Model artifact folder or legacy .pkl (default: {ARTIFACT_DIR})")
+    parser.add_argument("--history", default=HISTORY_FILE, help="Historical data (unit names and charts)")
+    parser.add_argument("--batch-size", type=int, default=100000, help="Rows scored at a time")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Cores used by the forest (-1 = all)")
+    parser.add_argument("--unknown-units", choices=["average", "error"], default="average",
+                        help="Units the model has not seen: average over the known units, or fail")
+    parser.add_argument("--chart-dir", help="Save a chart for the first scenarios in this folder")
+    parser.add_argument("--max-charts", type=int, default=20)
+    args = parser.parse_args()
+
+    predictor = HeadcountPredictor.load(args.model, args.history, n_jobs=args.n_jobs,
+                                        unknown_units=args.unknown_units)
+    start = time.perf_counter()
+    rows = predict_file(predictor, args.input, args.output, args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} scenarios in {elapsed:.2f}s ({rows / elapsed:.0f} rows/s). Results saved to: {args.output}")
+
+    if args.chart_dir:
+        first_batch = next(read_batches(args.output, args.max_charts))
+        save_charts(first_batch, args.history, args.chart_dir, args.max_charts)
+        print(f"Charts saved to: {args.chart_dir}")
+
+
+if __name__ == "__main__":
+    main()
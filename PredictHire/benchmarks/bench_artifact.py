@@ -0,0 +1,109 @@
+"""
+Startup time and memory: model artifact folder vs. the legacy joblib pickle.
+
+Trains a forest on synthetic data (so it has a realistic size), saves it both
+ways in a temporary folder and, for each format, starts fresh Python processes
+that load the model and score a single scenario, like a short scoring job:
+
+    python benchmarks/bench_artifact.py
+    python benchmarks/bench_artifact.py --trees 500 --rows 50000 --runs 7
+
+Reports the file size, the median wall time of the whole process, the time
+spent importing and loading, the peak resident memory and the private
+(anonymous) memory at the end. Memory figures read /proc, so Linux only.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from model_artifact import save_artifact  # noqa: E402
+from train_model import CRESCIMENTO_VN, FEATURES, TURNOVER, VN_COL  # noqa: E402
+
+# Runs in a fresh interpreter: load the model and score one row
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import pandas as pd
+from batch_predict import HeadcountPredictor
+predictor = HeadcountPredictor.load(sys.argv[1], None, n_jobs=None)
+loaded = time.perf_counter()
+row = pd.DataFrame({f: [0.5] for f in predictor.features})
+predictor.predict(row)
+done = time.perf_counter()
+# VmHWM is per process image (ru_maxrss would include the parent's peak); RssAnon leaves out
+# file-backed pages, such as the memory-mapped node arrays, which the OS shares and can drop
+status = dict(line.split(":", 1) for line in open("/proc/self/status"))
+print(json.dumps({"load": loaded - start, "predict": done - loaded,
+                  "peak_rss_mb": int(status["VmHWM"].split()[0]) / 1024,
+                  "private_mb": int(status["RssAnon"].split()[0]) / 1024}))
+"""
+
+def train(rows, trees, seed=42):
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.preprocessing import MinMaxScaler
+
+    rng = np.random.default_rng(seed)
+    X = rng.uniform(size=(rows, len(FEATURES)))
+    vn, growth, turnover = (FEATURES.index(col) for col in (VN_COL, CRESCIMENTO_VN, TURNOVER))
+    y = 50 * X[:, vn] + 20 * X[:, growth] - 10 * X[:, turnover] + rng.normal(0, 2, rows)
+    scaler = MinMaxScaler().fit(X)
+    model = RandomForestRegressor(n_estimators=trees, random_state=seed, n_jobs=-1).fit(scaler.transform(X), y)
+    return model, scaler
+
+
+def folder_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def run_child(model_path):
+    import time
+
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD, model_path], cwd=ROOT, capture_output=True, text=True,
+                         check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["wall"] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="Training rows")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=5, help="Processes started per format")
+    args = parser.parse_args()
+
+    import joblib
+
+    model, scaler = train(args.rows, args.trees)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {
+            "pickle": os.path.join(tmp, "random_forest_model.pkl"),
+            "artifact": os.path.join(tmp, "model_artifact"),
+        }
+        joblib.dump((model, scaler, FEATURES), paths["pickle"])
+        save_artifact(model, scaler, FEATURES, ["Digital"], paths["artifact"])
+
+        print(f"{args.trees} trees, {sum(e.tree_.node_count for e in model.estimators_):,} nodes\n")
+        print(f"{'format':>9} {'size MB':>8} {'process s':>10} {'load s':>8} {'predict ms':>11} "
+              f"{'peak RSS MB':>12} {'private MB':>11}")
+        for name, path in paths.items():
+            results = [run_child(path) for _ in range(args.runs)]
+            median = {key: statistics.median(r[key] for r in results) for key in results[0]}
+            print(f"{name:>9} {folder_size(path) / 1e6:8.1f} {median['wall']:10.2f} {median['load']:8.2f} "
+                  f"{median['predict'] * 1000:11.1f} {median['peak_rss_mb']:12.0f} {median['private_mb']:11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark of the batch prediction path on synthetic scenarios.
+
+Generates N scenario rows (1M by default) around the historical data, writes
+them to Parquet and scores them with batch_predict.predict_file. A small sample
+is also scored one row at a time, the way predict_model.py used to do it, to
+compare throughput:
+
+    python benchmarks/bench_batch_predict.py
+    python benchmarks/bench_batch_predict.py --rows 200000 --batch-size 50000 --output-format csv
+
+Run it from the PredictHire folder after `python train_model.py`.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from batch_predict import (  # noqa: E402
+    ANO_COL, EBITDA_COL, HEADCOUNT, HISTORY_FILE, TURNOVER, UN_COL, VN_ANTERIOR, VN_COL,
+    HeadcountPredictor, add_derived_features, predict_file,
+)
+
+
+def make_scenarios(history, rows, seed=42):
+    """Draws scenarios by perturbing random historical rows."""
+    rng = np.random.default_rng(seed)
+    base = history.iloc[rng.integers(0, len(history), rows)].reset_index(drop=True)
+    vn_anterior = base[VN_COL].to_numpy(dtype=np.float64)
+    growth = rng.normal(0.1, 0.15, rows)
+    vn = vn_anterior * (1 + growth)
+    return pd.DataFrame({
+        ANO_COL: base[ANO_COL].to_numpy() + 1,
+        UN_COL: base[UN_COL].astype(str).to_numpy(),
+        VN_COL: vn,
+        VN_ANTERIOR: vn_anterior,
+        EBITDA_COL: vn * rng.uniform(0.05, 0.25, rows),
+        TURNOVER: rng.uniform(0.0, 0.3, rows),
+        HEADCOUNT: base[HEADCOUNT].to_numpy(),
+    })
+
+
+def row_by_row(predictor, scenarios):
+    """Scores one scenario at a time, like the old predict_model.py (single-threaded forest)."""
+    n_jobs = getattr(predictor.model, 'n_jobs', None)
+    if n_jobs is not None:
+        predictor.model.n_jobs = None
+    for i in range(len(scenarios)):
+        row = add_derived_features(scenarios.iloc[[i]])
+        X = pd.DataFrame({col: predictor.encode_units(row[col]) if col == UN_COL else row[col].to_numpy()
+                          for col in predictor.features})
+        X = pd.DataFrame(predictor.scaler.transform(X), columns=predictor.features)
+        predictor.model.predict(X)
+    if n_jobs is not None:
+        predictor.model.n_jobs = n_jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=100000)
+    parser.add_argument("--row-sample", type=int, default=200, help="Rows scored one at a time for comparison")
+    parser.add_argument("--output-format", choices=["parquet", "csv"], default="parquet")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--model", help="Model artifact folder or legacy .pkl")
+    parser.add_argument("--history", default=HISTORY_FILE)
+    args = parser.parse_args()
+
+    predictor = HeadcountPredictor.load(args.model, args.history, n_jobs=args.n_jobs)
+    history = pd.read_csv(args.history)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "scenarios.parquet")
+        output_path = os.path.join(tmp, f"predictions.{args.output_format}")
+        make_scenarios(history, args.rows).to_parquet(input_path, index=False)
+        print(f"{args.rows} scenarios generated ({os.path.getsize(input_path) / 1e6:.1f} MB Parquet)")
+
+        sample = make_scenarios(history, args.row_sample, seed=7)
+        start = time.perf_counter()
+        row_by_row(predictor, sample)
+        row_rate = args.row_sample / (time.perf_counter() - start)
+        print(f"Row by row: {row_rate:,.0f} rows/s ({args.row_sample} rows)")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        rows = predict_file(predictor, input_path, output_path, args.batch_size)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"Batch:      {rows / elapsed:,.0f} rows/s ({rows} rows in {elapsed:.1f}s, "
+              f"batch size {args.batch_size}, peak Python memory {peak / 1e6:.0f} MB)")
+        print(f"Speed-up:   {rows / elapsed / row_rate:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
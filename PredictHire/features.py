@@ -0,0 +1,165 @@
+"""
+Feature pipeline: derives the growth and margin features from the raw data.
+
+Per business unit (UN), in time order:
+- Crescimento_VN: VN growth vs. the previous period of the same UN, in % (0 for the first).
+- Crescimento_Headcount: same for HEADCOUNT.
+- Margem_EBITDA: EBITDA / VN, in %.
+
+FeatureStore caches the computed features next to a fingerprint of the raw file,
+so when new rows are appended only those rows are read and derived.
+"""
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+UN_COL = 'UN'
+VN_COL = 'VN'
+EBITDA_COL = 'EBITDA'
+ANO_COL = 'ANO'
+MES_COL = 'MES'
+HEADCOUNT = 'HEADCOUNT'
+CRESCIMENTO_VN = 'Crescimento_VN'
+CRESCIMENTO_HEADCOUNT = 'Crescimento_Headcount'
+MARGEN_EBITDA = 'Margem_EBITDA'
+
+RAW_COLS = [UN_COL, ANO_COL, VN_COL, EBITDA_COL, HEADCOUNT]
+DERIVED_COLS = [CRESCIMENTO_VN, CRESCIMENTO_HEADCOUNT, MARGEN_EBITDA]
+
+FEATURE_CACHE_DIR = '.feature_cache'
+FEATURES_FILE = 'features.parquet'
+STATE_FILE = 'state.json'
+
+
+def period_cols(data):
+    """Columns that order the rows in time: ANO, and MES for monthly data."""
+    return [col for col in (ANO_COL, MES_COL) if col in data.columns]
+
+
+def period_key(data):
+    """One sortable number per row: ANO, or ANO * 100 + MES for monthly data."""
+    key = data[ANO_COL].to_numpy(dtype=np.float64)
+    return key * 100 + data[MES_COL].to_numpy(dtype=np.float64) if MES_COL in data.columns else key
+
+
+def derive_features(raw):
+    """Adds the derived columns to `raw` (same rows, same order), replacing any precomputed values."""
+    missing_cols = [col for col in RAW_COLS if col not in raw.columns]
+    if missing_cols:
+        raise ValueError(f"The following columns are missing from the dataset: {missing_cols}")
+
+    data = raw.reset_index(drop=True)
+    ordered = data.sort_values([UN_COL] + period_cols(data), kind='stable')
+    by_unit = ordered.groupby(UN_COL, sort=False)
+    data = data.drop(columns=[col for col in DERIVED_COLS if col in data.columns])
+    data[CRESCIMENTO_VN] = (by_unit[VN_COL].pct_change() * 100).fillna(0.0)
+    data[CRESCIMENTO_HEADCOUNT] = (by_unit[HEADCOUNT].pct_change() * 100).fillna(0.0)
+    data[MARGEN_EBITDA] = data[EBITDA_COL].to_numpy(dtype=np.float64) / data[VN_COL].to_numpy(dtype=np.float64) * 100
+    return data
+
+
+class UnitEncoder:
+    """
+    Business unit name <-> numeric code.
+
+    Codes never change once assigned: units seen for the first time are added
+    after the known ones (sorted), so a model trained earlier keeps its meaning.
+    Starting from no classes this matches sklearn's LabelEncoder.
+    """
+
+    def __init__(self, classes=()):
+        self.classes = [str(unit) for unit in classes]
+
+    def fit(self, units):
+        known = set(self.classes)
+        self.classes += sorted({str(unit) for unit in units} - known)
+        return self
+
+    def transform(self, units):
+        """Codes for `units`; unknown units get -1."""
+        return pd.Categorical(pd.Series(units).astype(str), categories=self.classes).codes.astype(np.int64)
+
+    def fit_transform(self, units):
+        return self.fit(units).transform(units)
+
+
+class FeatureStore:
+    """
+    Cache of the derived features of a raw CSV that only grows by appended rows.
+
+    The state stores how many bytes of the raw file were processed and their
+    hash. If the file still starts with those bytes, only the rest is parsed
+    and derived, using the last cached period of each UN as the previous one.
+    Any other change (edited rows, rows out of time order) recomputes everything.
+    """
+
+    def __init__(self, raw_path, cache_dir=FEATURE_CACHE_DIR):
+        self.raw_path = raw_path
+        self.cache_dir = cache_dir
+
+    def _state_path(self):
+        return os.path.join(self.cache_dir, STATE_FILE)
+
+    def _features_path(self):
+        return os.path.join(self.cache_dir, FEATURES_FILE)
+
+    def _read_state(self):
+        if not os.path.exists(self._state_path()) or not os.path.exists(self._features_path()):
+            return None
+        with open(self._state_path(), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        return state if state.get('raw_path') == os.path.abspath(self.raw_path) else None
+
+    def _save(self, features, content):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        features.to_parquet(self._features_path(), index=False)
+        state = {
+            'raw_path': os.path.abspath(self.raw_path),
+            'bytes': len(content),
+            'sha256': hashlib.sha256(content).hexdigest(),
+            'rows': len(features),
+            # Header of the raw file, to parse the appended rows
+            'columns': list(pd.read_csv(io.BytesIO(content), nrows=0).columns),
+        }
+        with open(self._state_path(), 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+
+    def _recompute(self, content):
+        features = derive_features(pd.read_csv(io.BytesIO(content)))
+        self._save(features, content)
+        return features, len(features)
+
+    def update(self):
+        """Returns (features of all rows, number of rows derived in this call)."""
+        with open(self.raw_path, 'rb') as f:
+            content = f.read()
+
+        state = self._read_state()
+        if state is None or len(content) < state['bytes'] \
+                or hashlib.sha256(content[:state['bytes']]).hexdigest() != state['sha256']:
+            return self._recompute(content)
+
+        cached = pd.read_parquet(self._features_path())
+        tail = content[state['bytes']:]
+        if not tail.strip():
+            return cached, 0
+
+        new_rows = pd.read_csv(io.BytesIO(tail), header=None, names=state['columns'])
+        periods = period_cols(new_rows)
+        last = cached.sort_values([UN_COL] + periods, kind='stable').groupby(UN_COL).tail(1)
+
+        # Rows not after the cached last period of their UN change earlier growth values
+        last_key = pd.Series(period_key(last), index=last[UN_COL].to_numpy())
+        previous = new_rows[UN_COL].map(last_key).to_numpy(dtype=np.float64)
+        if (period_key(new_rows) <= previous).any():
+            return self._recompute(content)
+
+        derived = derive_features(pd.concat([last[new_rows.columns], new_rows], ignore_index=True))
+        features = pd.concat([cached, derived.iloc[len(last):]], ignore_index=True)
+        self._save(features, content)
+        return features, len(new_rows)
+
@@ -0,0 +1,335 @@
+"""
+Versioned model artifact for the headcount model.
+
+An artifact is a folder with:
+
+- metadata.json: format version, feature list, business unit classes (LabelEncoder
+  order), the MinMaxScaler parameters and the name of the forest folder.
+- forest.<version>/*.npy: the random forest exported as flat node arrays, one set
+  for all trees, loaded with numpy memory-mapping so startup does not depend on
+  the size of the forest and the pages are shared between processes.
+- model.joblib: instead of the forest folder, for models that are not tree
+  ensembles (e.g. HistGradientBoosting, Ridge), loaded with joblib's mmap_mode.
+
+Every save writes a new forest folder and then replaces metadata.json in one
+step (os.replace), so a reader sees either the old model or the new one, never
+a mix. The previous forest folder is kept for readers that are still loading it.
+
+Loading a forest only needs numpy; scikit-learn and joblib are imported only to
+export a fitted model, to load a model.joblib or to read a legacy pickle.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ARTIFACT_VERSION = 2
+# Version 1 kept the forest in a fixed 'forest' folder
+SUPPORTED_VERSIONS = (1, ARTIFACT_VERSION)
+ARTIFACT_DIR = 'model_artifact'
+METADATA_FILE = 'metadata.json'
+FOREST_DIR = 'forest'
+MODEL_FILE = 'model.joblib'
+NODE_ARRAYS = ['roots', 'children_left', 'children_right', 'feature', 'threshold', 'value']
+
+# Rows traversed at a time; bounds the (rows x trees) node index matrix
+TRAVERSAL_BATCH = 2048
+# Traversal steps between two passes that drop the (row, tree) pairs already at a leaf
+COMPACT_EVERY = 3
+
+
+class MinMaxTransform:
+    """MinMaxScaler.transform from the stored parameters (X * scale_ + min_)."""
+
+    def __init__(self, min_, scale_):
+        self.min_ = np.asarray(min_, dtype=np.float64)
+        self.scale_ = np.asarray(scale_, dtype=np.float64)
+
+    def transform(self, X):
+        return np.asarray(X, dtype=np.float64) * self.scale_ + self.min_
+
+
+def _effective_n_jobs(n_jobs):
+    """Number of workers for `n_jobs`, counted like joblib (None = 1, -1 = all cores, -2 = all but one)."""
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+class ForestArrays:
+    """
+    Random forest regressor stored as flat node arrays.
+
+    Node ids are global across trees: `roots[t]` is the root of tree t and the
+    children of a leaf are the leaf itself, so a row can take extra steps
+    without checking where it stopped; every COMPACT_EVERY steps the pairs that
+    reached a leaf are dropped. Splits follow scikit-learn: the
+    features are compared as float32 and `x <= threshold` goes left.
+
+    `n_jobs` threads traverse separate batches of rows (-1 = all cores); numpy
+    releases the GIL in the gathers and comparisons that do the work.
+    """
+
+    def __init__(self, roots, children_left, children_right, feature, threshold, value, max_depth, n_jobs=1):
+        self.roots = roots
+        self.children_left = children_left
+        self.children_right = children_right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.max_depth = max_depth
+        self.n_jobs = n_jobs
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Returns the leaf reached in every tree, shape (rows, trees)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        rows, n_features = X.shape
+        # One entry per (row, tree), row-major, and the offset of its row in the flattened X
+        leaves = np.tile(np.asarray(self.roots), rows)
+        row_offsets = np.repeat(np.arange(rows, dtype=np.int64) * n_features, self.n_trees)
+        flat_X = X.ravel()
+        # Entries still going down their tree: position in `leaves`, current node and row offset
+        active, nodes, offsets = np.arange(len(leaves)), leaves.copy(), row_offsets
+        for step in range(1, self.max_depth + 1):
+            go_left = flat_X[offsets + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+            if step % COMPACT_EVERY == 0 or step == self.max_depth:
+                leaves[active] = nodes
+                moving = self.children_left[nodes] != nodes
+                if not moving.any():
+                    break
+                active, nodes, offsets = active[moving], nodes[moving], offsets[moving]
+        return leaves.reshape(rows, self.n_trees)
+
+    def predict_trees(self, X):
+        """Returns the prediction of every tree, shape (rows, trees)."""
+        X = np.asarray(X)
+        out = np.empty((len(X), self.n_trees), dtype=np.float64)
+
+        def traverse(start):
+            out[start:start + TRAVERSAL_BATCH] = self.value[self.apply(X[start:start + TRAVERSAL_BATCH])]
+
+        starts = range(0, len(X), TRAVERSAL_BATCH)
+        workers = min(len(starts), _effective_n_jobs(self.n_jobs))
+        if workers <= 1:
+            for start in starts:
+                traverse(start)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # list() re-raises the first error of any batch
+                list(pool.map(traverse, starts))
+        return out
+
+    def predict(self, X):
+        """Same result as RandomForestRegressor.predict (mean of the trees)."""
+        return self.predict_trees(X).mean(axis=1)
+
+
+def export_forest(model):
+    """Flattens the trees of a fitted RandomForestRegressor into node arrays."""
+    arrays = {name: [] for name in NODE_ARRAYS}
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        leaves = tree.children_left == -1
+        node_ids = np.arange(tree.node_count) + offset
+        arrays['roots'].append(offset)
+        arrays['children_left'].append(np.where(leaves, node_ids, tree.children_left + offset))
+        arrays['children_right'].append(np.where(leaves, node_ids, tree.children_right + offset))
+        arrays['feature'].append(np.where(leaves, 0, tree.feature))
+        arrays['threshold'].append(tree.threshold)
+        arrays['value'].append(tree.value[:, 0, 0])
+        offset += tree.node_count
+    return {
+        'roots': np.asarray(arrays['roots'], dtype=np.int64),
+        'children_left': np.concatenate(arrays['children_left']).astype(np.int64),
+        'children_right': np.concatenate(arrays['children_right']).astype(np.int64),
+        'feature': np.concatenate(arrays['feature']).astype(np.int32),
+        'threshold': np.concatenate(arrays['threshold']).astype(np.float64),
+        'value': np.concatenate(arrays['value']).astype(np.float64),
+    }
+
+
+def is_forest(model):
+    """True for random forests and extra trees, whose prediction is the mean of their trees."""
+    estimators = getattr(model, 'estimators_', None)
+    return isinstance(estimators, list) and all(hasattr(estimator, 'tree_') for estimator in estimators)
+
+
+def _write_forest(forest, path):
+    """Writes the node arrays to a new forest folder inside `path`; returns the folder name."""
+    name = f"{FOREST_DIR}.{time.time_ns()}"
+    os.makedirs(os.path.join(path, name))
+    for array_name, array in forest.items():
+        np.save(os.path.join(path, name, f"{array_name}.npy"), array)
+    return name
+
+
+def _remove_stale(path, keep):
+    """Removes the forest folders and model file not named in `keep`."""
+    for entry in os.listdir(path):
+        if entry in keep:
+            continue
+        if entry == FOREST_DIR or entry.startswith(f"{FOREST_DIR}."):
+            shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+        elif entry == MODEL_FILE:
+            os.remove(os.path.join(path, entry))
+
+
+def save_artifact(model, scaler, features, unit_classes, path=ARTIFACT_DIR, metrics=None, params=None,
+                  data_rows=None):
+    """Writes the model, scaler parameters, feature list and unit classes to the `path` folder."""
+    os.makedirs(path, exist_ok=True)
+    metadata = {
+        'format_version': ARTIFACT_VERSION,
+        'model_type': type(model).__name__,
+        'model_format': 'forest' if is_forest(model) else 'joblib',
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'features': list(features),
+        'unit_classes': [str(unit) for unit in unit_classes] if unit_classes is not None else None,
+        'scaler': {'min_': scaler.min_.tolist(), 'scale_': scaler.scale_.tolist()},
+        'params': params or {},
+        'metrics': metrics or {},
+        # Rows in the training data, so incremental training knows what is new
+        'data_rows': data_rows,
+    }
+    previous = _read_forest_dir(path)
+
+    if metadata['model_format'] == 'forest':
+        forest = export_forest(model)
+        metadata['forest_dir'] = _write_forest(forest, path)
+        metadata['n_trees'] = int(len(forest['roots']))
+        metadata['n_nodes'] = int(len(forest['value']))
+        metadata['max_depth'] = int(max(estimator.tree_.max_depth for estimator in model.estimators_))
+        keep = {metadata['forest_dir'], previous}
+    else:
+        import joblib
+
+        joblib.dump(model, os.path.join(path, f"{MODEL_FILE}.tmp"))
+        os.replace(os.path.join(path, f"{MODEL_FILE}.tmp"), os.path.join(path, MODEL_FILE))
+        keep = {MODEL_FILE}
+
+    _write_metadata(metadata, path)
+    # The representation left by a previous model saved in the same folder is dropped
+    _remove_stale(path, keep)
+    return path
+
+
+def _write_metadata(metadata, path):
+    """Replaces metadata.json in one step, so readers never see a partial file."""
+    tmp_path = os.path.join(path, f"{METADATA_FILE}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(path, METADATA_FILE))
+
+
+def read_metadata(path=ARTIFACT_DIR):
+    with open(os.path.join(path, METADATA_FILE), 'r', encoding='utf-8') as f:
+        metadata = json.load(f)
+    version = metadata.get('format_version')
+    if version not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Unsupported model artifact version {version} (expected {ARTIFACT_VERSION}).")
+    return metadata
+
+
+def _read_forest_dir(path):
+    """Forest folder named by the current metadata.json of `path`, or None."""
+    try:
+        metadata = read_metadata(path)
+    except (OSError, ValueError):
+        return None
+    return metadata.get('forest_dir', FOREST_DIR) if metadata.get('model_format', 'forest') == 'forest' else None
+
+
+def load_artifact(path=ARTIFACT_DIR, mmap=True):
+    """Returns (model, scaler, metadata); the model arrays are memory-mapped unless `mmap=False`."""
+    metadata = read_metadata(path)
+    mmap_mode = 'r' if mmap else None
+    if metadata.get('model_format', 'forest') == 'forest':
+        forest_dir = os.path.join(path, metadata.get('forest_dir', FOREST_DIR))
+        arrays = {name: np.load(os.path.join(forest_dir, f"{name}.npy"), mmap_mode=mmap_mode) for name in NODE_ARRAYS}
+        model = ForestArrays(**arrays, max_depth=metadata['max_depth'])
+    else:
+        import joblib
+
+        model = joblib.load(os.path.join(path, MODEL_FILE), mmap_mode=mmap_mode)
+    scaler = MinMaxTransform(metadata['scaler']['min_'], metadata['scaler']['scale_'])
+    return model, scaler, metadata
+
+
+def append_trees(model, path=ARTIFACT_DIR, max_trees=None, **metadata_updates):
+    """
+    Adds the trees of a newly fitted forest to a forest artifact (like a warm_start forest).
+
+    With `max_trees`, the oldest trees are dropped so at most `max_trees` remain.
+    `metadata_updates` are merged into metadata.json (e.g. unit_classes, data_rows).
+    """
+    metadata = read_metadata(path)
+    if metadata.get('model_format', 'forest') != 'forest':
+        raise ValueError("Trees can only be appended to a forest artifact.")
+    previous = metadata.get('forest_dir', FOREST_DIR)
+    old = {name: np.load(os.path.join(path, previous, f"{name}.npy")) for name in NODE_ARRAYS}
+    new = export_forest(model)
+
+    offset = len(old['value'])
+    for name in ('roots', 'children_left', 'children_right'):
+        new[name] = new[name] + offset
+    forest = {name: np.concatenate([old[name], new[name]]) for name in NODE_ARRAYS}
+
+    if max_trees is not None and len(forest['roots']) > max_trees:
+        # Trees are stored one after the other, so the oldest ones are a prefix of every array
+        drop = len(forest['roots']) - max_trees
+        cut = forest['roots'][drop]
+        forest = {name: forest[name][drop:] if name == 'roots' else forest[name][cut:] for name in NODE_ARRAYS}
+        for name in ('roots', 'children_left', 'children_right'):
+            forest[name] = forest[name] - cut
+
+    metadata.update(metadata_updates)
+    metadata['format_version'] = ARTIFACT_VERSION
+    # Written to a new folder: readers of the current metadata.json keep loading the old arrays
+    metadata['forest_dir'] = _write_forest(forest, path)
+    metadata['n_trees'] = int(len(forest['roots']))
+    metadata['n_nodes'] = int(len(forest['value']))
+    # An upper bound once old trees are dropped; extra steps stay on the leaves
+    metadata['max_depth'] = max(metadata['max_depth'], int(max(e.tree_.max_depth for e in model.estimators_)))
+    _write_metadata(metadata, path)
+    _remove_stale(path, {metadata['forest_dir'], previous})
+    return metadata
+
+
+def convert_pickle(pickle_path, path=ARTIFACT_DIR, unit_classes=None):
+    """Converts a legacy (model, scaler, features) pickle into an artifact folder."""
+    import joblib
+
+    model, scaler, features = joblib.load(pickle_path)
+    return save_artifact(model, scaler, features, unit_classes, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converts a legacy model pickle into a model artifact folder.")
+    parser.add_argument("pickle", help="Pickle with (model, scaler, features), e.g. random_forest_model.pkl")
+    parser.add_argument("--output", default=ARTIFACT_DIR)
+    parser.add_argument("--history", default='previsao_necessidades_contratacao_atualizado.csv',
+                        help="Historical data, used to recover the business unit classes")
+    args = parser.parse_args()
+
+    unit_classes = None
+    if args.history and os.path.exists(args.history):
+        import pandas as pd
+        unit_classes = sorted(pd.read_csv(args.history, usecols=['UN'])['UN'].astype(str).unique())
+    convert_pickle(args.pickle, args.output, unit_classes)
+    print(f"Model artifact saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
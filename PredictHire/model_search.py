@@ -0,0 +1,152 @@
+"""
+Hyperparameter search with time-ordered cross-validation.
+
+Each business unit (UN) is split in time order: fold k trains on the first years
+of every UN and tests on the years that follow, so no fold sees the future of
+the unit it is evaluated on. All (candidate, fold) fits run in parallel with
+joblib and their results are cached on disk, so repeating or extending a
+search only fits what is new. The cache keeps the test predictions and the
+fit/predict times of each fold, not the fitted estimators: the best candidate
+is fitted again on all rows to be saved.
+"""
+import json
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Memory, Parallel, delayed
+from sklearn.ensemble import ExtraTreesRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import Ridge
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import ParameterGrid, ParameterSampler, TimeSeriesSplit
+from sklearn.preprocessing import MinMaxScaler
+
+SEARCH_CACHE_DIR = '.search_cache'
+
+# Model name -> (estimator class, fixed parameters, parameter grid)
+SEARCH_SPACES = {
+    'random_forest': (RandomForestRegressor, {'random_state': 42}, {
+        'n_estimators': [100, 300],
+        'max_depth': [None, 5, 10],
+        'min_samples_leaf': [1, 2, 4],
+        'max_features': [1.0, 'sqrt'],
+    }),
+    'extra_trees': (ExtraTreesRegressor, {'random_state': 42}, {
+        'n_estimators': [100, 300],
+        'max_depth': [None, 5],
+        'min_samples_leaf': [1, 2, 4],
+    }),
+    'hist_gradient_boosting': (HistGradientBoostingRegressor, {'random_state': 42}, {
+        'learning_rate': [0.05, 0.1],
+        'max_iter': [100, 300],
+        'max_leaf_nodes': [7, 15, 31],
+        'min_samples_leaf': [2, 5, 10],
+    }),
+    'ridge': (Ridge, {}, {
+        'alpha': [0.01, 0.1, 1.0, 10.0],
+    }),
+}
+
+
+def make_model(name, params=None):
+    estimator, fixed, _ = SEARCH_SPACES[name]
+    return estimator(**{**fixed, **(params or {})})
+
+
+def model_name(model_type):
+    """Search space name of an estimator class name, e.g. 'ExtraTreesRegressor' -> 'extra_trees'."""
+    for name, (estimator, _, _) in SEARCH_SPACES.items():
+        if estimator.__name__ == model_type:
+            return name
+    raise ValueError(f"No search space for model type {model_type}.")
+
+
+def time_series_folds(years, units, n_splits=5):
+    """
+    Time-ordered folds per business unit, as (train_idx, test_idx) pairs of row positions.
+
+    Units with too few rows for `n_splits` folds are left out with a warning.
+    """
+    years = np.asarray(years)
+    units = np.asarray(units)
+    folds = [([], []) for _ in range(n_splits)]
+    splitter = TimeSeriesSplit(n_splits=n_splits)
+    for unit in pd.unique(units):
+        rows = np.flatnonzero(units == unit)
+        rows = rows[np.argsort(years[rows], kind='stable')]
+        if len(rows) <= n_splits:
+            print(f"Warning: UN '{unit}' has {len(rows)} rows, too few for {n_splits} folds; left out.")
+            continue
+        for k, (train, test) in enumerate(splitter.split(rows)):
+            folds[k][0].extend(rows[train])
+            folds[k][1].extend(rows[test])
+    return [(np.asarray(train), np.asarray(test)) for train, test in folds if len(test)]
+
+
+def fit_fold(model_name, params, X_train, y_train, X_test):
+    """
+    Fits one candidate on one fold; returns the test predictions and fit/predict times in seconds.
+
+    Only these return values are cached by `run_search`; the fitted model is discarded.
+    """
+    scaler = MinMaxScaler().fit(X_train)
+    model = make_model(model_name, params)
+    # The folds are what runs in parallel, so each model fits on a single core
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)
+    start = time.perf_counter()
+    model.fit(scaler.transform(X_train), y_train)
+    fitted = time.perf_counter()
+    predictions = model.predict(scaler.transform(X_test))
+    return predictions, fitted - start, time.perf_counter() - fitted
+
+
+def candidates(models=None, n_iter=None, seed=42):
+    """(model name, params) pairs: the full grid of each model, or `n_iter` random draws per model."""
+    for name in models or SEARCH_SPACES:
+        grid = SEARCH_SPACES[name][2]
+        size = len(ParameterGrid(grid))
+        if n_iter is None or n_iter >= size:
+            params_list = ParameterGrid(grid)
+        else:
+            params_list = ParameterSampler(grid, n_iter=n_iter, random_state=seed)
+        for params in params_list:
+            yield name, params
+
+
+def run_search(X, y, folds, models=None, n_iter=None, n_jobs=-1, cache_dir=SEARCH_CACHE_DIR):
+    """
+    Evaluates every candidate on every fold and returns the leaderboard, best first.
+
+    Metrics are computed on the pooled out-of-fold predictions; times are the
+    mean per fold. With `cache_dir=None` nothing is cached.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    cached_fit = Memory(cache_dir, verbose=0).cache(fit_fold) if cache_dir else fit_fold
+    candidate_list = list(candidates(models, n_iter))
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(cached_fit)(name, params, X[train], y[train], X[test])
+        for name, params in candidate_list
+        for train, test in folds
+    )
+
+    y_test = np.concatenate([y[test] for _, test in folds])
+    rows = []
+    for i, (name, params) in enumerate(candidate_list):
+        fold_results = results[i * len(folds):(i + 1) * len(folds)]
+        predictions = np.concatenate([fold_predictions for fold_predictions, _, _ in fold_results])
+        fold_rmse = [np.sqrt(mean_squared_error(y[test], fold_predictions))
+                     for (_, test), (fold_predictions, _, _) in zip(folds, fold_results)]
+        rows.append({
+            'model': name,
+            'params': json.dumps(params, sort_keys=True),
+            'rmse': np.sqrt(mean_squared_error(y_test, predictions)),
+            'rmse_std': np.std(fold_rmse),
+            'mae': mean_absolute_error(y_test, predictions),
+            'r2': r2_score(y_test, predictions),
+            'fit_time': np.mean([fit for _, fit, _ in fold_results]),
+            'predict_time': np.mean([predict for _, _, predict in fold_results]),
+        })
+    return pd.DataFrame(rows).sort_values('rmse', ignore_index=True)
@@ -1,87 +1,77 @@
-import numpy as np
+import argparse
+
 import pandas as pd
-import joblib
-import predict_model_chart as predict_model_chart
+from batch_predict import (
+    ADDITIONAL_NEEDED, ANO_COL, EBITDA_COL, HEADCOUNT, HISTORY_FILE, PREDICTED_HEADCOUNT, TURNOVER, UN_COL,
+    VN_ANTERIOR, VN_COL, HeadcountPredictor,
+)
+from model_artifact import ARTIFACT_DIR
 
-# Column name constants
-UN_COL = 'UN'
-VN_COL = 'VN'
-EBITDA_COL = 'EBITDA'
-ANO_COL = 'ANO'
-TURNOVER = 'Turnover'
-HEADCOUNT ='HEADCOUNT'
-CRESCIMENTO_VN = 'Crescimento_VN'
-CRESCIMENTO_HEADCOUNT = 'Crescimento_Headcount'
-MARGEN_EBITDA = 'Margem_EBITDA'
 
-# Load the trained model, scaler, and feature list
-model_filename = 'random_forest_model.pkl'
-try:
-    model, scaler, features = joblib.load(model_filename)
-    print("Model, scaler, and features loaded successfully.")
-except FileNotFoundError:
-    print(f"Error: File '{model_filename}' not found.")
-    exit()
+def main():
+    parser = argparse.ArgumentParser(description="Predicts next year's headcount for an example scenario.")
+    parser.add_argument("--chart", help="Save the chart to this file instead of opening a window")
+    parser.add_argument("--no-chart", action="store_true", help="Skip the chart")
+    parser.add_argument("--model", help=f"Model artifact folder or legacy .pkl (default: {ARTIFACT_DIR})")
+    parser.add_argument("--un", help="Business unit name (default: the first unit the model knows)")
+    args = parser.parse_args()
 
-# Example new data for prediction
-new_data = pd.DataFrame({
-    ANO_COL: [2025],
-    VN_COL: [600000],
-    EBITDA_COL: [80000],
-    HEADCOUNT: [7],
-    TURNOVER: [0.15],
-    CRESCIMENTO_VN: [((600000 / 500000) - 1) * 100],
-    CRESCIMENTO_HEADCOUNT: [0],
-    MARGEN_EBITDA: [(80000 / 600000) * 100]
-})
+    # Load the trained model, scaler, and feature list
+    try:
+        predictor = HeadcountPredictor.load(args.model, HISTORY_FILE, n_jobs=None)
+        print("Model, scaler, and features loaded successfully.")
+    except FileNotFoundError as e:
+        print(f"Error: File '{e.filename}' not found. Run train_model.py first.")
+        exit()
 
+    # Example new data for prediction (derived features are computed by the predictor)
+    new_data = pd.DataFrame({
+        ANO_COL: [2025],
+        VN_COL: [600000],
+        VN_ANTERIOR: [500000],
+        EBITDA_COL: [80000],
+        TURNOVER: [0.15],
+    })
 
-# Replace 0 with a valid identifier in your business context
-new_data[UN_COL] = 0
+    # Units the model has not seen are predicted as the average over the known ones
+    new_data[UN_COL] = args.un or (predictor.unit_classes[0] if predictor.unit_classes else 0)
 
-# Drop the 'HEADCOUNT' column, as it is the target in the training data
-if HEADCOUNT in new_data.columns:
-    new_data = new_data.drop(columns=[HEADCOUNT])
+    # Current number of employees
+    current_headcount = 7
+    new_data[HEADCOUNT] = current_headcount
 
-# Verify that all required feature columns are present in the new data
-missing_cols = [col for col in features if col not in new_data.columns]
-if missing_cols:
-    print(f"Error: Missing columns in new data: {missing_cols}")
-    exit()
+    try:
+        scored = predictor.score(new_data)
+        print("Predictions for new data:", scored[PREDICTED_HEADCOUNT].to_numpy())
+    except Exception as e:
+        print(f"Error during prediction: {e}")
+        exit()
 
-try:
-    new_data_normalized = new_data.copy()
-    new_data_normalized[features] = scaler.transform(new_data[features])
-except Exception as e:
-    print(f"Error during data normalization: {e}")
-    exit()
+    # Compare predicted headcount with the current headcount
+    predicted_headcount = scored[PREDICTED_HEADCOUNT].iloc[0]
+    additional_needed = scored[ADDITIONAL_NEEDED].iloc[0]
+    if additional_needed > 0:
+        print(f"According to the prediction, you should hire {additional_needed} additional employee(s).")
+    else:
+        print("No need to hire additional employees at this time.")
 
-try:
-    predictions = model.predict(new_data_normalized[features])
-    print("Predictions for new data:", predictions)
-except Exception as e:
-    print(f"Error during prediction: {e}")
-    exit()
+    if args.no_chart:
+        return
 
-# Current number of employees
-current_headcount = 7
+    # matplotlib is only imported when a chart is drawn
+    import predict_model_chart
 
-# Compare predicted headcount with the current headcount
-predicted_headcount = predictions[0]
-if predicted_headcount > current_headcount:
-    additional_needed = int(np.ceil(predicted_headcount - current_headcount))
-    print(f"According to the prediction, you should hire {additional_needed} additional employee(s).")
-else:
-    print("No need to hire additional employees at this time.")
+    historical_data = pd.read_csv(HISTORY_FILE)
 
+    # Call the function to plot the chart
+    predict_model_chart.plot_historical_and_predicted_headcount(
+        historical_data=historical_data,
+        predicted_year=2025,
+        predicted_headcount=predicted_headcount,
+        current_headcount=current_headcount,
+        output_path=args.chart,
+    )
 
-file_path = 'previsao_necessidades_contratacao_atualizado.csv'
-historical_data = pd.read_csv(file_path)
 
-# Call the function to plot the chart
-predict_model_chart.plot_historical_and_predicted_headcount(
-    historical_data=historical_data, 
-    predicted_year=2025, 
-    predicted_headcount=predicted_headcount,
-    current_headcount=current_headcount
-)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
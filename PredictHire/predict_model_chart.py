@@ -1,7 +1,28 @@
-import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.figure import Figure
 
-def plot_historical_and_predicted_headcount(historical_data, predicted_year, predicted_headcount, current_headcount):
+
+def _new_figure(output_path):
+    # A standalone Figure renders headless with Agg; pyplot is only needed to open a window
+    if output_path:
+        return Figure(figsize=(12, 6))
+    import matplotlib.pyplot as plt
+
+    return plt.figure(figsize=(12, 6))
+
+
+def _finish(fig, output_path):
+    fig.tight_layout()
+    if output_path:
+        fig.savefig(output_path)
+    else:
+        import matplotlib.pyplot as plt
+
+        plt.show()
+
+
+def plot_historical_and_predicted_headcount(historical_data, predicted_year, predicted_headcount, current_headcount,
+                                            output_path=None):
     """
     Plots the historical headcount data and the predicted headcount, including the number of additional employees required.
 
@@ -10,6 +31,8 @@ def plot_historical_and_predicted_headcount(historical_data, predicted_year, pre
         predicted_year (int): The year for the predicted headcount.
         predicted_headcount (float): The predicted headcount value.
         current_headcount (int): The current number of employees.
+        output_path (str, optional): Save the chart to this file instead of showing it.
+            No window or display is needed in this case.
     """
     historical_years = historical_data["ANO"]
     historical_headcount = historical_data["HEADCOUNT"]
@@ -18,19 +41,20 @@ def plot_historical_and_predicted_headcount(historical_data, predicted_year, pre
     additional_needed = max(0, int(np.ceil(predicted_headcount - current_headcount)))
 
     # Plot the historical data and prediction
-    plt.figure(figsize=(12, 6))
+    fig = _new_figure(output_path)
+    ax = fig.add_subplot()
 
     # Plot historical data
-    plt.plot(
+    ax.plot(
         historical_years, historical_headcount, marker="o", label="Historical Headcount"
     )
 
     # Add the prediction as a distinct point
-    plt.scatter(
+    ax.scatter(
         [predicted_year], [predicted_headcount], color="red", label=f"Predicted Headcount ({predicted_year})"
     )
 
-    plt.annotate(
+    ax.annotate(
         f"+{additional_needed} employees" if additional_needed > 0 else "No additional employees needed",
         (predicted_year, predicted_headcount),
         textcoords="offset points",
@@ -41,10 +65,80 @@ def plot_historical_and_predicted_headcount(historical_data, predicted_year, pre
         fontweight="bold"
     )
 
-    plt.title("Historical and Predicted Headcount", fontsize=16)
-    plt.xlabel("Year", fontsize=12)
-    plt.ylabel("Headcount", fontsize=12)
-    plt.grid(True, linestyle="--", alpha=0.6)
-    plt.legend(fontsize=10)
-    plt.tight_layout()
-    plt.show()
+    ax.set_title("Historical and Predicted Headcount", fontsize=16)
+    ax.set_xlabel("Year", fontsize=12)
+    ax.set_ylabel("Headcount", fontsize=12)
+    ax.grid(True, linestyle="--", alpha=0.6)
+    ax.legend(fontsize=10)
+    _finish(fig, output_path)
+
+
+def plot_prediction_interval(historical_data, predicted_year, quantiles, current_headcount, title=None,
+                             output_path=None):
+    """
+    Plots the historical headcount and the predicted headcount as an interval.
+
+    Args:
+        historical_data (pd.DataFrame): Historical data containing "ANO" and "HEADCOUNT".
+        predicted_year (int): The year for the predicted headcount.
+        quantiles (tuple): Low, median and high predicted headcount (e.g. P10, P50, P90).
+        current_headcount (int): The current number of employees.
+        title (str, optional): Chart title.
+        output_path (str, optional): Save the chart to this file instead of showing it.
+    """
+    low, median, high = quantiles
+    fig = _new_figure(output_path)
+    ax = fig.add_subplot()
+
+    ax.plot(historical_data["ANO"], historical_data["HEADCOUNT"], marker="o", label="Historical Headcount")
+    ax.errorbar([predicted_year], [median], yerr=[[median - low], [high - median]], fmt="o", color="red",
+                capsize=8, label=f"Predicted Headcount ({predicted_year}, median and interval)")
+    ax.axhline(current_headcount, color="gray", linestyle=":", label="Current Headcount")
+
+    hires_median = max(0, int(np.ceil(median - current_headcount)))
+    hires_high = max(0, int(np.ceil(high - current_headcount)))
+    ax.annotate(
+        f"+{hires_median} employees (up to +{hires_high})",
+        (predicted_year, high),
+        textcoords="offset points",
+        xytext=(0, 10),
+        ha="right",
+        fontsize=10,
+        color="blue",
+        fontweight="bold"
+    )
+    ax.margins(y=0.15)
+
+    ax.set_title(title or "Historical and Predicted Headcount", fontsize=16)
+    ax.set_xlabel("Year", fontsize=12)
+    ax.set_ylabel("Headcount", fontsize=12)
+    ax.grid(True, linestyle="--", alpha=0.6)
+    ax.legend(fontsize=10)
+    _finish(fig, output_path)
+
+
+def plot_scenario_sweep(x, low, median, high, current_headcount, xlabel, title=None, output_path=None):
+    """
+    Plots the predicted headcount across a range of scenarios, with its interval as a band.
+
+    Args:
+        x (array-like): Scenario values on the x axis (e.g. VN growth).
+        low, median, high (array-like): Predicted headcount quantiles for each x.
+        current_headcount (int): The current number of employees.
+        xlabel (str): Label of the x axis.
+        title (str, optional): Chart title.
+        output_path (str, optional): Save the chart to this file instead of showing it.
+    """
+    fig = _new_figure(output_path)
+    ax = fig.add_subplot()
+
+    ax.fill_between(x, low, high, color="red", alpha=0.2, label="Prediction Interval")
+    ax.plot(x, median, color="red", marker="o", label="Predicted Headcount (median)")
+    ax.axhline(current_headcount, color="gray", linestyle=":", label="Current Headcount")
+
+    ax.set_title(title or "Predicted Headcount by Scenario", fontsize=16)
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel("Headcount", fontsize=12)
+    ax.grid(True, linestyle="--", alpha=0.6)
+    ax.legend(fontsize=10)
+    _finish(fig, output_path)
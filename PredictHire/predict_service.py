@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import contextlib
+import io
+
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from batch_predict import HISTORY_FILE, HeadcountPredictor, read_batches
+
+BATCH_SIZE = 100000
+
+
+def scored_csv(predictor, data, file_format):
+    """Scores the uploaded scenarios batch by batch and yields the results as CSV text."""
+    for i, batch in enumerate(read_batches(io.BytesIO(data), BATCH_SIZE, file_format)):
+        yield predictor.score(batch).to_csv(index=False, header=i == 0)
+
+
+async def predict(request):
+    """POST /predict with a CSV or Parquet body: returns the scored scenarios as CSV."""
+    data = await request.body()
+    if not data:
+        return JSONResponse({"error": "Send the scenarios as CSV or Parquet in the request body."}, status_code=400)
+    content_type = request.headers.get("content-type", "")
+    file_format = 'parquet' if 'parquet' in content_type or data[:4] == b'PAR1' else 'csv'
+
+    # Validate the first batch here so bad input gets a 400 instead of a broken stream
+    predictor = request.app.state.predictor
+    results = scored_csv(predictor, data, file_format)
+    try:
+        first = await asyncio.to_thread(next, results, "")
+    except (KeyError, ValueError) as e:
+        return JSONResponse({"error": f"Invalid scenarios: {e}"}, status_code=400)
+
+    async def body():
+        yield first
+        async for chunk in iterate_in_threadpool(results):
+            yield chunk
+
+    return StreamingResponse(body(), media_type="text/csv")
+
+
+async def health(request):
+    return JSONResponse({"status": "ok", "features": request.app.state.predictor.features})
+
+
+def create_app(predictor=None, model_path=None, history_file=HISTORY_FILE):
+    """Creates the ASGI app; the model is loaded once at startup."""
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        app.state.predictor = predictor or HeadcountPredictor.load(model_path, history_file)
+        yield
+
+    routes = [
+        Route("/predict", predict, methods=["POST"]),
+        Route("/health", health),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Headcount prediction service (CSV or Parquet in, CSV out).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
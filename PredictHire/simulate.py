@@ -0,0 +1,239 @@
+"""
+What-if simulator: predicted headcount with intervals over many scenarios per business unit.
+
+Scenarios for next year are built from the last year of each UN, either as a
+grid (every combination of VN growth, EBITDA margin and Turnover values) or as
+Monte Carlo samples around the historical behaviour of the unit. Every tree of
+the forest scores every scenario in one vectorized pass; the spread of the
+trees and of the scenarios gives the intervals and the hiring recommendations.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from batch_predict import (
+    ADDITIONAL_NEEDED, ANO_COL, CRESCIMENTO_HEADCOUNT, CRESCIMENTO_VN, EBITDA_COL, HEADCOUNT, HISTORY_FILE,
+    MARGEN_EBITDA, PREDICTED_HEADCOUNT, TURNOVER, UN_COL, VN_COL, HeadcountPredictor,
+)
+from features import derive_features, period_cols
+
+QUANTILES = (0.1, 0.5, 0.9)
+
+# Scenario drivers; VN growth and margin are fractions (0.1 = 10%)
+VN_GROWTH = 'vn_growth'
+MARGIN = 'ebitda_margin'
+DRIVERS = [VN_GROWTH, MARGIN, TURNOVER]
+
+
+def unit_baselines(history):
+    """Last period of every UN, with the mean and spread of its drivers over the history."""
+    history = derive_features(history)
+    history[VN_GROWTH] = history[CRESCIMENTO_VN] / 100
+    history[MARGIN] = history[MARGEN_EBITDA] / 100
+    ordered = history.sort_values([UN_COL] + period_cols(history), kind='stable')
+    by_unit = ordered.groupby(UN_COL, sort=False)
+
+    baselines = by_unit.tail(1).set_index(UN_COL)[[ANO_COL, VN_COL, EBITDA_COL, HEADCOUNT, TURNOVER]]
+    # The first period of a UN has no growth, so it is left out of the growth statistics
+    growth = ordered[by_unit.cumcount() > 0].groupby(UN_COL)[VN_GROWTH]
+    baselines[f"{VN_GROWTH}_mean"] = growth.mean()
+    baselines[f"{VN_GROWTH}_std"] = growth.std()
+    for driver in (MARGIN, TURNOVER):
+        baselines[f"{driver}_mean"] = by_unit[driver].mean()
+        baselines[f"{driver}_std"] = by_unit[driver].std()
+    return baselines.fillna(0.0)
+
+
+def scenario_grid(vn_growth, margin, turnover):
+    """Every combination of the given driver values, as 1-D arrays."""
+    grids = np.meshgrid(np.asarray(vn_growth), np.asarray(margin), np.asarray(turnover), indexing='ij')
+    return dict(zip(DRIVERS, (grid.ravel() for grid in grids)))
+
+
+def monte_carlo(baseline, samples, rng, overrides=None):
+    """
+    Draws the drivers from normal distributions around the unit's history.
+
+    `overrides` maps a driver to a (mean, std) pair that replaces the historical one.
+    Margins and Turnover are clipped to [0, 1], and VN growth to > -100%.
+    """
+    overrides = overrides or {}
+    draws = {}
+    for driver in DRIVERS:
+        mean, std = overrides.get(driver) or (baseline[f"{driver}_mean"], baseline[f"{driver}_std"])
+        draws[driver] = rng.normal(mean, std, samples)
+    draws[VN_GROWTH] = np.maximum(draws[VN_GROWTH], -0.99)
+    draws[MARGIN] = np.clip(draws[MARGIN], 0.0, 1.0)
+    draws[TURNOVER] = np.clip(draws[TURNOVER], 0.0, 1.0)
+    return draws
+
+
+def build_scenarios(unit, baseline, drivers):
+    """Model inputs for next year of `unit` under each combination of drivers."""
+    vn = baseline[VN_COL] * (1 + drivers[VN_GROWTH])
+    return pd.DataFrame({
+        UN_COL: unit,
+        ANO_COL: int(baseline[ANO_COL]) + 1,
+        VN_GROWTH: drivers[VN_GROWTH],
+        MARGIN: drivers[MARGIN],
+        VN_COL: vn,
+        EBITDA_COL: vn * drivers[MARGIN],
+        TURNOVER: drivers[TURNOVER],
+        CRESCIMENTO_VN: drivers[VN_GROWTH] * 100,
+        MARGEN_EBITDA: drivers[MARGIN] * 100,
+        # Not a feature of current models (it leaks the target); only read by models trained before
+        CRESCIMENTO_HEADCOUNT: 0.0,
+        HEADCOUNT: baseline[HEADCOUNT],
+    })
+
+
+def quantile_name(q):
+    return f"p{round(q * 100):02d}"
+
+
+def simulate_unit(predictor, unit, baseline, drivers, quantiles=QUANTILES):
+    """
+    Scores the scenarios of one unit; returns (scenarios with quantile columns, unit summary).
+
+    Each scenario gets the quantiles of its per-tree predictions. The summary
+    pools all (scenario, tree) predictions of the unit.
+    """
+    scenarios = build_scenarios(unit, baseline, drivers)
+    trees = predictor.predict_trees(scenarios)
+    current = float(baseline[HEADCOUNT])
+
+    scenarios[PREDICTED_HEADCOUNT] = trees.mean(axis=1)
+    for q, values in zip(quantiles, np.quantile(trees, quantiles, axis=1)):
+        scenarios[quantile_name(q)] = values
+    gap = np.ceil(scenarios[PREDICTED_HEADCOUNT].to_numpy() - current)
+    scenarios[ADDITIONAL_NEEDED] = np.maximum(gap, 0).astype(np.int64)
+
+    pooled = np.quantile(trees, quantiles)
+    summary = {
+        UN_COL: unit,
+        ANO_COL: int(baseline[ANO_COL]) + 1,
+        'scenarios': len(scenarios),
+        'current_headcount': current,
+        **{quantile_name(q): value for q, value in zip(quantiles, pooled)},
+        'prob_hiring': float((trees > current).mean()),
+    }
+    for q, value in zip(quantiles, pooled):
+        summary[f"hires_{quantile_name(q)}"] = max(0, int(np.ceil(value - current)))
+    return scenarios, summary
+
+
+def sweep(scenarios, quantiles, bins=15):
+    """Median of each quantile column by VN growth (binned when the values do not repeat, as in Monte Carlo)."""
+    growth = scenarios[VN_GROWTH]
+    if growth.nunique() > bins:
+        growth = pd.qcut(growth, bins, duplicates='drop').map(lambda interval: interval.mid).astype(np.float64)
+    columns = [quantile_name(q) for q in quantiles]
+    return scenarios.groupby(growth.rename(VN_GROWTH))[columns].median()
+
+
+def save_unit_charts(unit, scenarios, summary, history, quantiles, chart_dir):
+    """Interval chart and VN growth sweep of one unit, written as PNG files (no window)."""
+    import predict_model_chart
+
+    # Low, middle and high quantiles
+    names = [quantile_name(q) for q in sorted(quantiles)]
+    predict_model_chart.plot_prediction_interval(
+        historical_data=history[history[UN_COL].astype(str) == unit],
+        predicted_year=summary[ANO_COL],
+        quantiles=[summary[name] for name in names],
+        current_headcount=summary['current_headcount'],
+        title=f"{unit}: Predicted Headcount ({names[0].upper()}-{names[2].upper()})",
+        output_path=os.path.join(chart_dir, f"{unit}_interval.png"),
+    )
+    by_growth = sweep(scenarios, quantiles)
+    predict_model_chart.plot_scenario_sweep(
+        x=by_growth.index.to_numpy() * 100,
+        low=by_growth[names[0]], median=by_growth[names[1]], high=by_growth[names[2]],
+        current_headcount=summary['current_headcount'],
+        xlabel="VN growth (%)",
+        title=f"{unit}: Predicted Headcount by VN Growth",
+        output_path=os.path.join(chart_dir, f"{unit}_vn_growth.png"),
+    )
+
+
+def parse_range(values):
+    """(min, max, count) from the command line -> evenly spaced values."""
+    low, high, count = values
+    return np.linspace(float(low), float(high), int(count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["grid", "monte-carlo"], default="grid")
+    parser.add_argument("--units", nargs="+", help="Business units (default: all in the history known to the model)")
+    parser.add_argument("--vn-growth", nargs=3, default=["-0.1", "0.3", "9"], metavar=("MIN", "MAX", "N"),
+                        help="Grid: VN growth values (fractions)")
+    parser.add_argument("--margin", nargs=3, default=["0.05", "0.25", "5"], metavar=("MIN", "MAX", "N"),
+                        help="Grid: EBITDA margin values (fractions)")
+    parser.add_argument("--turnover", nargs=3, default=["0.05", "0.30", "6"], metavar=("MIN", "MAX", "N"),
+                        help="Grid: Turnover values")
+    parser.add_argument("--samples", type=int, default=10000, help="Monte Carlo: scenarios per unit")
+    parser.add_argument("--growth-dist", nargs=2, type=float, metavar=("MEAN", "STD"),
+                        help="Monte Carlo: VN growth distribution (default: the unit's history)")
+    parser.add_argument("--margin-dist", nargs=2, type=float, metavar=("MEAN", "STD"))
+    parser.add_argument("--turnover-dist", nargs=2, type=float, metavar=("MEAN", "STD"))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--quantiles", nargs=3, type=float, default=list(QUANTILES), metavar=("LOW", "MID", "HIGH"))
+    parser.add_argument("--model", help="Model artifact folder or legacy .pkl")
+    parser.add_argument("--history", default=HISTORY_FILE)
+    parser.add_argument("--output", default="simulation.parquet", help="Scenarios with their predictions")
+    parser.add_argument("--summary", default="simulation_summary.parquet", help="Recommendations per UN")
+    parser.add_argument("--chart-dir", help="Save the charts of every unit in this folder")
+    args = parser.parse_args()
+
+    predictor = HeadcountPredictor.load(args.model, args.history, unknown_units='error')
+    if not predictor.has_trees:
+        # The intervals are the spread of the trees; a single model (Ridge, HistGradientBoosting) has none
+        parser.error(f"the model is a {type(predictor.model).__name__}, but the intervals need a forest "
+                     f"(random forest or extra trees). Train one with `python train_model.py` or "
+                     f"`python train_model.py --search --models random_forest extra_trees`.")
+    history = pd.read_csv(args.history)
+    baselines = unit_baselines(history)
+    units = args.units or [unit for unit in baselines.index if unit in (predictor.unit_classes or [])]
+    unknown = [unit for unit in units if unit not in baselines.index or unit not in (predictor.unit_classes or [])]
+    if unknown:
+        raise ValueError(f"Units without history or unknown to the model: {unknown}")
+
+    quantiles = sorted(args.quantiles)
+    rng = np.random.default_rng(args.seed)
+    overrides = {VN_GROWTH: args.growth_dist, MARGIN: args.margin_dist, TURNOVER: args.turnover_dist}
+    if args.chart_dir:
+        os.makedirs(args.chart_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    all_scenarios, summaries = [], []
+    for unit in units:
+        baseline = baselines.loc[unit]
+        if args.mode == "grid":
+            drivers = scenario_grid(parse_range(args.vn_growth), parse_range(args.margin), parse_range(args.turnover))
+        else:
+            drivers = monte_carlo(baseline, args.samples, rng, overrides)
+        scenarios, summary = simulate_unit(predictor, unit, baseline, drivers, quantiles)
+        all_scenarios.append(scenarios)
+        summaries.append(summary)
+        if args.chart_dir:
+            save_unit_charts(unit, scenarios, summary, history, quantiles, args.chart_dir)
+    elapsed = time.perf_counter() - start
+
+    scenarios = pd.concat(all_scenarios, ignore_index=True)
+    summary = pd.DataFrame(summaries)
+    scenarios.to_parquet(args.output, index=False)
+    summary.to_parquet(args.summary, index=False)
+
+    print(summary.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    print(f"\n{len(scenarios)} scenarios simulated in {elapsed:.2f}s. "
+          f"Results saved to: {args.output} and {args.summary}")
+    if args.chart_dir:
+        print(f"Charts saved to: {args.chart_dir}")
+
+
+if __name__ == "__main__":
+    main()
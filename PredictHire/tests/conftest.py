@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are scripts in the folder above, not a package
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
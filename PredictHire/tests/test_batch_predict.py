@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import MinMaxScaler
+
+from batch_predict import HeadcountPredictor
+
+FEATURES = ['UN', 'VN', 'Turnover']
+UNITS = ['Consulting', 'Digital', 'Retail']
+
+
+@pytest.fixture
+def fitted():
+    """Scaler and forest fitted on unit codes 0..2, where the unit changes the headcount."""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({'UN': np.repeat([0, 1, 2], 30), 'VN': rng.uniform(1e5, 1e6, 90),
+                      'Turnover': rng.uniform(0, 0.3, 90)})
+    y = 10 + 20 * X['UN'] + X['VN'] / 1e5
+    scaler = MinMaxScaler().fit(X)
+    X_scaled = pd.DataFrame(scaler.transform(X), columns=FEATURES)
+    model = RandomForestRegressor(n_estimators=10, random_state=0).fit(X_scaled, y)
+    return model, scaler
+
+
+def scenarios(units):
+    return pd.DataFrame({'UN': units, 'VN': 5e5, 'EBITDA': 5e4, 'Turnover': 0.1, 'Crescimento_VN': 5.0})
+
+
+def test_unknown_codes_without_unit_classes_are_averaged(fitted):
+    # A legacy pickle without the historical data has no unit names
+    predictor = HeadcountPredictor(*fitted, FEATURES, unit_classes=None)
+    known = predictor.predict(scenarios([0, 1, 2]))
+    with pytest.warns(UserWarning, match="Unknown business units"):
+        unknown = predictor.predict(scenarios([-1, 3, 1.5]))
+    np.testing.assert_allclose(unknown, known.mean())
+
+
+def test_unknown_codes_without_unit_classes_can_raise(fitted):
+    predictor = HeadcountPredictor(*fitted, FEATURES, unit_classes=None, unknown_units='error')
+    with pytest.raises(ValueError, match="Unknown business units"):
+        predictor.predict(scenarios([-1]))
+
+
+def test_names_and_codes_can_be_mixed(fitted):
+    predictor = HeadcountPredictor(*fitted, FEATURES, unit_classes=UNITS)
+    np.testing.assert_allclose(predictor.predict(scenarios([0, 'Digital', np.int64(2)])),
+                               predictor.predict(scenarios([0, 1, 2])))
@@ -1,10 +1,15 @@
+import argparse
+import json
+
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import LabelEncoder, MinMaxScaler
+from sklearn.preprocessing import MinMaxScaler
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-import joblib
+
+from features import FEATURE_CACHE_DIR, FeatureStore, UnitEncoder, derive_features
+from model_artifact import ARTIFACT_DIR, append_trees, load_artifact, save_artifact
 
 UN_COL = 'UN'
 VN_COL = 'VN'
@@ -12,56 +17,176 @@ EBITDA_COL = 'EBITDA'
 ANO_COL = 'ANO'
 TURNOVER = 'Turnover'
 CRESCIMENTO_VN = 'Crescimento_VN'
-CRESCIMENTO_HEADCOUNT = 'Crescimento_Headcount'
 MARGEN_EBITDA = 'Margem_EBITDA'
 TARGET_COL = 'HEADCOUNT'
 
-file_path = 'previsao_necessidades_contratacao_atualizado.csv'
-data = pd.read_csv(file_path)
-
-required_cols = [UN_COL, VN_COL, EBITDA_COL, ANO_COL, TURNOVER, CRESCIMENTO_VN, CRESCIMENTO_HEADCOUNT, MARGEN_EBITDA, TARGET_COL]
-missing_cols = [col for col in required_cols if col not in data.columns]
-if missing_cols:
-    raise ValueError(f"The following columns are missing from the dataset: {missing_cols}")
-
-# Convert categorical data in 'UN' to numeric using Label Encoding
-label_encoder = LabelEncoder()
-data[UN_COL] = label_encoder.fit_transform(data[UN_COL])
-
-# Normalize the feature columns
-scaler = MinMaxScaler()
-scaling_cols = [UN_COL, VN_COL, EBITDA_COL, ANO_COL, TURNOVER, CRESCIMENTO_VN, CRESCIMENTO_HEADCOUNT, MARGEN_EBITDA]
-data[scaling_cols] = scaler.fit_transform(data[scaling_cols])
-
-features = [UN_COL, VN_COL, EBITDA_COL, ANO_COL, TURNOVER, CRESCIMENTO_VN, CRESCIMENTO_HEADCOUNT, MARGEN_EBITDA]
-X = data[features]
-y = data[TARGET_COL]
-
-# Split the data into training (60%), validation (20%), and testing (20%) sets
-X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.4, random_state=42)
-X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, random_state=42)
-
-model = RandomForestRegressor(random_state=42)
-model.fit(X_train, y_train)
-
-y_val_pred = model.predict(X_val)
-
-# Calculate RMSE (Root Mean Squared Error)
-rmse_val = np.sqrt(mean_squared_error(y_val, y_val_pred))
-
-# Calculate MAE (Mean Absolute Error)
-mae_val = mean_absolute_error(y_val, y_val_pred)
-
-# Calculate R² (coefficient of determination)
-r2_val = r2_score(y_val, y_val_pred)
-
+FILE_PATH = 'previsao_necessidades_contratacao_atualizado.csv'
+# Crescimento_Headcount is left out: it is computed from the same row's HEADCOUNT, the target
+FEATURES = [UN_COL, VN_COL, EBITDA_COL, ANO_COL, TURNOVER, CRESCIMENTO_VN, MARGEN_EBITDA]
+LEADERBOARD_FILE = 'leaderboard.csv'
 
-# Save the trained model, scaler, and features
-model_filename = 'random_forest_model.pkl'
-joblib.dump((model, scaler, features), model_filename)
-print(f"Model, scaler, and features saved to: {model_filename}")
 
-print(f"Validation RMSE: {rmse_val:.2f}")
-print(f"Validation MAE: {mae_val:.2f}")
-print(f"Validation R²: {r2_val:.2f}")
+def load_data(file_path=FILE_PATH, cache_dir=FEATURE_CACHE_DIR):
+    """
+    Reads the raw data and derives the growth and margin features per UN (see features.py).
+
+    With a `cache_dir`, features are cached and only rows appended since the last run are derived.
+    """
+    if cache_dir:
+        data, new_rows = FeatureStore(file_path, cache_dir).update()
+        print(f"Features: {new_rows} new row(s) derived, {len(data) - new_rows} from cache.")
+    else:
+        data = derive_features(pd.read_csv(file_path))
 
+    required_cols = FEATURES + [TARGET_COL]
+    missing_cols = [col for col in required_cols if col not in data.columns]
+    if missing_cols:
+        raise ValueError(f"The following columns are missing from the dataset: {missing_cols}")
+    return data
+
+
+def train_default(data, unit_encoder):
+    """Fits one RandomForestRegressor on a random 60/20/20 split and saves it."""
+    # Normalize the feature columns
+    scaler = MinMaxScaler()
+    data[FEATURES] = scaler.fit_transform(data[FEATURES])
+
+    X = data[FEATURES]
+    y = data[TARGET_COL]
+
+    # Split the data into training (60%), validation (20%), and testing (20%) sets
+    X_train, X_temp, y_train, y_temp = train_test_split(X, y, test_size=0.4, random_state=42)
+    X_val, X_test, y_val, y_test = train_test_split(X_temp, y_temp, test_size=0.5, random_state=42)
+
+    model = RandomForestRegressor(random_state=42)
+    model.fit(X_train, y_train)
+
+    y_val_pred = model.predict(X_val)
+
+    # Calculate RMSE (Root Mean Squared Error)
+    rmse_val = np.sqrt(mean_squared_error(y_val, y_val_pred))
+
+    # Calculate MAE (Mean Absolute Error)
+    mae_val = mean_absolute_error(y_val, y_val_pred)
+
+    # Calculate R² (coefficient of determination)
+    r2_val = r2_score(y_val, y_val_pred)
+
+    # Save the trained model, scaler parameters, features, and unit classes (see model_artifact.py)
+    metrics = {'validation_rmse': float(rmse_val), 'validation_mae': float(mae_val), 'validation_r2': float(r2_val)}
+    save_artifact(model, scaler, FEATURES, unit_encoder.classes, ARTIFACT_DIR, metrics=metrics, data_rows=len(data))
+    print(f"Model, scaler, and features saved to: {ARTIFACT_DIR}")
+
+    print(f"Validation RMSE: {rmse_val:.2f}")
+    print(f"Validation MAE: {mae_val:.2f}")
+    print(f"Validation R²: {r2_val:.2f}")
+
+
+def train_search(data, unit_encoder, args):
+    """Runs the hyperparameter search (see model_search.py), then refits the best candidate on all rows."""
+    from model_search import make_model, run_search, time_series_folds
+
+    folds = time_series_folds(data[ANO_COL], data[UN_COL], n_splits=args.folds)
+    if not folds:
+        raise ValueError("Not enough rows per business unit for time-ordered cross-validation.")
+    leaderboard = run_search(data[FEATURES], data[TARGET_COL], folds, models=args.models, n_iter=args.n_iter,
+                             n_jobs=args.n_jobs, cache_dir=None if args.no_cache else args.cache_dir)
+    leaderboard.to_csv(args.leaderboard, index=False)
+
+    with pd.option_context('display.max_colwidth', 80, 'display.width', 200):
+        print(leaderboard.head(args.top).to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print(f"\n{len(leaderboard)} candidates x {len(folds)} time-ordered folds. Leaderboard saved to: {args.leaderboard}")
+
+    best = leaderboard.iloc[0]
+    params = json.loads(best['params'])
+    scaler = MinMaxScaler()
+    X = pd.DataFrame(scaler.fit_transform(data[FEATURES]), columns=FEATURES)
+    model = make_model(best['model'], params)
+    model.fit(X, data[TARGET_COL])
+
+    metrics = {f"cv_{name}": float(best[name]) for name in ['rmse', 'mae', 'r2']}
+    save_artifact(model, scaler, FEATURES, unit_encoder.classes, ARTIFACT_DIR, metrics=metrics, params=params,
+                  data_rows=len(data))
+    print(f"Best model ({best['model']} {best['params']}) refitted on all rows and saved to: {ARTIFACT_DIR}")
+
+
+def train_incremental(data, args):
+    """
+    Adds trees fitted on the current data to the saved forest, keeping the old trees and the scaler.
+
+    Known units keep their codes; new units get the next ones. Nothing is fitted
+    if the data has no rows beyond those the model was trained with.
+    """
+    model, scaler, metadata = load_artifact(ARTIFACT_DIR, mmap=False)
+    if metadata.get('model_format', 'forest') != 'forest':
+        raise ValueError("Incremental training needs a forest model; run train_model.py without --incremental.")
+    trained_rows = metadata.get('data_rows') or 0
+    if len(data) <= trained_rows and not args.force:
+        print(f"The model is up to date ({trained_rows} rows); nothing to train.")
+        return
+
+    unit_encoder = UnitEncoder(metadata['unit_classes'] or [])
+    data[UN_COL] = unit_encoder.fit_transform(data[UN_COL])
+    # The scaler and the feature list stay frozen so the existing trees keep seeing the same inputs
+    X = scaler.transform(data[metadata['features']].to_numpy(dtype=np.float64))
+    y = data[TARGET_COL].to_numpy(dtype=np.float64)
+
+    if trained_rows < len(data):
+        new_pred = model.predict(X[trained_rows:])
+        print(f"Previous model on the {len(data) - trained_rows} new row(s): "
+              f"MAE {mean_absolute_error(y[trained_rows:], new_pred):.2f}")
+
+    from model_search import make_model, model_name
+
+    params = {name: value for name, value in metadata.get('params', {}).items() if name != 'n_estimators'}
+    params.setdefault('random_state', 42)
+    # A different seed per round, so the added trees differ from the previous ones
+    params['random_state'] += metadata['n_trees']
+    # Same estimator as the saved forest (e.g. extra trees picked by --search)
+    model = make_model(model_name(metadata['model_type']), {**params, 'n_estimators': args.add_trees, 'n_jobs': -1})
+    new_trees = model.fit(X, y)
+    metadata = append_trees(new_trees, ARTIFACT_DIR, max_trees=args.max_trees,
+                            unit_classes=unit_encoder.classes, data_rows=len(data))
+    print(f"Added {args.add_trees} trees fitted on {len(data)} rows; the model now has {metadata['n_trees']} trees "
+          f"and is saved to: {ARTIFACT_DIR}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trains the headcount model.")
+    parser.add_argument("--data", default=FILE_PATH, help="Raw data CSV (UN, ANO, VN, EBITDA, HEADCOUNT, Turnover)")
+    parser.add_argument("--search", action="store_true",
+                        help="Hyperparameter search with time-ordered cross-validation per UN")
+    parser.add_argument("--models", nargs="+", help="Models to search (default: all in model_search.SEARCH_SPACES)")
+    parser.add_argument("--n-iter", type=int, help="Random candidates per model instead of the full grid")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Parallel fits (-1 = all cores)")
+    parser.add_argument("--cache-dir", default='.search_cache', help="Where fitted folds are cached")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--leaderboard", default=LEADERBOARD_FILE)
+    parser.add_argument("--top", type=int, default=15, help="Leaderboard rows to print")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Add trees to the saved forest for the rows appended since it was trained")
+    parser.add_argument("--add-trees", type=int, default=20, help="Trees added per incremental run")
+    parser.add_argument("--max-trees", type=int, help="Drop the oldest trees beyond this number")
+    parser.add_argument("--force", action="store_true", help="Add trees even if there are no new rows")
+    parser.add_argument("--no-feature-cache", action="store_true", help="Derive all features again")
+    args = parser.parse_args()
+
+    data = load_data(args.data, cache_dir=None if args.no_feature_cache else FEATURE_CACHE_DIR)
+
+    if args.incremental:
+        train_incremental(data, args)
+        return
+
+    # Convert the business unit names to codes (same codes as a LabelEncoder)
+    unit_encoder = UnitEncoder()
+    data[UN_COL] = unit_encoder.fit_transform(data[UN_COL])
+
+    if args.search:
+        train_search(data, unit_encoder, args)
+    else:
+        train_default(data, unit_encoder)
+
+
+if __name__ == "__main__":
+    main()
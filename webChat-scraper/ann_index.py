@@ -0,0 +1,122 @@
+import math
+import os
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ["flat", "ivf-flat", "hnsw", "ivf-pq"]
+
+# Abaixo destes tamanhos a pesquisa exata já é rápida e o treino não teria dados suficientes
+MIN_VECTORS = {"ivf-flat": 1000, "ivf-pq": 10000, "hnsw": 1000}
+
+
+def default_nlist(n):
+    """Número de listas do IVF: ~4·√n, o valor habitual para até alguns milhões de vetores."""
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def default_pq_m(dim):
+    """Sub-quantizadores do PQ: ~8 dimensões por sub-vetor (48 para 384 dimensões)."""
+    m = max(1, dim // 8)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def index_config(index_type="flat", nlist=None, pq_m=None, pq_bits=8, hnsw_m=32):
+    """Parâmetros de construção do índice (ficam no manifesto; mudá-los obriga a reconstruir)."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Tipo de índice desconhecido: {index_type}. Opções: {', '.join(INDEX_TYPES)}")
+    if index_type == "flat":
+        return {"type": "flat"}
+    if index_type == "hnsw":
+        return {"type": "hnsw", "hnsw_m": hnsw_m}
+    config = {"type": index_type, "nlist": nlist}
+    if index_type == "ivf-pq":
+        config.update(pq_m=pq_m, pq_bits=pq_bits)
+    return config
+
+
+def load_index_config(**overrides):
+    """
+    Lê a configuração do índice das variáveis INDEX_* (ver env_example).
+
+    Devolve `(config, search_params)`: a configuração de construção e os
+    parâmetros de pesquisa (`nprobe`, `ef_search`), que podem mudar sem reconstruir.
+    """
+    def env_int(name):
+        value = os.getenv(name)
+        return int(value) if value else None
+
+    options = {
+        "index_type": os.getenv("INDEX_TYPE", "flat"),
+        "nlist": env_int("INDEX_NLIST"),
+        "pq_m": env_int("INDEX_PQ_M"),
+        "hnsw_m": env_int("INDEX_HNSW_M") or 32,
+        "nprobe": env_int("INDEX_NPROBE") or 16,
+        "ef_search": env_int("INDEX_EF_SEARCH") or 64,
+    }
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    search_params = {"nprobe": options.pop("nprobe"), "ef_search": options.pop("ef_search")}
+    return index_config(**options), search_params
+
+
+def set_search_params(index, nprobe=16, ef_search=64):
+    """Ajusta os parâmetros de pesquisa de um índice IVF (`nprobe`) ou HNSW (`efSearch`)."""
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+
+
+def build_index(vectors, config, train_size=None, search_params=None, seed=42, add_batch_size=100000,
+                with_ids=False):
+    """
+    Constrói um índice FAISS (distância L2, como o `FAISS.from_documents`) com os vetores dados.
+
+    Os índices IVF são treinados numa amostra aleatória de `train_size` vetores
+    (por omissão ~50 por lista, no mínimo 10 mil). Com poucos vetores é usado
+    um índice exato, que nesse caso é tão rápido quanto os aproximados.
+
+    Com `with_ids=True`, um índice aproximado aceita `add_with_ids`/`remove_ids`
+    (o HNSW fica dentro de um `IndexIDMap2`); os IDs iniciais são as posições.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    index_type = config["type"]
+    if index_type != "flat" and n < MIN_VECTORS[index_type]:
+        print(f"Só {n} vetores: a usar um índice exato em vez de {index_type}.")
+        index_type = "flat"
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, config["hnsw_m"])
+        index.hnsw.efConstruction = 2 * config["hnsw_m"] + 100
+        if with_ids:
+            index = faiss.IndexIDMap2(index)
+    else:
+        nlist = config["nlist"] or default_nlist(n)
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivf-flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        else:
+            pq_m = config["pq_m"] or default_pq_m(dim)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, config["pq_bits"])
+
+        train_size = min(n, train_size or max(50 * nlist, 10000))
+        rng = np.random.default_rng(seed)
+        sample = vectors[np.sort(rng.choice(n, train_size, replace=False))]
+        index.train(sample)
+
+    for start in range(0, n, add_batch_size):
+        batch = vectors[start:start + add_batch_size]
+        if with_ids and index_type != "flat":
+            index.add_with_ids(batch, np.arange(start, start + len(batch), dtype=np.int64))
+        else:
+            index.add(batch)
+    set_search_params(index, **(search_params or {}))
+    return index
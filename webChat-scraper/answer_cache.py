@@ -0,0 +1,141 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.messages import AIMessageChunk
+
+
+def normalize_question(question):
+    """Normaliza a pergunta (minúsculas, espaços, pontuação final) antes de calcular o embedding."""
+    question = " ".join(question.lower().split())
+    return re.sub(r"[\s?!.]+$", "", question)
+
+
+class SemanticAnswerCache:
+    """
+    Cache de respostas do LLM para perguntas repetidas.
+
+    Cada resposta fica associada ao embedding da pergunta normalizada e aos IDs
+    dos documentos recuperados. Uma nova pergunta reutiliza a resposta se os
+    documentos forem os mesmos e a similaridade do cosseno for >= `threshold`.
+    As entradas expiram ao fim de `ttl` segundos e, acima de `max_entries`, as
+    menos usadas são removidas (LRU). O cache é limpo quando o índice muda.
+    """
+
+    def __init__(self, threshold=0.95, ttl=24 * 3600, max_entries=1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # id -> {"vector", "doc_key", "answer", "created"}
+        self.fingerprint = None
+        self.hits = 0
+        self.misses = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def check_index(self, fingerprint):
+        """Limpa o cache se o índice foi reconstruído (fingerprint diferente)."""
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                self.entries.clear()
+                self.fingerprint = fingerprint
+
+    def lookup(self, question_vector, doc_ids):
+        """Devolve a resposta guardada para uma pergunta semelhante, ou None."""
+        doc_key = tuple(sorted(doc_ids))
+        query = self._unit(question_vector)
+        now = time.time()
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            for entry_id, entry in list(self.entries.items()):
+                if now - entry["created"] > self.ttl:
+                    del self.entries[entry_id]
+                    continue
+                if entry["doc_key"] != doc_key:
+                    continue
+                score = float(np.dot(query, entry["vector"]))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(best_id)
+            return self.entries[best_id]["answer"]
+
+    def store(self, question_vector, doc_ids, answer):
+        with self._lock:
+            self.entries[self._next_id] = {
+                "vector": self._unit(question_vector),
+                "doc_key": tuple(sorted(doc_ids)),
+                "answer": answer,
+                "created": time.time(),
+            }
+            self._next_id += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self.entries),
+        }
+
+
+def replay_answer(answer, words_per_chunk=4):
+    """Devolve uma resposta guardada em pedaços `AIMessageChunk`, como o `chain.stream`."""
+    words = answer.split(" ")
+    for start in range(0, len(words), words_per_chunk):
+        piece = " ".join(words[start:start + words_per_chunk])
+        yield AIMessageChunk(content=piece if start == 0 else " " + piece)
+
+
+def stream_with_cache(cache, chain, inputs, question_vector, doc_ids, info=None):
+    """
+    Faz o streaming da resposta, usando o cache quando possível.
+
+    Funciona com qualquer `chain` que tenha `.stream(inputs)` e devolva pedaços com
+    `.content` (por exemplo, um `FakeListChatModel` nos testes). Só as respostas
+    completas são guardadas. Se for dado, `info["cache_hit"]` indica se a resposta veio do cache.
+    """
+    answer = cache.lookup(question_vector, doc_ids)
+    if info is not None:
+        info["cache_hit"] = answer is not None
+    if answer is not None:
+        yield from replay_answer(answer)
+        return
+
+    parts = []
+    for partial_response in chain.stream(inputs):
+        parts.append(str(partial_response.content))
+        yield partial_response
+    cache.store(question_vector, doc_ids, "".join(parts))
+
+
+async def astream_with_cache(cache, chain, inputs, question_vector, doc_ids, info=None):
+    """Versão assíncrona de `stream_with_cache`, com `chain.astream`."""
+    answer = cache.lookup(question_vector, doc_ids)
+    if info is not None:
+        info["cache_hit"] = answer is not None
+    if answer is not None:
+        for chunk in replay_answer(answer):
+            yield chunk
+        return
+
+    parts = []
+    async for partial_response in chain.astream(inputs):
+        parts.append(str(partial_response.content))
+        yield partial_response
+    cache.store(question_vector, doc_ids, "".join(parts))
@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import contextlib
+import uuid
+
+from dotenv import load_dotenv, find_dotenv
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from rag_pipeline import load_pipeline
+
+# Carrega variáveis de ambiente
+_ = load_dotenv(find_dotenv())
+
+
+async def chat(request):
+    """POST /chat {"question": ..., "session_id": ...}: devolve a resposta em streaming (texto)."""
+    try:
+        body = await request.json()
+    except ValueError:
+        body = None
+    if not isinstance(body, dict):
+        return JSONResponse({"error": "O corpo do pedido tem de ser um objeto JSON."}, status_code=400)
+    question = str(body.get("question") or "").strip()
+    if not question:
+        return JSONResponse({"error": "Falta a pergunta ('question')."}, status_code=400)
+
+    session_id = str(body.get("session_id") or uuid.uuid4().hex)
+    stream = request.app.state.pipeline.astream(question, session_id)
+    return StreamingResponse(stream, media_type="text/plain; charset=utf-8", headers={"X-Session-Id": session_id})
+
+
+async def health(request):
+    pipeline = request.app.state.pipeline
+    return JSONResponse({"status": "ok", "index_loaded": pipeline.store is not None})
+
+
+async def stats(request):
+    pipeline = request.app.state.pipeline
+    return JSONResponse({"sessions": len(pipeline.sessions), "answer_cache": pipeline.answer_cache.stats()})
+
+
+async def metrics(request):
+    """Métricas no formato de texto do Prometheus (tempos por etapa, tokens, acertos do cache)."""
+    return PlainTextResponse(request.app.state.pipeline.metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def create_app(pipeline=None, csv_path="scraped_data.csv"):
+    """
+    Cria a aplicação ASGI. O pipeline (índice, modelos, caches) é carregado uma
+    única vez no arranque, ou recebido já criado (por exemplo, com um LLM stub).
+    """
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        app.state.pipeline = pipeline or await asyncio.to_thread(load_pipeline, csv_path)
+        yield
+        app.state.pipeline.executor.shutdown(wait=False)
+
+    routes = [
+        Route("/chat", chat, methods=["POST"]),
+        Route("/health", health),
+        Route("/stats", stats),
+        Route("/metrics", metrics),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serviço de chat RAG (ASGI) com respostas em streaming.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,90 @@
+"""
+Compara o chunker antigo (iterrows + dicts, CSV) com o chunker em lotes (Parquet).
+
+Gera um corpus sintético com o formato do `scraped_data.csv` (por omissão 100 mil
+páginas de ~5000 caracteres) numa pasta temporária:
+
+    python benchmarks/bench_chunking.py --pages 100000
+    python benchmarks/bench_chunking.py --pages 100000 --unit tokens --size 256 --overlap 32
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chunking import iter_chunks, write_parquet  # noqa: E402
+from local_site import WORDS  # noqa: E402
+from memory_usage import peak_memory_mb  # noqa: E402
+
+
+def make_corpus(path, pages, chars=5000):
+    rng = random.Random(42)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["url", "title", "content", "links", "changed"])
+        for n in range(pages):
+            words = []
+            length = 0
+            while length < chars:
+                word = rng.choice(WORDS)
+                words.append(word)
+                length += len(word) + 1
+            writer.writerow([f"https://example.com/page/{n}", f"Página {n}", " ".join(words)[:chars], "", "True"])
+
+
+def legacy_chunking(csv_path, output_path, size):
+    """Implementação anterior do chunking.py."""
+    df = pd.read_csv(csv_path)
+
+    def chunk_text(text, size):
+        words = text.split()
+        for i in range(0, len(words), size):
+            yield " ".join(words[i:i + size])
+
+    chunked_data = []
+    for index, row in df.iterrows():
+        for i, chunk in enumerate(chunk_text(row["content"], size)):
+            chunked_data.append({"url": row["url"], "title": row["title"], "chunk_id": i + 1, "chunk_content": chunk})
+    pd.DataFrame(chunked_data).to_csv(output_path, index=False, encoding="utf-8")
+    return len(chunked_data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100000)
+    parser.add_argument("--unit", choices=["words", "tokens"], default="words")
+    parser.add_argument("--size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=0)
+    parser.add_argument("--skip-legacy", action="store_true", help="Não corre a implementação antiga")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "scraped_data.csv")
+        make_corpus(csv_path, args.pages)
+        print(f"Corpus: {args.pages} páginas ({os.path.getsize(csv_path) / 1024 / 1024:.0f} MB)")
+
+        # O pico de memória do processo só cresce, por isso o chunker novo corre primeiro
+        start = time.perf_counter()
+        chunks = iter_chunks(csv_path, size=args.size, overlap=args.overlap, unit=args.unit)
+        total = write_parquet(chunks, os.path.join(tmp, "chunked_data.parquet"))
+        elapsed = time.perf_counter() - start
+        print(f"Chunker em lotes ({args.unit}): {total} chunks em {elapsed:.1f}s "
+              f"-> {args.pages / elapsed:.0f} páginas/s, pico de memória {peak_memory_mb():.0f} MB")
+
+        if not args.skip_legacy:
+            start = time.perf_counter()
+            total = legacy_chunking(csv_path, os.path.join(tmp, "chunked_data.csv"), args.size)
+            elapsed = time.perf_counter() - start
+            print(f"Chunker antigo (iterrows, palavras): {total} chunks em {elapsed:.1f}s "
+                  f"-> {args.pages / elapsed:.0f} páginas/s, pico de memória {peak_memory_mb():.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Mede chunks/s e pico de memória de cada backend do motor de embeddings.
+
+Cada backend corre num processo separado, para que o pico de memória de um não
+contamine o seguinte. Os backends ONNX precisam do modelo exportado:
+
+    python embedding_engine.py --output models/all-MiniLM-L6-v2-onnx
+    python benchmarks/bench_embeddings.py --model-dir models/all-MiniLM-L6-v2-onnx --chunks 5000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from embedding_engine import BACKENDS, EmbeddingEngine  # noqa: E402
+from local_site import WORDS  # noqa: E402
+from memory_usage import peak_memory_mb  # noqa: E402
+
+
+def make_chunks(count):
+    """Chunks sintéticos com comprimentos variados, como os de um site real."""
+    rng = random.Random(42)
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 180))) for _ in range(count)]
+
+
+def run_worker(args):
+    engine = EmbeddingEngine(backend=args.backend, model_dir=args.model_dir, batch_size=args.batch_size,
+                             num_threads=args.threads, sort_by_length=not args.no_sort)
+    chunks = make_chunks(args.chunks)
+    engine.embed_array(chunks[:args.batch_size])  # Aquecimento
+
+    start = time.perf_counter()
+    engine.embed_array(chunks)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"chunks_per_second": args.chunks / elapsed, "peak_memory_mb": peak_memory_mb()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    parser.add_argument("--model-dir", help="Pasta com o modelo exportado (backends ONNX)")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--no-sort", action="store_true", help="Desativa a ordenação por tamanho")
+    parser.add_argument("--worker", dest="backend", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        run_worker(args)
+        return
+
+    print(f"{args.chunks} chunks, lotes de {args.batch_size}, {args.threads} threads, "
+          f"ordenação por tamanho: {'não' if args.no_sort else 'sim'}")
+    for backend in args.backends:
+        if backend != "torch" and not args.model_dir:
+            print(f"{backend:>10}: ignorado (falta --model-dir)")
+            continue
+        command = [sys.executable, __file__, "--worker", backend, "--chunks", str(args.chunks),
+                   "--batch-size", str(args.batch_size), "--threads", str(args.threads)]
+        if args.model_dir:
+            command += ["--model-dir", args.model_dir]
+        if args.no_sort:
+            command.append("--no-sort")
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"{backend:>10}: erro\n{result.stderr.strip().splitlines()[-1] if result.stderr else ''}")
+            continue
+        metrics = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{backend:>10}: {metrics['chunks_per_second']:8.1f} chunks/s, "
+              f"pico de memória {metrics['peak_memory_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
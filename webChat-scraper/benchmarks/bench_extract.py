@@ -0,0 +1,71 @@
+"""
+Compara o débito (páginas/s) dos extratores de HTML num conjunto de páginas guardadas.
+
+Usa os ficheiros `.html` da pasta indicada (por omissão `benchmarks/fixtures`,
+algumas páginas escritas à mão com comentários, entidades, scripts e tags por
+fechar); se não existir nenhum, gera páginas sintéticas com `local_site.make_page`.
+As páginas sintéticas são todas iguais na estrutura, por isso nelas só se mede o
+débito, não a concordância entre extratores:
+
+    python benchmarks/bench_extract.py --fixtures pasta_com_html --repeat 3
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from extraction import EXTRACTORS  # noqa: E402
+from local_site import make_page  # noqa: E402
+
+
+def load_fixtures(folder, synthetic_pages):
+    """Devolve (páginas, True se forem sintéticas)."""
+    paths = sorted(glob.glob(os.path.join(folder, "*.html")))
+    if paths:
+        pages = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages.append((path, f.read()))
+        return pages, False
+    return [(f"synthetic/{n}", make_page(n, synthetic_pages, words=3000)) for n in range(synthetic_pages)], True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=os.path.join(os.path.dirname(__file__), "fixtures"))
+    parser.add_argument("--synthetic-pages", type=int, default=300, help="Páginas geradas se não houver fixtures")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages, synthetic = load_fixtures(args.fixtures, args.synthetic_pages)
+    total_mb = sum(len(html.encode("utf-8")) for _, html in pages) / 1024 / 1024
+    print(f"{len(pages)} páginas {'sintéticas' if synthetic else 'de ' + args.fixtures} ({total_mb:.1f} MB de HTML)")
+
+    reference = None
+    for name, extract in EXTRACTORS.items():
+        try:
+            results = [extract(url, html) for url, html in pages[:1]]
+        except ImportError as e:
+            print(f"{name:>12}: indisponível ({e})")
+            continue
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            results = [extract(url, html) for url, html in pages]
+        elapsed = time.perf_counter() - start
+
+        line = f"{name:>12}: {len(pages) * args.repeat / elapsed:8.1f} páginas/s"
+        # Mede a concordância do texto extraído com o primeiro backend (referência)
+        if reference is None:
+            reference = results
+        elif not synthetic:
+            same = sum(a["content"] == b["content"] and a["title"] == b["title"] for a, b in zip(reference, results))
+            line += f" (texto igual ao bs4 em {same / len(results):.0%} das páginas)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compara o débito (páginas/s) do motor assíncrono com o antigo pool de 10 threads.
+
+Corre totalmente offline contra o site local de `local_site.py`:
+
+    python benchmarks/bench_fetch.py --pages 500 --latency 0.05
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from extraction import extract_page  # noqa: E402
+from fetcher import HEADERS, fetch_all  # noqa: E402
+from local_site import serve  # noqa: E402
+
+
+def fetch_url_requests(url, retries=3):
+    """Implementação anterior: um `requests.get` sem sessão por URL."""
+    for _ in range(retries):
+        try:
+            response = requests.get(url, headers=HEADERS, timeout=10)
+            if response.status_code == 200:
+                return extract_page(url, response.text, backend="bs4")
+        except Exception:
+            pass
+    return None
+
+
+def run_thread_pool(urls, workers):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return [result for result in executor.map(fetch_url_requests, urls) if result]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência artificial por pedido (s)")
+    parser.add_argument("--threads", type=int, default=10, help="Threads do pool antigo")
+    parser.add_argument("--concurrency", type=int, default=50, help="Ligações simultâneas do motor assíncrono")
+    args = parser.parse_args()
+
+    with serve(num_pages=args.pages, latency=args.latency) as base_url:
+        urls = [f"{base_url}/page/{n}" for n in range(args.pages)]
+
+        start = time.perf_counter()
+        pages = run_thread_pool(urls, args.threads)
+        elapsed = time.perf_counter() - start
+        print(f"ThreadPool ({args.threads} threads, requests): {len(pages)} páginas em {elapsed:.2f}s "
+              f"-> {len(pages) / elapsed:.1f} páginas/s")
+
+        start = time.perf_counter()
+        pages = fetch_all(urls, concurrency=args.concurrency, per_host=args.concurrency)
+        elapsed = time.perf_counter() - start
+        print(f"AsyncFetcher ({args.concurrency} ligações, aiohttp): {len(pages)} páginas em {elapsed:.2f}s "
+              f"-> {len(pages) / elapsed:.1f} páginas/s")
+
+
+if __name__ == "__main__":
+    main()
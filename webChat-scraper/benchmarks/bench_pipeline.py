@@ -0,0 +1,53 @@
+"""
+Mede o débito do pipeline de scraping com diferentes números de processos de parsing.
+
+Corre offline contra o site local de `local_site.py`, escrevendo para um CSV temporário:
+
+    python benchmarks/bench_pipeline.py --pages 2000 --parse-workers 0 1 2 4
+
+O pool de processos só compensa quando o parsing pesa mais do que os downloads
+e há CPUs livres: páginas grandes (`--words`), o extrator bs4 e várias CPUs. Com
+páginas pequenas ou uma só CPU, `--parse-workers 0` (o valor por omissão do
+scraping.py) é tão ou mais rápido.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from local_site import serve  # noqa: E402
+from pipeline import stream_to_csv  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=1500, help="Palavras por página (mais palavras = mais CPU no parsing)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Latência artificial por pedido (s)")
+    parser.add_argument("--fetch-workers", type=int, default=50)
+    parser.add_argument("--parse-workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--parse-batch-size", type=int, default=16)
+    parser.add_argument("--extractor", default="bs4", help="Extrator usado (bs4 é o mais pesado em CPU)")
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}, {args.words} palavras por página, extrator {args.extractor}")
+    with serve(num_pages=args.pages, latency=args.latency, words=args.words) as base_url, tempfile.TemporaryDirectory() as tmp:
+        urls = [f"{base_url}/page/{n}" for n in range(args.pages)]
+        for workers in args.parse_workers:
+            output = os.path.join(tmp, f"scraped_{workers}.csv")
+            start = time.perf_counter()
+            stats = asyncio.run(stream_to_csv(
+                urls, output, parse_workers=workers, parse_batch_size=args.parse_batch_size,
+                extractor=args.extractor, concurrency=args.fetch_workers, per_host=args.fetch_workers,
+            ))
+            elapsed = time.perf_counter() - start
+            print(f"parse_workers={workers}: {stats['written']} páginas em {elapsed:.2f}s "
+                  f"-> {stats['written'] / elapsed:.1f} páginas/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Avalia a pesquisa (densa, BM25, híbrida e híbrida com reranking) sobre o índice guardado.
+
+Reporta recall@k (a página certa aparece entre os k primeiros chunks), MRR e a
+latência por pergunta. As perguntas vêm de um ficheiro JSONL, uma por linha:
+
+    {"query": "Que serviços de consultoria oferecem?", "relevant": ["https://site/servicos"]}
+
+Sem `--queries`, são geradas perguntas sintéticas a partir de excertos de chunks
+do índice (úteis para comparar configurações, mas favorecem o BM25):
+
+    python benchmarks/eval_retrieval.py --queries queries.jsonl --k 1 3 5 10
+    python benchmarks/eval_retrieval.py --rerank-model cross-encoder/mmarco-mMiniLMv2-L12-H384-v1
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv, find_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ann_index import load_index_config  # noqa: E402
+from embedding_cache import EMBEDDING_CACHE_PATH, load_embeddings  # noqa: E402
+from embedding_engine import BACKENDS  # noqa: E402
+from hybrid_retriever import CrossEncoderReranker, HybridRetriever  # noqa: E402
+from index_store import INDEX_DIR, IndexStore  # noqa: E402
+
+
+def load_queries(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def synthetic_queries(store, count, words=8, seed=42):
+    """Usa um excerto de `words` palavras de chunks aleatórios como pergunta."""
+    rng = random.Random(seed)
+    docs = list(store.vectorstore.docstore._dict.values())
+    queries = []
+    for doc in rng.sample(docs, min(count, len(docs))):
+        tokens = doc.page_content.split()
+        start = rng.randint(0, max(len(tokens) - words, 0))
+        queries.append({"query": " ".join(tokens[start:start + words]), "relevant": [doc.metadata["url"]]})
+    return queries
+
+
+def evaluate(retriever, queries, ks):
+    hits = {k: 0 for k in ks}
+    reciprocal_ranks = []
+    latencies = []
+    for item in queries:
+        relevant = set(item["relevant"])
+        start = time.perf_counter()
+        docs = retriever.search(item["query"])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        urls = [doc.metadata.get("url") for doc in docs]
+        rank = next((i for i, url in enumerate(urls, start=1) if url in relevant), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        for k in ks:
+            hits[k] += rank is not None and rank <= k
+
+    latencies.sort()
+    return {
+        "recall": {k: hits[k] / len(queries) for k in ks},
+        "mrr": statistics.mean(reciprocal_ranks),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--queries", help="Ficheiro JSONL com {query, relevant}")
+    parser.add_argument("--num-queries", type=int, default=200, help="Perguntas sintéticas (sem --queries)")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--dense-k", type=int, default=20, help="Candidatos da pesquisa vetorial")
+    parser.add_argument("--sparse-k", type=int, default=20, help="Candidatos do BM25")
+    parser.add_argument("--rerank-model", help="Cross-encoder usado no modo híbrido com reranking")
+    parser.add_argument("--rerank-candidates", type=int, default=20)
+    parser.add_argument("--cache", default=EMBEDDING_CACHE_PATH)
+    parser.add_argument("--backend", choices=BACKENDS)
+    parser.add_argument("--model-dir")
+    args = parser.parse_args()
+
+    load_dotenv(find_dotenv())
+    engine_options = {"backend": args.backend, "model_dir": args.model_dir}
+    embeddings = load_embeddings(path=args.cache,
+                                 **{key: value for key, value in engine_options.items() if value is not None})
+    config, search_params = load_index_config()
+    store = IndexStore(embeddings, index_dir=args.index_dir, model_name=embeddings.model_name,
+                       index_config=config, search_params=search_params)
+    if not (store.exists() and store.load(mmap=True)):
+        sys.exit(f"Não existe um índice compatível em '{args.index_dir}' (correr indexing.py).")
+
+    queries = load_queries(args.queries) if args.queries else synthetic_queries(store, args.num_queries)
+    k = max(args.k)
+    configs = {
+        "dense": HybridRetriever(store, k=k, dense_k=max(args.dense_k, k), mode="dense"),
+        "bm25": HybridRetriever(store, k=k, sparse_k=max(args.sparse_k, k), mode="sparse"),
+        "hybrid": HybridRetriever(store, k=k, dense_k=args.dense_k, sparse_k=args.sparse_k),
+    }
+    if args.rerank_model:
+        configs["hybrid+rerank"] = HybridRetriever(
+            store, k=k, dense_k=args.dense_k, sparse_k=args.sparse_k,
+            reranker=CrossEncoderReranker(args.rerank_model), rerank_candidates=args.rerank_candidates,
+        )
+
+    # Aquecimento (carregamento do modelo, páginas do índice em memory-map)
+    for retriever in configs.values():
+        retriever.search(queries[0]["query"])
+
+    print(f"{len(queries)} perguntas, {len(store.sparse)} chunks, candidatos: denso {args.dense_k}, "
+          f"BM25 {args.sparse_k}")
+    header = " ".join(f"R@{k:<4}" for k in args.k)
+    print(f"{'modo':>14} {header}  MRR    p50 (ms)  p95 (ms)")
+    for name, retriever in configs.items():
+        result = evaluate(retriever, queries, args.k)
+        recalls = " ".join(f"{result['recall'][k]:<6.3f}" for k in args.k)
+        print(f"{name:>14} {recalls} {result['mrr']:.3f} {result['p50_ms']:9.1f} {result['p95_ms']:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
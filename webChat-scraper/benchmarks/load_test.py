@@ -0,0 +1,91 @@
+"""
+Teste de carga do serviço de chat (api.py): várias sessões em simultâneo.
+
+Mede, por pedido, o tempo até ao primeiro pedaço da resposta e o tempo total, e
+reporta p50/p99 e o débito (pedidos/s). Para medir o serviço sem depender da API
+do LLM, arrancar o servidor com o modelo stub:
+
+    LLM_PROVIDER=stub python api.py --port 8000
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --concurrency 32 --requests 500
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+QUESTIONS = [
+    "Que serviços oferecem?",
+    "Quais são as vossas áreas de atuação?",
+    "Como posso entrar em contacto convosco?",
+    "Onde ficam os vossos escritórios?",
+    "Trabalham com empresas de que setores?",
+    "Qual é o horário de funcionamento?",
+]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)] if values else 0.0
+
+
+async def run_session(client, url, questions, counter, results):
+    """Uma sessão faz perguntas seguidas (como um utilizador) até se esgotarem os pedidos."""
+    session_id = uuid.uuid4().hex
+    while counter["remaining"] > 0:
+        counter["remaining"] -= 1
+        question = questions[counter["sent"] % len(questions)]
+        counter["sent"] += 1
+        start = time.perf_counter()
+        first_chunk = None
+        try:
+            async with client.stream("POST", f"{url}/chat", json={"question": question, "session_id": session_id}) as response:
+                response.raise_for_status()
+                async for _ in response.aiter_text():
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - start
+            results["ttft"].append(first_chunk or 0.0)
+            results["total"].append(time.perf_counter() - start)
+        except httpx.HTTPError as e:
+            results["errors"].append(str(e))
+
+
+async def main_async(args):
+    questions = QUESTIONS
+    if args.questions:
+        with open(args.questions, "r", encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    results = {"ttft": [], "total": [], "errors": []}
+    counter = {"remaining": args.requests, "sent": 0}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_session(client, args.url, questions, counter, results)
+                               for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    done = len(results["total"])
+    print(f"{done} pedidos em {elapsed:.2f}s com {args.concurrency} sessões em simultâneo "
+          f"({done / elapsed:.1f} pedidos/s), {len(results['errors'])} erros")
+    for name, label in (("ttft", "primeiro pedaço"), ("total", "resposta completa")):
+        values = [v * 1000 for v in results[name]]
+        print(f"{label:>18}: p50 {percentile(values, 50):8.1f} ms   p99 {percentile(values, 99):8.1f} ms")
+    if results["errors"]:
+        print(f"Primeiro erro: {results['errors'][0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16, help="Sessões em simultâneo")
+    parser.add_argument("--requests", type=int, default=200, help="Total de pedidos")
+    parser.add_argument("--questions", help="Ficheiro com uma pergunta por linha")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
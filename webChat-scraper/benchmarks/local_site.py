@@ -0,0 +1,103 @@
+"""
+Site local para benchmarks offline do scraping.
+
+Serve páginas HTML sintéticas em HTTP/1.1 (keep-alive), com compressão gzip
+quando pedida, ETag (respostas 304) e uma latência artificial por pedido para simular a rede.
+"""
+import gzip
+import hashlib
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "serviços consultoria tecnologia empresa clientes soluções projetos equipa inovação "
+    "software dados cloud segurança suporte contacto sobre nós notícias carreiras parceiros"
+).split()
+
+
+def make_page(n, num_pages, words=1500, links=20):
+    """Gera o HTML determinístico da página `n`."""
+    rng = random.Random(n)
+    paragraphs = []
+    for _ in range(max(1, words // 100)):
+        paragraphs.append("<p>" + " ".join(rng.choice(WORDS) for _ in range(100)) + "</p>")
+    anchors = "".join(
+        f'<li><a href="/page/{rng.randrange(num_pages)}">Página</a></li>' for _ in range(links)
+    )
+    return (
+        "<!DOCTYPE html><html><head>"
+        f"<title>Página {n}</title>"
+        "<style>body { font-family: sans-serif; } .menu { display: flex; }</style>"
+        "<script>window.dataLayer = window.dataLayer || []; function gtag(){dataLayer.push(arguments);}</script>"
+        "</head><body>"
+        f"<header><nav class=\"menu\"><ul>{anchors}</ul></nav></header>"
+        f"<main><h1>Página {n}</h1>{''.join(paragraphs)}</main>"
+        "<footer><p>© Empresa. Todos os direitos reservados.</p></footer>"
+        "</body></html>"
+    )
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Permite ligações keep-alive
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+
+        if not self.path.startswith("/page/"):
+            self.send_error(404)
+            return
+        try:
+            n = int(self.path.rsplit("/", 1)[1])
+        except ValueError:
+            self.send_error(404)
+            return
+
+        body = make_page(n, server.num_pages, words=server.words).encode("utf-8")
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        headers = {"Content-Type": "text/html; charset=utf-8", "ETag": etag}
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
+
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512
+
+
+@contextmanager
+def serve(num_pages=500, latency=0.05, port=0, words=1500):
+    """Arranca o site numa thread e devolve o URL base (ex.: http://127.0.0.1:8123)."""
+    server = SiteServer(("127.0.0.1", port), SiteHandler)
+    server.num_pages = num_pages
+    server.words = words
+    server.latency = latency
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,100 @@
+"""
+Corre um ficheiro de perguntas pelo pipeline de chat e mostra onde o tempo é gasto.
+
+Usa o mesmo pipeline do serviço (rag_pipeline.py), no próprio processo, e imprime
+por etapa (embedding da pergunta, pesquisa, contexto, primeiro token, geração,
+total) a média, p50, p95 e máximo, além dos tokens médios por pedido:
+
+    python benchmarks/replay.py --questions perguntas.txt --llm stub
+    python benchmarks/replay.py --questions perguntas.txt --same-session --output traces.jsonl
+
+O ficheiro tem uma pergunta por linha. Com `--llm stub` não há chamadas ao LLM.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import uuid
+
+from dotenv import load_dotenv, find_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from answer_cache import SemanticAnswerCache  # noqa: E402
+from index_store import INDEX_DIR  # noqa: E402
+from instrumentation import Trace  # noqa: E402
+from rag_pipeline import load_llm, load_pipeline  # noqa: E402
+
+STAGE_ORDER = ["queue_wait", "embed_query", "search", "dense_search", "sparse_search", "rerank", "context",
+               "ttft", "generation", "total"]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def print_breakdown(traces):
+    stages = {}
+    for trace in traces:
+        for name, seconds in trace.stages.items():
+            stages.setdefault(name, []).append(seconds * 1000)
+
+    print(f"\n{'etapa':>14} {'média':>9} {'p50':>9} {'p95':>9} {'máximo':>9}  (ms, {len(traces)} pedidos)")
+    for name in sorted(stages, key=lambda n: STAGE_ORDER.index(n) if n in STAGE_ORDER else len(STAGE_ORDER)):
+        values = stages[name]
+        print(f"{name:>14} {statistics.mean(values):9.1f} {percentile(values, 50):9.1f} "
+              f"{percentile(values, 95):9.1f} {max(values):9.1f}")
+
+    counts = {}
+    for trace in traces:
+        for name, value in trace.counts.items():
+            if name.endswith("_tokens"):
+                counts.setdefault(name, []).append(value)
+    if counts:
+        print("\nTokens médios por pedido: " + ", ".join(
+            f"{name} {statistics.mean(values):.0f}" for name, values in counts.items()))
+    hits = sum(1 for trace in traces if trace.attributes.get("cache_hit"))
+    print(f"Respostas do cache: {hits}/{len(traces)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", required=True, help="Ficheiro com uma pergunta por linha")
+    parser.add_argument("--csv", default="scraped_data.csv")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--llm", choices=["groq", "ollama", "stub"], help="Por omissão LLM_PROVIDER")
+    parser.add_argument("--same-session", action="store_true", help="Todas as perguntas na mesma conversa")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Não reutiliza respostas anteriores")
+    parser.add_argument("--output", help="Guarda os traces (um JSON por linha)")
+    args = parser.parse_args()
+
+    load_dotenv(find_dotenv())
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = [line.strip() for line in f if line.strip()]
+
+    pipeline = load_pipeline(args.csv, args.index_dir, llm=load_llm(args.llm))
+    if args.no_answer_cache:
+        pipeline.answer_cache = SemanticAnswerCache(max_entries=0)
+
+    session_id = uuid.uuid4().hex
+    traces = []
+    for question in questions:
+        if not args.same_session:
+            session_id = uuid.uuid4().hex
+        trace = Trace(session_id)
+        for _ in pipeline.stream(question, session_id, trace=trace):
+            pass
+        traces.append(trace)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for question, trace in zip(questions, traces):
+                f.write(json.dumps({"question": question, **trace.to_dict()},
+                                   ensure_ascii=False) + "\n")
+    print_breakdown(traces)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,161 @@
-import pandas as pd
-import textwrap
+import argparse
+import functools
+import hashlib
 
-df = pd.read_csv("scraped_data.csv")
+import pandas as pd
 
 # Configurar o tamanho do chunk (ajustável conforme o modelo)
-chunk_size = 500  # Aproximado em número de palavras, ajustável
+CHUNK_SIZE = 500  # Em palavras ou tokens, conforme `unit`
+CHUNK_OVERLAP = 0
+TOKEN_ENCODING = "cl100k_base"
+
+
+def url_key(url):
+    """Chave curta e estável para um URL, usada como prefixo dos IDs dos chunks."""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(name=TOKEN_ENCODING):
+    import tiktoken
+    return tiktoken.get_encoding(name)
+
+
+def _windows(length, size, overlap):
+    """Posições de início de cada chunk numa sequência de `length` unidades."""
+    step = size - overlap
+    return range(0, max(length - overlap, 1), step)
+
+
+def _chunk_words(contents, size, overlap):
+    for text in contents:
+        words = text.split()
+        yield [" ".join(words[start:start + size]) for start in _windows(len(words), size, overlap)] if words else []
+
+
+def _char_boundary(enc, tokens, i):
+    """Primeira posição >= i onde o corte tokens[:i] / tokens[i:] não divide um carácter UTF-8."""
+    # Um token que começa com um byte de continuação (10xxxxxx) continua o carácter do anterior
+    while i < len(tokens) and enc.decode_single_token_bytes(tokens[i])[0] & 0xC0 == 0x80:
+        i += 1
+    return i
+
+
+def _chunk_tokens(contents, size, overlap, encoding):
+    enc = get_encoding(encoding)
+    # O tiktoken codifica o lote inteiro em paralelo (threads nativas)
+    token_lists = enc.encode_ordinary_batch(contents)
+    for tokens in token_lists:
+        if not tokens:
+            yield []
+            continue
+        # Os limites avançam até ao fim do carácter, por isso um chunk pode ter mais alguns tokens do que `size`
+        bounds = [(_char_boundary(enc, tokens, start), _char_boundary(enc, tokens, start + size))
+                  for start in _windows(len(tokens), size, overlap)]
+        pieces = [tokens[start:end] for start, end in bounds if start < end]
+        yield [piece.decode("utf-8").strip() for piece in enc.decode_bytes_batch(pieces)]
+
+
+def chunk_columns(urls, titles, contents, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP, unit="words",
+                  encoding=TOKEN_ENCODING):
+    """
+    Divide colunas paralelas (url, title, content) em chunks e devolve-os um a um.
+
+    `unit` pode ser "words" (palavras) ou "tokens" (tokens do tiktoken). Cada chunk
+    tem um `chunk_id` estável, `<hash do url>-<n>`, que não muda entre execuções
+    enquanto o conteúdo da página for o mesmo.
+    """
+    if overlap >= size:
+        raise ValueError("O overlap tem de ser menor do que o tamanho do chunk.")
+    if unit == "words":
+        chunked = _chunk_words(contents, size, overlap)
+    elif unit == "tokens":
+        chunked = _chunk_tokens(contents, size, overlap, encoding)
+    else:
+        raise ValueError(f"Unidade desconhecida: {unit}. Opções: words, tokens")
+
+    for url, title, chunks in zip(urls, titles, chunked):
+        prefix = url_key(url)
+        for i, chunk in enumerate(chunks):
+            yield {
+                "url": url,
+                "title": title,
+                "chunk_id": f"{prefix}-{i}",
+                "chunk_index": i,
+                "chunk_content": chunk,
+            }
 
-# Função para dividir o texto em chunks
-def chunk_text(text, size):
+
+def chunk_records(records, **kwargs):
+    """Divide uma lista de registos {url, title, content} em chunks (ver `chunk_columns`)."""
+    return chunk_columns(
+        [record["url"] for record in records],
+        [record.get("title") or "" for record in records],
+        [record["content"] or "" for record in records],
+        **kwargs,
+    )
+
+
+def iter_chunks(csv_path="scraped_data.csv", batch_size=5000, changed_only=False, **kwargs):
     """
-    Divide um texto em chunks de tamanho `size`.
+    Lê o CSV do scraping em lotes, só com as colunas necessárias, e devolve os chunks um a um.
+
+    Com `changed_only=True` (e a coluna `changed` do scraping.py), só as páginas
+    alteradas desde o crawl anterior são processadas.
     """
-    words = text.split()
-    for i in range(0, len(words), size):
-        yield " ".join(words[i:i + size])
-
-# Criar uma lista para armazenar os chunks
-chunked_data = []
-
-# Iterar pelas linhas do CSV e dividir o conteúdo em chunks
-for index, row in df.iterrows():
-    url = row["url"]
-    title = row["title"]
-    content = row["content"]
-    
-    # Dividir o conteúdo em chunks
-    for i, chunk in enumerate(chunk_text(content, chunk_size)):
-        chunked_data.append({
-            "url": url,
-            "title": title,
-            "chunk_id": i + 1,
-            "chunk_content": chunk
-        })
-
-# Criar um DataFrame com os chunks
-chunked_df = pd.DataFrame(chunked_data)
-
-# Salvar os chunks em um novo CSV (opcional)
-chunked_df.to_csv("chunked_data.csv", index=False, encoding="utf-8")
-
-print("Dados divididos em chunks e salvos em 'chunked_data.csv'")
+    wanted = {"url", "title", "content", "changed"}
+    reader = pd.read_csv(csv_path, usecols=lambda col: col in wanted, dtype=str,
+                         keep_default_na=False, chunksize=batch_size)
+    for batch in reader:
+        if changed_only and "changed" in batch.columns:
+            batch = batch[batch["changed"].str.lower() == "true"]
+        titles = batch["title"] if "title" in batch.columns else [""] * len(batch)
+        yield from chunk_columns(batch["url"].tolist(), list(titles), batch["content"].tolist(), **kwargs)
+
+
+def write_parquet(chunks, output_path, rows_per_group=10000):
+    """Escreve os chunks num ficheiro Parquet, em grupos de linhas, sem os manter todos em memória."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("url", pa.string()),
+        ("title", pa.string()),
+        ("chunk_id", pa.string()),
+        ("chunk_index", pa.int32()),
+        ("chunk_content", pa.string()),
+    ])
+    total = 0
+    buffer = []
+    with pq.ParquetWriter(output_path, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            buffer.append(chunk)
+            if len(buffer) >= rows_per_group:
+                writer.write_table(pa.Table.from_pylist(buffer, schema=schema))
+                total += len(buffer)
+                buffer = []
+        if buffer:
+            writer.write_table(pa.Table.from_pylist(buffer, schema=schema))
+            total += len(buffer)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Divide o conteúdo do scraping em chunks e guarda-os em Parquet.")
+    parser.add_argument("--csv", default="scraped_data.csv", help="CSV gerado pelo scraping.py")
+    parser.add_argument("--output", default="chunked_data.parquet", help="Ficheiro Parquet de saída")
+    parser.add_argument("--unit", choices=["words", "tokens"], default="words", help="Unidade do tamanho dos chunks")
+    parser.add_argument("--size", type=int, default=CHUNK_SIZE, help="Tamanho de cada chunk (palavras ou tokens)")
+    parser.add_argument("--overlap", type=int, default=CHUNK_OVERLAP, help="Sobreposição entre chunks consecutivos")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Linhas do CSV lidas de cada vez")
+    parser.add_argument("--changed-only", action="store_true", help="Só processa as páginas marcadas como alteradas")
+    args = parser.parse_args()
+
+    chunks = iter_chunks(args.csv, batch_size=args.batch_size, changed_only=args.changed_only,
+                         size=args.size, overlap=args.overlap, unit=args.unit)
+    total = write_parquet(chunks, args.output)
+    print(f"{total} chunks guardados em '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import hashlib
+
+from chunking import TOKEN_ENCODING, get_encoding
+
+SUMMARY_PROMPT = (
+    "Atualiza o resumo de uma conversa entre um cliente e o assistente de um website. "
+    "Mantém apenas os factos e pedidos relevantes, em no máximo {max_words} palavras.\n\n"
+    "Resumo atual:\n{summary}\n\nNovas mensagens:\n{messages}\n\nResumo atualizado:"
+)
+
+
+def format_messages(messages):
+    return "\n".join(f"{msg['role'].capitalize()}: {msg['content']}" for msg in messages)
+
+
+def conversation_messages(history):
+    """
+    Mensagens anteriores da conversa, sem a saudação inicial e sem a pergunta atual.
+
+    A saudação (mensagens do assistente antes da primeira pergunta) não traz
+    informação ao modelo, e a pergunta atual já vai no prompt como `{question}`.
+    """
+    first_user = next((i for i, msg in enumerate(history) if msg["role"] == "user"), len(history))
+    messages = history[first_user:]
+    if messages and messages[-1]["role"] == "user":
+        messages = messages[:-1]
+    return messages
+
+
+def extractive_summarizer(summary, messages, max_words=120):
+    """Resumo sem LLM: a primeira frase de cada mensagem, mantendo as mais recentes."""
+    lines = [summary] if summary else []
+    for msg in messages:
+        first_sentence = msg["content"].strip().split("\n")[0].split(". ")[0]
+        lines.append(f"{msg['role'].capitalize()}: {' '.join(first_sentence.split()[:40])}")
+    words = " | ".join(lines).split()
+    return " ".join(words[-max_words:])
+
+
+def llm_summarizer(model):
+    """Resumo feito pelo modelo de chat, só com as mensagens que saíram da janela recente."""
+    def summarize(summary, messages, max_words=120):
+        prompt = SUMMARY_PROMPT.format(max_words=max_words, summary=summary or "(vazio)",
+                                       messages=format_messages(messages))
+        return str(model.invoke(prompt).content).strip()
+    return summarize
+
+
+class RollingSummary:
+    """
+    Resumo incremental das mensagens mais antigas de uma conversa.
+
+    Guarda quantas mensagens já foram resumidas (`covered`), por isso cada
+    mensagem só passa pelo resumidor uma vez, quando sai da janela recente.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.covered = 0
+
+    def update(self, older_messages, summarize, max_words):
+        new_messages = older_messages[self.covered:]
+        if new_messages:
+            self.text = summarize(self.text, new_messages, max_words)
+            self.covered = len(older_messages)
+        return self.text
+
+
+class ContextBuilder:
+    """
+    Monta o contexto do prompt dentro de um orçamento de tokens (contados com o tiktoken).
+
+    O orçamento é preenchido por esta ordem: resumo das mensagens antigas (até
+    `summary_tokens`), as últimas `recent_messages` mensagens (até `history_tokens`,
+    das mais recentes para as mais antigas) e, com o que sobra, os documentos
+    recuperados sem duplicados. O último documento que não cabe é cortado.
+
+    Pelo menos `min_doc_share` do orçamento fica sempre para os documentos: o
+    resumo e o histórico são limitados ao resto, mesmo que `summary_tokens` e
+    `history_tokens` sejam maiores.
+    """
+
+    def __init__(self, budget=3000, recent_messages=4, history_tokens=1000, summary_tokens=200,
+                 summarize=extractive_summarizer, encoding=TOKEN_ENCODING, min_doc_tokens=50, min_doc_share=0.5):
+        if not 0 <= min_doc_share <= 1:
+            raise ValueError("min_doc_share tem de estar entre 0 e 1.")
+        self.budget = budget
+        self.recent_messages = recent_messages
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.summarize = summarize
+        self.encoding = encoding
+        self.min_doc_tokens = min_doc_tokens
+        self.min_doc_share = min_doc_share
+
+    def count(self, text):
+        return len(get_encoding(self.encoding).encode_ordinary(text))
+
+    def truncate(self, text, max_tokens, keep_end=False):
+        enc = get_encoding(self.encoding)
+        tokens = enc.encode_ordinary(text)
+        if len(tokens) <= max_tokens:
+            return text
+        tokens = tokens[-max_tokens:] if keep_end else tokens[:max_tokens]
+        return enc.decode_bytes(tokens).decode("utf-8", errors="ignore").strip()
+
+    @staticmethod
+    def unique_documents(retrieved_docs):
+        """Remove chunks repetidos (mesmo `chunk_id` ou mesmo texto), mantendo a ordem do retriever."""
+        seen = set()
+        unique = []
+        for doc in retrieved_docs:
+            text_key = hashlib.sha1(" ".join(doc.page_content.split()).encode("utf-8")).hexdigest()
+            keys = {text_key, doc.metadata.get("chunk_id") or text_key}
+            if keys & seen:
+                continue
+            seen |= keys
+            unique.append(doc)
+        return unique
+
+    def build(self, retrieved_docs, history, summary=None):
+        """
+        Devolve `(contexto, contagens)`.
+
+        `summary` é o `RollingSummary` da sessão; sem ele, as mensagens fora da
+        janela recente são simplesmente ignoradas.
+        """
+        messages = conversation_messages(history)
+        split = max(len(messages) - self.recent_messages, 0)
+        older, recent = messages[:split], messages[split:]
+
+        # Parte do orçamento que o resumo e o histórico podem usar
+        conversation_budget = self.budget - int(self.budget * self.min_doc_share)
+
+        summary_text = ""
+        summary_limit = min(self.summary_tokens, conversation_budget)
+        if summary is not None and older and summary_limit > 0:
+            # O resumidor trabalha em palavras; o corte final garante o limite em tokens
+            summary_text = summary.update(older, self.summarize, max_words=summary_limit * 3 // 4)
+            summary_text = self.truncate(summary_text, summary_limit, keep_end=True)
+        summary_count = self.count(summary_text)
+
+        history_lines = []
+        history_count = 0
+        history_limit = min(self.history_tokens, conversation_budget - summary_count)
+        for msg in reversed(recent):
+            line = format_messages([msg])
+            tokens = self.count(line)
+            if history_count + tokens > history_limit:
+                break
+            history_lines.insert(0, line)
+            history_count += tokens
+
+        docs = self.unique_documents(retrieved_docs)
+        doc_budget = self.budget - summary_count - history_count
+        doc_texts = []
+        doc_count = 0
+        for doc in docs:
+            remaining = doc_budget - doc_count
+            tokens = self.count(doc.page_content)
+            if tokens <= remaining:
+                doc_texts.append(doc.page_content)
+                doc_count += tokens
+            else:
+                if remaining >= self.min_doc_tokens:
+                    doc_texts.append(self.truncate(doc.page_content, remaining))
+                    doc_count += remaining
+                break
+
+        context_docs = "\n".join(doc_texts)
+        history_context = "\n".join(history_lines)
+        if summary_text:
+            history_context = f"Resumo da conversa anterior: {summary_text}\n{history_context}"
+        context = f"{context_docs}\n\nHistórico:\n{history_context}"
+
+        counts = {
+            "documents": len(doc_texts),
+            "duplicate_chunks": len(retrieved_docs) - len(docs),
+            "dropped_chunks": len(docs) - len(doc_texts),
+            "document_tokens": doc_count,
+            "summary_tokens": summary_count,
+            "history_tokens": history_count,
+            "history_messages": len(history_lines),
+            "context_tokens": self.count(context),
+        }
+        return context, counts
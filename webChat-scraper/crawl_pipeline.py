@@ -0,0 +1,145 @@
+import json
+import time
+
+from scrapy import signals
+from twisted.internet import defer, threads
+
+from ann_index import load_index_config
+from embedding_cache import EMBEDDING_CACHE_PATH, load_embeddings
+from index_store import INDEX_DIR, IndexStore
+
+
+class ChunkEmbeddingPipeline:
+    """
+    Pipeline do Scrapy que envia as páginas extraídas diretamente para o índice FAISS.
+
+    As páginas são agrupadas em lotes de `INDEX_BATCH_SIZE`; cada lote é dividido em
+    chunks e convertido em embeddings numa thread, para não bloquear os downloads.
+    Páginas cujo conteúdo não mudou desde a última indexação são ignoradas.
+    A limpeza das páginas em falta e a gravação do índice são feitas no sinal
+    `spider_closed`, o único que indica porque terminou o crawl.
+
+    Definições usadas: INDEX_DIR, INDEX_BATCH_SIZE, INDEX_PRUNE_MISSING,
+    EMBEDDING_CACHE_PATH e CRAWL_STATS_PATH.
+    """
+
+    def __init__(self, index_dir, batch_size, prune_missing, cache_path, stats_path):
+        self.index_dir = index_dir
+        self.batch_size = batch_size
+        self.prune_missing = prune_missing
+        self.cache_path = cache_path
+        self.stats_path = stats_path
+        self.buffer = []
+        self.seen_urls = set()
+        self.pending = []
+        # Passa a True se um lote falhar: o índice fica incompleto e não é gravado
+        self.failed = False
+        # Um lote de cada vez: o índice FAISS não suporta escritas concorrentes
+        self.lock = defer.DeferredLock()
+        self.counts = {"pages": 0, "unchanged": 0, "indexed_pages": 0, "embedded_chunks": 0, "removed_pages": 0}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        pipeline = cls(
+            index_dir=settings.get("INDEX_DIR", INDEX_DIR),
+            batch_size=settings.getint("INDEX_BATCH_SIZE", 32),
+            prune_missing=settings.getbool("INDEX_PRUNE_MISSING", True),
+            cache_path=settings.get("EMBEDDING_CACHE_PATH", EMBEDDING_CACHE_PATH),
+            stats_path=settings.get("CRAWL_STATS_PATH", "crawl_stats.json"),
+        )
+        pipeline.crawler = crawler
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def open_spider(self, spider):
+        self.started = time.perf_counter()
+        self.embeddings = load_embeddings(path=self.cache_path)
+        config, search_params = load_index_config()
+        self.store = IndexStore(self.embeddings, index_dir=self.index_dir, model_name=self.embeddings.model_name,
+                                index_config=config, search_params=search_params)
+        if self.store.exists():
+            self.store.load(mmap=False)
+
+    def _flush(self):
+        batch, self.buffer = self.buffer, []
+        if not batch:
+            return
+
+        def index_batch():
+            chunks = self.store.upsert(batch)
+            self.counts["indexed_pages"] += len(batch)
+            self.counts["embedded_chunks"] += chunks
+
+        def batch_failed(failure):
+            self.failed = True
+            self.crawler.spider.logger.error(f"Erro ao indexar lote: {failure.value}")
+
+        d = self.lock.run(threads.deferToThread, index_batch)
+        d.addErrback(batch_failed)
+        self.pending.append(d)
+
+    def process_item(self, item, spider):
+        record = {"url": item["url"], "title": item["title"], "content": item["content"]}
+        self.seen_urls.add(record["url"])
+        self.counts["pages"] += 1
+
+        if self.store.is_current(record):
+            self.counts["unchanged"] += 1
+        else:
+            self.buffer.append(record)
+            if len(self.buffer) >= self.batch_size:
+                self._flush()
+        return item
+
+    @defer.inlineCallbacks
+    def close_spider(self, spider):
+        self._flush()
+        yield defer.DeferredList(self.pending)
+
+    def spider_closed(self, spider, reason):
+        # Chamado depois de close_spider; só aqui se sabe o motivo do fim do crawl.
+        # Sem inlineCallbacks aqui: o Scrapy escolhe os argumentos pela assinatura.
+        return self._finish(spider, reason)
+
+    @defer.inlineCallbacks
+    def _finish(self, spider, reason):
+        if self.failed:
+            # Os lotes que falharam já tinham apagado os chunks antigos das suas páginas
+            spider.logger.error("Houve lotes que falharam; o índice não foi gravado.")
+        else:
+            # Só remove páginas que desapareceram se o crawl terminou normalmente
+            if self.prune_missing and reason == "finished":
+                removed = [url for url in self.store.pages if url not in self.seen_urls]
+                yield self.lock.run(threads.deferToThread, self.store.delete, removed)
+                self.counts["removed_pages"] = len(removed)
+            yield self.lock.run(threads.deferToThread, self.store.save)
+        self.report(spider, reason)
+
+    def report(self, spider, reason):
+        """Escreve e mostra as estatísticas do crawl e da indexação."""
+        stats = self.crawler.stats.get_stats()
+        elapsed = time.perf_counter() - self.started
+        report = {
+            "finish_reason": reason,
+            "index_saved": not self.failed,
+            "elapsed_seconds": round(elapsed, 2),
+            "requests": stats.get("downloader/request_count", 0),
+            "responses": stats.get("downloader/response_count", 0),
+            "pages_per_second": round(self.counts["pages"] / elapsed, 2) if elapsed else 0.0,
+            "max_depth": stats.get("request_depth_max", 0),
+            "offsite_filtered": stats.get("offsite/filtered", 0),
+            "errors": stats.get("log_count/ERROR", 0),
+            **self.counts,
+            "embedding_cache": self.embeddings.stats(),
+        }
+        with open(self.stats_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+        spider.logger.info(
+            f"Crawl terminado: {report['pages']} páginas em {report['elapsed_seconds']}s "
+            f"({report['pages_per_second']} páginas/s), profundidade máxima {report['max_depth']}, "
+            f"{report['indexed_pages']} páginas indexadas ({report['embedded_chunks']} chunks), "
+            f"{report['unchanged']} sem alterações, {report['removed_pages']} removidas. "
+            f"Relatório em {self.stats_path}"
+        )
@@ -0,0 +1,87 @@
+import hashlib
+import sqlite3
+import time
+
+CRAWL_STATE_PATH = "crawl_state.sqlite"
+
+
+def body_hash(body):
+    """Hash SHA-256 do corpo (bytes) da resposta HTTP."""
+    return hashlib.sha256(body).hexdigest()
+
+
+class CrawlState:
+    """
+    Estado do crawl guardado em SQLite: ETag, Last-Modified e hash do corpo de cada URL.
+
+    Guarda também a última página processada, para que um URL que não mudou
+    (resposta 304 ou hash igual) possa ser reescrito no CSV sem voltar a ser processado.
+    """
+
+    def __init__(self, path=CRAWL_STATE_PATH, commit_every=100):
+        self.commit_every = commit_every
+        self._pending = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " body_hash TEXT,"
+            " title TEXT,"
+            " content TEXT,"
+            " links TEXT,"
+            " fetched_at REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, url):
+        row = self._conn.execute(
+            "SELECT etag, last_modified, body_hash, title, content, links FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, stored_hash, title, content, links = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body_hash": stored_hash,
+            "page": {"url": url, "title": title, "content": content, "links": links},
+        }
+
+    def conditional_headers(self, entry):
+        """Cabeçalhos If-None-Match / If-Modified-Since a partir do estado guardado."""
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def update(self, url, page, etag=None, last_modified=None, body_hash=None):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, etag, last_modified, body_hash, page["title"], page["content"], page["links"], time.time()),
+        )
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.commit()
+
+    def touch(self, url):
+        """Regista que o URL foi verificado, sem alterar o conteúdo guardado."""
+        self._conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+        self._pending += 1
+
+    def clear(self):
+        """Apaga todo o estado guardado (força um crawl completo)."""
+        self._conn.execute("DELETE FROM pages")
+        self.commit()
+
+    def commit(self):
+        self._conn.commit()
+        self._pending = 0
+
+    def close(self):
+        self.commit()
+        self._conn.close()
@@ -1,15 +1,28 @@
+import argparse
 import scrapy
 from scrapy.crawler import CrawlerProcess
-from urllib.parse import urljoin  # Para manipular links relativos
+from urllib.parse import urljoin, urlsplit  # Para manipular links relativos
 from dotenv import load_dotenv, find_dotenv
 import os
 
+from extraction import get_extractor
+from index_store import INDEX_DIR
+
+
 class ScrapeSpider(scrapy.Spider):
     load_dotenv(find_dotenv())
     name = os.getenv('NAME_URL_SCRAPING')
     start_urls = [os.getenv('URL_SCRAPING')]
 
+    # Modo integrado: segue os links do próprio domínio e extrai o conteúdo de cada página
+    follow_links = False
+    extractor = "auto"
+
     def parse(self, response):
+        if self.follow_links:
+            yield from self.parse_page(response)
+            return
+
         # Extrair links e converter para URLs absolutas
         raw_links = response.css("a::attr(href)").getall()
         links = [urljoin(response.url, link) for link in raw_links if link]
@@ -22,12 +35,59 @@ class ScrapeSpider(scrapy.Spider):
             "links": links,
         }
 
-# Configurar o processo do Scrapy
-process = CrawlerProcess(settings={
-    "FEEDS": {"output.json": {"format": "json", "overwrite": True}},  # Substitui conteúdo
-    "LOG_LEVEL": "INFO",  # Configuração do log
-})
+    def parse_page(self, response):
+        if not isinstance(response, scrapy.http.TextResponse):
+            return  # PDFs, imagens, etc.
+
+        page = get_extractor(self.extractor)(response.url, response.text)
+        yield page
+
+        # Seguir os links; o OffsiteMiddleware descarta os que estão fora de `allowed_domains`
+        for link in page["links"].split("; "):
+            if link and not link.startswith(("mailto:", "tel:", "javascript:", "#")):
+                yield response.follow(link, callback=self.parse)
+
+
+def main():
+    load_dotenv(find_dotenv())
+    parser = argparse.ArgumentParser(description="Crawl do website.")
+    parser.add_argument("--mode", choices=["links", "index"], default="links",
+                        help="links: guarda só os links em output.json; "
+                             "index: segue os links, extrai o conteúdo e indexa-o diretamente no FAISS")
+    parser.add_argument("--depth", type=int, default=0, help="Profundidade máxima do crawl (0 = sem limite)")
+    parser.add_argument("--domain", action="append",
+                        help="Domínio permitido (pode repetir-se; por omissão o domínio de URL_SCRAPING)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Pedidos simultâneos")
+    parser.add_argument("--per-domain", type=int, default=8, help="Pedidos simultâneos por domínio")
+    parser.add_argument("--batch-size", type=int, default=32, help="Páginas por lote de embeddings (modo index)")
+    parser.add_argument("--index-dir", default=INDEX_DIR, help="Pasta do índice FAISS (modo index)")
+    parser.add_argument("--stats", default="crawl_stats.json", help="Relatório de estatísticas (modo index)")
+    args = parser.parse_args()
+
+    settings = {
+        "LOG_LEVEL": "INFO",  # Configuração do log
+        "CONCURRENT_REQUESTS": args.concurrency,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": args.per_domain,
+        "DEPTH_LIMIT": args.depth,
+    }
+    if args.mode == "links":
+        settings["FEEDS"] = {"output.json": {"format": "json", "overwrite": True}}  # Substitui conteúdo
+        spider_kwargs = {}
+    else:
+        settings.update({
+            "ITEM_PIPELINES": {"crawl_pipeline.ChunkEmbeddingPipeline": 300},
+            "INDEX_DIR": args.index_dir,
+            "INDEX_BATCH_SIZE": args.batch_size,
+            "CRAWL_STATS_PATH": args.stats,
+        })
+        domains = args.domain or [urlsplit(os.getenv('URL_SCRAPING')).hostname]
+        spider_kwargs = {"follow_links": True, "allowed_domains": domains}
+
+    # Configurar o processo do Scrapy
+    process = CrawlerProcess(settings=settings)
+    process.crawl(ScrapeSpider, **spider_kwargs)
+    process.start()
 
 
-process.crawl(ScrapeSpider)
-process.start()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from embedding_engine import load_engine
+
+EMBEDDING_CACHE_PATH = "embedding_cache.sqlite"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+
+
+def cache_key(model_name, text):
+    """Chave do cache: hash do nome do modelo e do texto do chunk."""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Cache de embeddings em SQLite, partilhado entre reconstruções do índice.
+
+    Os vetores são guardados como float32 e indexados pelo hash do texto e do
+    modelo, por isso chunks repetidos (cabeçalhos, rodapés, banners de cookies)
+    e páginas que não mudaram num novo crawl não voltam a passar pelo modelo.
+    Quando o cache ultrapassa `max_bytes`, as entradas usadas há mais tempo são removidas.
+    """
+
+    def __init__(self, embeddings, model_name, path=EMBEDDING_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        # Total de bytes no cache, somado uma vez aqui e depois atualizado a cada escrita
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+    def _select(self, column, keys):
+        """Pares (key, `column`) das chaves indicadas que estão no cache."""
+        # O SQLite limita o número de parâmetros por consulta
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            yield from self._conn.execute(f"SELECT key, {column} FROM embeddings WHERE key IN ({placeholders})", batch)
+
+    def _lookup(self, keys):
+        return {key: np.frombuffer(blob, dtype=np.float32).tolist() for key, blob in self._select("vector", keys)}
+
+    def _insert(self, rows):
+        # Outra thread pode já ter inserido algumas destas chaves; o REPLACE troca o seu tamanho
+        replaced = sum(size for _, size in self._select("size", [key for key, _, _, _ in rows]))
+        self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+        self._bytes += sum(size for _, _, size, _ in rows) - replaced
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes:
+            return
+        # Remove as entradas menos usadas até ficar em 90% do limite
+        excess = self._bytes - int(self.max_bytes * 0.9)
+        to_delete = []
+        for key, size in self._conn.execute("SELECT key, size FROM embeddings ORDER BY last_used"):
+            if excess <= 0:
+                break
+            to_delete.append((key,))
+            excess -= size
+            self._bytes -= size
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", to_delete)
+
+    def embed_documents(self, texts):
+        keys = [cache_key(self.model_name, text) for text in texts]
+        with self._lock:
+            found = self._lookup(list(set(keys)))
+
+        # Textos repetidos dentro do mesmo lote só são calculados uma vez
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        # Atualiza a data de uso antes de inserir, para não remover entradas acabadas de usar
+        hit_keys = [(time.time(), key) for key in set(keys) - set(missing)]
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+            if hit_keys:
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", hit_keys)
+                self._conn.commit()
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            now = time.time()
+            rows = []
+            for key, vector in zip(missing, vectors):
+                found[key] = list(vector)
+                blob = np.asarray(vector, dtype=np.float32).tobytes()
+                rows.append((key, blob, len(blob), now))
+            with self._lock:
+                self._insert(rows)
+                self._evict()
+                self._conn.commit()
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        # As perguntas dos utilizadores raramente se repetem; não vale a pena guardá-las
+        return self.embeddings.embed_query(text)
+
+    def stats(self):
+        """Devolve contadores de acertos/falhas e a ocupação atual do cache."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            hits, misses, size = self.hits, self.misses, self._bytes
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+def load_embeddings(path=EMBEDDING_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, **engine_kwargs):
+    """Cria o motor de embeddings (configurado pelas variáveis EMBEDDING_*) já envolvido no cache."""
+    engine = load_engine(**engine_kwargs)
+    return CachedEmbeddings(engine, model_name=engine.model_name, path=path, max_bytes=max_bytes)
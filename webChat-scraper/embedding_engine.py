@@ -0,0 +1,170 @@
+import argparse
+import os
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+BACKENDS = ["torch", "onnx", "onnx-int8"]
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model_int8.onnx"}
+
+
+class TorchBackend:
+    """Modelo sentence-transformers em PyTorch (CPU)."""
+
+    def __init__(self, model, num_threads, max_length):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.model = SentenceTransformer(model, device="cpu")
+        self.model.max_seq_length = max_length
+
+    def encode(self, texts):
+        # O lote já vem ordenado e com o tamanho certo; o modelo não volta a dividi-lo
+        return self.model.encode(texts, batch_size=len(texts), normalize_embeddings=True,
+                                 convert_to_numpy=True, show_progress_bar=False)
+
+
+class OnnxBackend:
+    """
+    Modelo exportado para ONNX (opcionalmente quantizado em int8), a partir de uma pasta local.
+
+    A pasta tem de conter `tokenizer.json` e `model.onnx` / `model_int8.onnx`
+    (ver `export_onnx`). O pooling (média) e a normalização L2 são os do
+    sentence-transformers, por isso os vetores são comparáveis aos do PyTorch.
+    """
+
+    def __init__(self, model_dir, filename, num_threads, max_length):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = Path(model_dir)
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()  # Completa até ao texto mais longo de cada lote
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(model_dir / filename), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, inputs)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+
+class EmbeddingEngine(Embeddings):
+    """
+    Motor de embeddings para CPU, com lotes configuráveis ordenados por tamanho.
+
+    Os textos são ordenados pelo comprimento antes de serem agrupados em lotes,
+    para reduzir o padding, e devolvidos pela ordem original. O `backend` pode
+    ser "torch" (sentence-transformers), "onnx" ou "onnx-int8"; os dois últimos
+    carregam o modelo exportado de `model_dir`.
+    """
+
+    def __init__(self, model=EMBEDDING_MODEL, backend="torch", model_dir=None, batch_size=64,
+                 num_threads=None, max_length=256, sort_by_length=True):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend desconhecido: {backend}. Opções: {', '.join(BACKENDS)}")
+        self.backend_name = backend
+        self.batch_size = batch_size
+        self.sort_by_length = sort_by_length
+        if backend == "torch":
+            self.backend = TorchBackend(model_dir or model, num_threads, max_length)
+        else:
+            if not model_dir:
+                raise ValueError("Os backends ONNX precisam de `model_dir` (exportar com `python embedding_engine.py --output <pasta>`).")
+            self.backend = OnnxBackend(model_dir, ONNX_FILES[backend], num_threads, max_length)
+
+        # Vetores de backends diferentes não são idênticos: o nome entra na chave do cache e do índice
+        self.model_name = model if backend == "torch" else f"{model}@{backend}"
+
+    def embed_array(self, texts):
+        """Devolve os embeddings como matriz float32 (n_textos x dimensão)."""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self.sort_by_length:
+            order = np.argsort([len(text) for text in texts], kind="stable")
+        else:
+            order = np.arange(len(texts))
+        batches = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = [texts[i] for i in order[start:start + self.batch_size]]
+            batches.append(np.asarray(self.backend.encode(batch), dtype=np.float32))
+        sorted_vectors = np.vstack(batches)
+
+        vectors = np.empty_like(sorted_vectors)
+        vectors[order] = sorted_vectors
+        return vectors
+
+    def embed_documents(self, texts):
+        return self.embed_array(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.embed_array([text])[0].tolist()
+
+
+def load_engine(**overrides):
+    """Cria o motor a partir das variáveis de ambiente EMBEDDING_* (ver env_example)."""
+    threads = os.getenv("EMBEDDING_THREADS")
+    config = {
+        "model": os.getenv("EMBEDDING_MODEL", EMBEDDING_MODEL),
+        "backend": os.getenv("EMBEDDING_BACKEND", "torch"),
+        "model_dir": os.getenv("EMBEDDING_MODEL_DIR") or None,
+        "batch_size": int(os.getenv("EMBEDDING_BATCH_SIZE", "64")),
+        "num_threads": int(threads) if threads else None,
+    }
+    config.update(overrides)
+    return EmbeddingEngine(**config)
+
+
+def export_onnx(model, output_dir, quantize=True):
+    """Exporta o modelo para ONNX numa pasta local e, opcionalmente, cria a versão int8."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model)
+    tokenizer.save_pretrained(output_dir)
+    transformer = AutoModel.from_pretrained(model).eval()
+
+    sample = tokenizer(["exemplo de texto"], return_tensors="pt")
+    names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    torch.onnx.export(
+        transformer, tuple(sample[name] for name in names), str(output_dir / ONNX_FILES["onnx"]),
+        input_names=names, output_names=["last_hidden_state"], dynamic_axes=dynamic_axes, opset_version=14,
+    )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(output_dir / ONNX_FILES["onnx"]), str(output_dir / ONNX_FILES["onnx-int8"]),
+                         weight_type=QuantType.QInt8)
+    return output_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta o modelo de embeddings para ONNX (e int8).")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--output", default="models/all-MiniLM-L6-v2-onnx")
+    parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+    path = export_onnx(args.model, args.output, quantize=not args.no_quantize)
+    print(f"Modelo exportado para '{path}'")
@@ -0,0 +1,188 @@
+import functools
+import importlib
+
+from bs4 import BeautifulSoup
+
+# Limite de caracteres guardados por página
+MAX_CONTENT_CHARS = 5000
+
+# Elementos cujo texto não é visível para o utilizador
+SKIP_TAGS = {"script", "style", "noscript", "template"}
+
+
+class TextBudget:
+    """
+    Acumula texto já normalizado (espaços colapsados) até atingir o limite de caracteres.
+
+    `add` devolve False quando o limite foi atingido, para o extrator parar de ler o documento.
+    """
+
+    def __init__(self, limit=MAX_CONTENT_CHARS):
+        self.limit = limit
+        self.parts = []
+        self.length = 0
+
+    def add(self, text):
+        piece = " ".join(text.split())
+        if piece:
+            self.parts.append(piece)
+            self.length += len(piece) + 1
+        return self.length < self.limit
+
+    def text(self):
+        return " ".join(self.parts)[:self.limit]
+
+
+def _page(url, title, content, page_links):
+    return {
+        "url": url,
+        "title": title.strip() if title and title.strip() else "Sem título",
+        "content": content,
+        "links": "; ".join(set(page_links))  # Remover duplicados e concatenar links com separador
+    }
+
+
+def extract_bs4(url, html, max_chars=MAX_CONTENT_CHARS):
+    """Extrator de referência: árvore completa do BeautifulSoup com `html.parser`."""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(list(SKIP_TAGS)):
+        tag.decompose()
+
+    # Extrair título
+    title = soup.title.string if soup.title else None
+
+    # Extrair conteúdo da página
+    content = soup.get_text(separator=" ").strip()
+    content = " ".join(content.split())[:max_chars]
+
+    # Extrair links (href)
+    page_links = [a.get('href') for a in soup.find_all('a', href=True)]
+    return _page(url, title, content, page_links)
+
+
+def _lxml_text(root):
+    """
+    Texto visível de uma árvore lxml, por ordem do documento.
+
+    O `etree.iterwalk` não devolve comentários nem instruções de processamento,
+    e perdia-se o texto que vem depois deles (o `tail`); aqui percorrem-se os
+    filhos de cada elemento, incluindo esses nós.
+    """
+    if root.text:
+        yield root.text
+    stack = [(root, iter(root))]
+    while stack:
+        element, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if stack and element.tail:
+                yield element.tail
+        elif isinstance(child.tag, str) and child.tag not in SKIP_TAGS:
+            if child.text:
+                yield child.text
+            stack.append((child, iter(child)))
+        elif child.tail:
+            # Comentário, instrução de processamento ou elemento invisível: só conta o texto depois dele
+            yield child.tail
+
+
+def extract_lxml(url, html, max_chars=MAX_CONTENT_CHARS):
+    """Extrator em lxml: percorre a árvore uma vez e pára quando o texto chega ao limite."""
+    import lxml.html
+    from lxml import etree
+
+    try:
+        try:
+            root = lxml.html.document_fromstring(html)
+        except ValueError:
+            # O lxml recusa strings com declaração de encoding
+            root = lxml.html.document_fromstring(html.encode("utf-8"))
+    except etree.ParserError:
+        # Documento vazio (só espaços, por exemplo): página sem título nem conteúdo, como no bs4
+        return _page(url, None, "", [])
+
+    budget = TextBudget(max_chars)
+    for text in _lxml_text(root):
+        if not budget.add(text):
+            break
+
+    title = root.findtext(".//title")
+    page_links = root.xpath("//a/@href")
+    return _page(url, title, budget.text(), page_links)
+
+
+def extract_selectolax(url, html, max_chars=MAX_CONTENT_CHARS):
+    """Extrator em selectolax (lexbor): o mais rápido; pára quando o texto chega ao limite."""
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    budget = TextBudget(max_chars)
+    for node in tree.root.traverse(include_text=True):
+        if node.tag == "-text" and node.parent.tag not in SKIP_TAGS:
+            if not budget.add(node.text(deep=False)):
+                break
+
+    title_node = tree.css_first("title")
+    title = title_node.text() if title_node else None
+    page_links = [a.attributes.get("href") or "" for a in tree.css("a[href]")]
+    return _page(url, title, budget.text(), page_links)
+
+
+# Registo de extratores disponíveis; novos backends podem ser adicionados com `register_extractor`
+EXTRACTORS = {
+    "bs4": extract_bs4,
+    "lxml": extract_lxml,
+    "selectolax": extract_selectolax,
+}
+
+# Ordem de preferência quando o backend é "auto"
+PREFERRED_BACKENDS = ["selectolax", "lxml", "bs4"]
+BACKEND_MODULES = {"bs4": "bs4", "lxml": "lxml.html", "selectolax": "selectolax.lexbor"}
+
+
+def register_extractor(name, func):
+    """Regista um extrator `func(url, html, max_chars) -> dict` com o nome indicado."""
+    EXTRACTORS[name] = func
+
+
+def get_extractor(backend="auto"):
+    """Devolve a função de extração do backend pedido ("auto" escolhe o mais rápido instalado)."""
+    if backend == "auto":
+        backend = _available_backend()
+    if backend not in EXTRACTORS:
+        raise ValueError(f"Extrator desconhecido: {backend}. Opções: {', '.join(EXTRACTORS)}")
+    return EXTRACTORS[backend]
+
+
+@functools.lru_cache(maxsize=None)
+def _available_backend():
+    for name in PREFERRED_BACKENDS:
+        try:
+            importlib.import_module(BACKEND_MODULES[name])
+            return name
+        except ImportError:
+            continue
+    return "bs4"
+
+
+def extract_page(url, html, backend="auto"):
+    """Extrai título, texto visível e links (href) de uma página HTML."""
+    return get_extractor(backend)(url, html)
+
+
+def extract_batch(items, backend="auto"):
+    """
+    Processa um lote de páginas [(url, html), ...] e devolve [(página, erro), ...].
+
+    Pensada para correr num `ProcessPoolExecutor`: enviar lotes em vez de páginas
+    isoladas reduz o custo de serialização entre processos.
+    """
+    extract = get_extractor(backend)
+    results = []
+    for url, html in items:
+        try:
+            results.append((extract(url, html), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
@@ -0,0 +1,214 @@
+import asyncio
+import random
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from crawl_state import body_hash
+from extraction import get_extractor
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
+
+# O aiohttp só descodifica brotli se o pacote estiver instalado
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# Respostas que justificam uma nova tentativa
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class HostLimiter:
+    """Limita o número de pedidos simultâneos e a cadência de pedidos para um host."""
+
+    def __init__(self, max_concurrency, rate=None):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        if self.interval:
+            async with self.lock:
+                now = time.monotonic()
+                wait = self.next_slot - now
+                self.next_slot = max(now, self.next_slot) + self.interval
+            if wait > 0:
+                await asyncio.sleep(wait)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+class AsyncFetcher:
+    """
+    Motor de download assíncrono com um pool de ligações keep-alive partilhado.
+
+    Cada host tem um limite de pedidos simultâneos e, opcionalmente, de pedidos
+    por segundo. Os erros de rede e as respostas 429/5xx são repetidos com
+    backoff exponencial e jitter.
+
+    Com um `CrawlState`, os pedidos são condicionais (ETag/Last-Modified) e as
+    páginas que não mudaram são devolvidas do estado guardado, com `changed=False`.
+    """
+
+    def __init__(self, concurrency=50, per_host=10, rate_per_host=None, retries=3,
+                 backoff_base=0.5, backoff_max=10.0, timeout=10, error_log="errors.log", state=None, extractor="auto"):
+        if retries < 1:
+            raise ValueError(f"retries tem de ser pelo menos 1 (número de tentativas), não {retries}")
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.rate_per_host = rate_per_host
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.error_log = error_log
+        self.state = state
+        self.extract = get_extractor(extractor)
+        self.session = None
+        self.limiters = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host,
+                                         keepalive_timeout=30, ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={**HEADERS, "Accept-Encoding": ACCEPT_ENCODING},
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def _limiter(self, url):
+        host = urlsplit(url).netloc
+        if host not in self.limiters:
+            self.limiters[host] = HostLimiter(self.per_host, self.rate_per_host)
+        return self.limiters[host]
+
+    def _backoff(self, attempt):
+        # "Full jitter": espera aleatória entre 0 e o limite exponencial
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def log_error(self, url, error):
+        with open(self.error_log, "a", encoding="utf-8") as error_log:
+            error_log.write(f"Erro ao processar {url}: {error}\n")
+
+    async def fetch(self, url, headers=None):
+        """
+        Descarrega um URL e devolve {status, body, text, etag, last_modified}, ou None se falhar.
+
+        Uma resposta 304 (Not Modified) é devolvida com `body` e `text` vazios.
+        """
+        error = None
+        for attempt in range(self.retries):
+            try:
+                async with self._limiter(url):
+                    async with self.session.get(url, headers=headers) as response:
+                        if response.status in (200, 304):
+                            body = await response.read() if response.status == 200 else b""
+                            try:
+                                encoding = response.get_encoding()
+                            except (LookupError, RuntimeError):
+                                encoding = "utf-8"
+                            return {
+                                "status": response.status,
+                                "body": body,
+                                "text": body.decode(encoding, errors="replace"),
+                                "etag": response.headers.get("ETag"),
+                                "last_modified": response.headers.get("Last-Modified"),
+                            }
+                        if response.status not in RETRY_STATUS:
+                            self.log_error(url, f"HTTP {response.status}")
+                            return None
+                        error = f"HTTP {response.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            if attempt < self.retries - 1:
+                await asyncio.sleep(self._backoff(attempt))
+        self.log_error(url, error)
+        return None
+
+    async def fetch_raw(self, url):
+        """
+        Descarrega um URL sem processar o HTML.
+
+        Devolve {"page": ...} quando a página guardada pode ser reutilizada (304 ou
+        hash igual), {"raw": ...} quando o HTML tem de ser processado, ou None se falhar.
+        """
+        entry = self.state.get(url) if self.state else None
+        headers = self.state.conditional_headers(entry) if self.state else None
+
+        result = await self.fetch(url, headers=headers)
+        if result is None:
+            return None
+
+        # 304 ou corpo idêntico ao anterior: reaproveita a página guardada sem a processar
+        if entry and result["status"] == 304:
+            self.state.touch(url)
+            return {"page": {**entry["page"], "changed": False}}
+        digest = body_hash(result["body"])
+        if entry and entry["body_hash"] == digest:
+            self.state.update(url, entry["page"], result["etag"], result["last_modified"], digest)
+            return {"page": {**entry["page"], "changed": False}}
+        if result["status"] != 200:
+            return None
+
+        return {"raw": {
+            "url": url,
+            "html": result["text"],
+            "etag": result["etag"],
+            "last_modified": result["last_modified"],
+            "body_hash": digest,
+        }}
+
+    def store(self, raw, page):
+        """Guarda no estado do crawl uma página acabada de processar e marca-a como alterada."""
+        if self.state:
+            self.state.update(raw["url"], page, raw["etag"], raw["last_modified"], raw["body_hash"])
+        return {**page, "changed": True}
+
+    async def fetch_page(self, url):
+        """Descarrega e processa uma página no formato `url,title,content,links,changed`."""
+        fetched = await self.fetch_raw(url)
+        if fetched is None:
+            return None
+        if "page" in fetched:
+            return fetched["page"]
+
+        raw = fetched["raw"]
+        try:
+            page = self.extract(raw["url"], raw["html"])
+        except Exception as e:
+            self.log_error(url, e)
+            return None
+        return self.store(raw, page)
+
+    async def fetch_pages(self, urls, progress=None):
+        """Gerador assíncrono que devolve as páginas à medida que ficam prontas."""
+        tasks = [asyncio.ensure_future(self.fetch_page(url)) for url in urls]
+        for task in asyncio.as_completed(tasks):
+            result = await task
+            if progress:
+                progress.update(1)
+            if result:
+                yield result
+
+
+def fetch_all(urls, progress=None, **kwargs):
+    """Versão síncrona: descarrega todos os URLs e devolve a lista de páginas válidas."""
+    async def run():
+        results = []
+        async with AsyncFetcher(**kwargs) as fetcher:
+            async for page in fetcher.fetch_pages(urls, progress):
+                results.append(page)
+        return results
+
+    return asyncio.run(run())
@@ -0,0 +1,101 @@
+import os
+
+from instrumentation import NULL_TRACE
+
+RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # Multilingue, corre bem em CPU
+
+
+def reciprocal_rank_fusion(result_lists, rrf_k=60):
+    """Combina listas ordenadas de IDs: cada ID soma 1 / (rrf_k + posição) em cada lista."""
+    scores = {}
+    for results in result_lists:
+        for rank, chunk_id in enumerate(results, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class CrossEncoderReranker:
+    """Reordena os candidatos com um cross-encoder pequeno (sentence-transformers, CPU)."""
+
+    def __init__(self, model=RERANK_MODEL, max_length=256, batch_size=32):
+        from sentence_transformers import CrossEncoder
+
+        self.model = CrossEncoder(model, max_length=max_length, device="cpu")
+        self.batch_size = batch_size
+
+    def rerank(self, query, docs, k):
+        if not docs:
+            return []
+        scores = self.model.predict([(query, doc.page_content) for doc in docs], batch_size=self.batch_size,
+                                    show_progress_bar=False)
+        ranked = sorted(zip(scores, range(len(docs))), reverse=True)
+        return [docs[i] for _, i in ranked[:k]]
+
+
+class HybridRetriever:
+    """
+    Pesquisa híbrida: vetorial (FAISS) + lexical (BM25), combinadas por reciprocal rank fusion.
+
+    Cada pesquisa devolve `dense_k` e `sparse_k` candidatos; os `rerank_candidates`
+    melhores da fusão passam pelo `reranker` (se existir) e ficam os `k` primeiros.
+    Com `mode="dense"` ou `mode="sparse"` só é usada uma das pesquisas.
+    """
+
+    def __init__(self, store, k=4, dense_k=20, sparse_k=20, rrf_k=60, reranker=None, rerank_candidates=10,
+                 mode="hybrid"):
+        if mode not in ("hybrid", "dense", "sparse"):
+            raise ValueError(f"Modo desconhecido: {mode}. Opções: hybrid, dense, sparse")
+        self.store = store
+        self.k = k
+        self.dense_k = dense_k
+        self.sparse_k = sparse_k
+        self.rrf_k = rrf_k
+        self.reranker = reranker
+        self.rerank_candidates = rerank_candidates
+        self.mode = mode
+
+    def dense_ids(self, query_vector):
+        docs = self.store.similarity_search_by_vector(query_vector, k=self.dense_k)
+        return [doc.metadata["chunk_id"] for doc in docs]
+
+    def sparse_ids(self, query):
+        return [chunk_id for chunk_id, _ in self.store.sparse.search(query, k=self.sparse_k)]
+
+    def search(self, query, query_vector=None, trace=NULL_TRACE):
+        """
+        Devolve os documentos mais relevantes; `query_vector` evita recalcular o embedding da pergunta.
+
+        O `trace` (ver instrumentation.py) regista o tempo de cada pesquisa e do reranking.
+        """
+        result_lists = []
+        if self.mode != "sparse":
+            if query_vector is None:
+                with trace.stage("embed_query"):
+                    query_vector = self.store.embeddings.embed_query(query)
+            with trace.stage("dense_search"):
+                result_lists.append(self.dense_ids(query_vector))
+        if self.mode != "dense":
+            with trace.stage("sparse_search"):
+                result_lists.append(self.sparse_ids(query))
+
+        fused = reciprocal_rank_fusion(result_lists, self.rrf_k)
+        if self.reranker is None:
+            return self.store.get_documents(fused[:self.k])
+        with trace.stage("rerank"):
+            candidates = self.store.get_documents(fused[:max(self.rerank_candidates, self.k)])
+            return self.reranker.rerank(query, candidates, self.k)
+
+
+def load_retriever(store, **overrides):
+    """Cria o retriever a partir das variáveis de ambiente RETRIEVER_* e RERANK_* (ver env_example)."""
+    rerank_model = os.getenv("RERANK_MODEL", "")
+    config = {
+        "k": int(os.getenv("RETRIEVER_K", "4")),
+        "dense_k": int(os.getenv("RETRIEVER_DENSE_K", "20")),
+        "sparse_k": int(os.getenv("RETRIEVER_SPARSE_K", "20")),
+        "mode": os.getenv("RETRIEVER_MODE", "hybrid"),
+        "rerank_candidates": int(os.getenv("RERANK_CANDIDATES", "10")),
+        "reranker": CrossEncoderReranker(rerank_model) if rerank_model else None,
+    }
+    config.update(overrides)
+    return HybridRetriever(store, **config)
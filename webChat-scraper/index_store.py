@@ -0,0 +1,386 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import faiss
+import numpy as np
+import pandas as pd
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from ann_index import MIN_VECTORS, build_index, set_search_params
+from chunking import chunk_records
+from sparse_index import BM25Index
+
+# Pasta onde ficam o índice FAISS, o docstore, o índice BM25 e o manifesto
+INDEX_DIR = "faiss_index"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 2
+# Fração de vetores adicionados/removidos desde o último treino a partir da qual o índice aproximado é refeito
+RETRAIN_DRIFT = 0.2
+
+
+class StoreRetriever(BaseRetriever):
+    """Retriever do LangChain sobre `IndexStore.similarity_search_by_vector`, que ignora os chunks removidos."""
+
+    store: object
+    k: int = 4
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.store.similarity_search_by_vector(self.store.embeddings.embed_query(query), k=self.k)
+
+
+def content_hash(text):
+    """Devolve o hash SHA-256 do conteúdo de uma página."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_records(csv_path="scraped_data.csv"):
+    """Lê o CSV do scraping e devolve uma lista de registos {url, title, content}."""
+    df = pd.read_csv(csv_path, usecols=lambda col: col in ("url", "title", "content"))
+
+    # Verifica existência da coluna 'content'
+    if "content" not in df.columns:
+        print("ERRO: a coluna 'content' não está presente no CSV!")
+        return []
+
+    df = df.drop_duplicates(subset="url", keep="last")
+    df["content"] = df["content"].fillna("").astype(str)
+    if "title" not in df.columns:
+        df["title"] = ""
+    return df.to_dict("records")
+
+
+class IndexStore:
+    """
+    Índice FAISS persistido em disco, com um manifesto de hashes por URL.
+
+    O manifesto permite comparar um novo crawl com o índice guardado e
+    calcular embeddings apenas das páginas novas ou alteradas, removendo
+    os chunks das páginas que desapareceram.
+
+    `index_config` (ver `ann_index.load_index_config`) escolhe o tipo de índice:
+    exato ("flat") ou aproximado ("ivf-flat", "hnsw", "ivf-pq"). Os índices
+    aproximados são alterados no lugar: o IVF com `add_with_ids`/`remove_ids`
+    e o HNSW (que não remove vetores) com `add_with_ids` e uma lista de IDs
+    removidos, ignorados na pesquisa. O índice só é treinado e construído de
+    novo quando as alterações desde o último treino passam de `retrain_drift`
+    vezes o seu tamanho.
+    """
+
+    def __init__(self, embeddings, index_dir=INDEX_DIR, model_name="", chunk_size=180, chunk_overlap=20,
+                 chunk_unit="words", index_config=None, search_params=None, retrain_drift=RETRAIN_DRIFT):
+        self.embeddings = embeddings
+        self.index_dir = Path(index_dir)
+        self.model_name = model_name
+        self.chunking = {"size": chunk_size, "overlap": chunk_overlap, "unit": chunk_unit}
+        self.index_config = index_config or {"type": "flat"}
+        self.search_params = search_params or {}
+        self.retrain_drift = retrain_drift
+        self.vectorstore = None
+        self.sparse = BM25Index()
+        self.pages = {}  # url -> {"hash": ..., "ids": [...]}
+        self.fingerprint = ""
+        # Índices aproximados: tamanho no último treino, alterações desde então e IDs removidos do HNSW
+        self.ann = {"built_size": 0, "changes": 0}
+        self.tombstones = set()
+        self._selector = None
+
+    # -------------------------------------------------------------------------------
+    # Persistência
+    # -------------------------------------------------------------------------------
+    def exists(self):
+        return (self.index_dir / MANIFEST_FILE).exists() and (self.index_dir / "index.faiss").exists()
+
+    def _read_manifest(self):
+        with open(self.index_dir / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        # Um índice criado com outro modelo de embeddings ou outros chunks não é reaproveitável
+        if (manifest.get("version") != MANIFEST_VERSION or manifest.get("model_name") != self.model_name
+                or manifest.get("chunking") != self.chunking
+                or manifest.get("index", {"type": "flat"}) != self.index_config):
+            print("Manifesto incompatível com a configuração atual; o índice será reconstruído.")
+            return None
+        return manifest
+
+    def load(self, mmap=False):
+        """Carrega o índice do disco. Com `mmap=True` o índice fica só de leitura."""
+        manifest = self._read_manifest()
+        if manifest is None:
+            return False
+
+        io_flags = 0
+        if mmap:
+            io_flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+        try:
+            self.vectorstore = FAISS.load_local(
+                str(self.index_dir), self.embeddings,
+                allow_dangerous_deserialization=True, io_flags=io_flags,
+            )
+        except RuntimeError:
+            if not mmap:
+                raise
+            # Nem todos os tipos de índice suportam memory-mapping
+            self.vectorstore = FAISS.load_local(
+                str(self.index_dir), self.embeddings, allow_dangerous_deserialization=True
+            )
+        if self.search_params:
+            set_search_params(self.vectorstore.index, **self.search_params)
+        self.pages = manifest["pages"]
+        self.fingerprint = manifest["fingerprint"]
+        self.ann = manifest.get("ann", {"built_size": len(self.vectorstore.index_to_docstore_id), "changes": 0})
+        self.tombstones = set(manifest.get("tombstones", []))
+        self._selector = None
+
+        self.sparse = BM25Index.load(str(self.index_dir))
+        if self.sparse is None:
+            # Índices criados antes do BM25: constrói-o a partir do docstore do FAISS
+            self.sparse = BM25Index()
+            self.sparse.add_documents(self.vectorstore.docstore._dict.values())
+        return True
+
+    def save(self):
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.fingerprint = content_hash(
+            "".join(f"{url}:{page['hash']}" for url, page in sorted(self.pages.items()))
+        )
+        if self.vectorstore is not None:
+            if self._needs_rebuild():
+                self._rebuild()
+            self.vectorstore.save_local(str(self.index_dir))
+        self.sparse.save(str(self.index_dir))
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "model_name": self.model_name,
+            "chunking": self.chunking,
+            "index": self.index_config,
+            "fingerprint": self.fingerprint,
+            "pages": self.pages,
+            "ann": self.ann,
+            "tombstones": sorted(self.tombstones),
+        }
+        # Escreve para um ficheiro temporário e substitui, para não deixar um manifesto truncado
+        tmp_path = self.index_dir / f"{MANIFEST_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_dir / MANIFEST_FILE)
+
+    def _is_approximate(self):
+        return self.vectorstore is not None and not isinstance(self.vectorstore.index, faiss.IndexFlat)
+
+    def _needs_rebuild(self):
+        """Indica se o índice aproximado tem de ser (re)treinado antes de guardar."""
+        index_type = self.index_config["type"]
+        if index_type == "flat":
+            return False
+        if not self._is_approximate():
+            # Índice exato enquanto havia poucos vetores: passa a aproximado quando houver que chegue
+            return len(self.vectorstore.index_to_docstore_id) >= MIN_VECTORS[index_type]
+        return self.ann["changes"] > self.retrain_drift * self.ann["built_size"]
+
+    def _rebuild(self):
+        """Treina e constrói o índice de novo com os vetores atuais, renumerados a partir de 0."""
+        mapping = self.vectorstore.index_to_docstore_id
+        faiss_ids = sorted(mapping)
+        vectors = self._vectors(faiss_ids)
+        self.vectorstore.index = build_index(vectors, self.index_config, search_params=self.search_params,
+                                             with_ids=True)
+        self.vectorstore.index_to_docstore_id = {i: mapping[faiss_id] for i, faiss_id in enumerate(faiss_ids)}
+        self.ann = {"built_size": len(faiss_ids), "changes": 0}
+        self.tombstones = set()
+        self._selector = None
+
+    def _vectors(self, faiss_ids, batch_size=10000):
+        """Vetores guardados no índice com os IDs do FAISS indicados."""
+        index = self.vectorstore.index
+        ids = np.asarray(faiss_ids, dtype=np.int64)
+        if isinstance(index, (faiss.IndexFlat, faiss.IndexHNSWFlat, faiss.IndexIDMap2)):
+            # Os índices exatos e o HNSW guardam os vetores completos
+            return index.reconstruct_batch(ids)
+        if isinstance(index, faiss.IndexIVFFlat):
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)
+            try:
+                return index.reconstruct_batch(ids)
+            finally:
+                index.set_direct_map_type(faiss.DirectMap.NoMap)
+        # O IVF-PQ só guarda vetores comprimidos: os exatos vêm do cache de embeddings
+        chunk_ids = [self.vectorstore.index_to_docstore_id[i] for i in faiss_ids]
+        vectors = np.empty((len(chunk_ids), index.d), dtype=np.float32)
+        for start in range(0, len(chunk_ids), batch_size):
+            texts = [doc.page_content for doc in self.get_documents(chunk_ids[start:start + batch_size])]
+            vectors[start:start + len(texts)] = self.embeddings.embed_documents(texts)
+        return vectors
+
+    def _add_approximate(self, documents, ids):
+        """Acrescenta documentos a um índice aproximado, com IDs do FAISS novos."""
+        if isinstance(self.vectorstore.index, faiss.IndexHNSW):
+            # HNSW guardado sem IDs (versão anterior): passa a IndexIDMap2 sem recalcular embeddings
+            self._rebuild()
+        vectors = np.asarray(self.embeddings.embed_documents([doc.page_content for doc in documents]),
+                             dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            faiss.normalize_L2(vectors)
+        mapping = self.vectorstore.index_to_docstore_id
+        start = max([*mapping, *self.tombstones], default=-1) + 1
+        faiss_ids = np.arange(start, start + len(vectors), dtype=np.int64)
+        self.vectorstore.index.add_with_ids(vectors, faiss_ids)
+        self.vectorstore.docstore.add(dict(zip(ids, documents)))
+        mapping.update(zip(faiss_ids.tolist(), ids))
+        self.ann["changes"] += len(ids)
+
+    def _remove_approximate(self, chunk_ids):
+        """Remove chunks de um índice aproximado (no HNSW ficam marcados como removidos)."""
+        if isinstance(self.vectorstore.index, faiss.IndexHNSW):
+            self._rebuild()
+        mapping = self.vectorstore.index_to_docstore_id
+        wanted = set(chunk_ids)
+        found = {faiss_id: chunk_id for faiss_id, chunk_id in mapping.items() if chunk_id in wanted}
+        if not found:
+            return
+        if isinstance(self.vectorstore.index, faiss.IndexIDMap):
+            self.tombstones.update(found)
+            self._selector = None
+        else:
+            self.vectorstore.index.remove_ids(np.fromiter(found, dtype=np.int64, count=len(found)))
+        for faiss_id in found:
+            del mapping[faiss_id]
+        self.vectorstore.docstore.delete(list(found.values()))
+        self.ann["changes"] += len(found)
+
+    def _search_parameters(self):
+        """Parâmetros de pesquisa que excluem os IDs removidos do HNSW (ou None se não houver)."""
+        if not self.tombstones:
+            return None
+        if self._selector is None:
+            removed = np.fromiter(sorted(self.tombstones), dtype=np.int64, count=len(self.tombstones))
+            batch = faiss.IDSelectorBatch(removed)
+            # O seletor do FAISS não guarda referências do lado do Python
+            self._selector = (faiss.IDSelectorNot(batch), batch)
+        return faiss.SearchParameters(sel=self._selector[0])
+
+    def similarity_search_by_vector(self, vector, k=4):
+        """Os `k` chunks mais próximos de `vector`, como o `FAISS.similarity_search_by_vector`."""
+        query = np.asarray([vector], dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            faiss.normalize_L2(query)
+        _, faiss_ids = self.vectorstore.index.search(query, k, params=self._search_parameters())
+        mapping = self.vectorstore.index_to_docstore_id
+        return self.get_documents([mapping[i] for i in faiss_ids[0] if i != -1])
+
+    # -------------------------------------------------------------------------------
+    # Atualização incremental
+    # -------------------------------------------------------------------------------
+    def diff(self, records):
+        """Compara os registos com o manifesto e devolve (novos, alterados, removidos)."""
+        added, changed = [], []
+        seen = set()
+        for record in records:
+            url = record["url"]
+            seen.add(url)
+            page = self.pages.get(url)
+            if page is None:
+                added.append(record)
+            elif page["hash"] != content_hash(record["content"]):
+                changed.append(record)
+        removed = [url for url in self.pages if url not in seen]
+        return added, changed, removed
+
+    def is_current(self, record):
+        """Indica se a página já está no índice com o mesmo conteúdo."""
+        page = self.pages.get(record["url"])
+        return page is not None and page["hash"] == content_hash(record["content"])
+
+    def delete(self, urls):
+        """Remove do índice todos os chunks das páginas indicadas."""
+        ids = []
+        for url in urls:
+            page = self.pages.pop(url, None)
+            if page:
+                ids.extend(page["ids"])
+        if ids and self._is_approximate():
+            self._remove_approximate(ids)
+        elif ids and self.vectorstore is not None:
+            self.vectorstore.delete(ids)
+        self.sparse.delete(ids)
+        return len(ids)
+
+    def upsert(self, records):
+        """Substitui (ou insere) as páginas indicadas, calculando embeddings só destas."""
+        # Se o mesmo URL aparecer mais de uma vez, fica a última versão
+        records = list({record["url"]: record for record in records}.values())
+        self.delete([record["url"] for record in records])
+
+        for record in records:
+            if not record["content"].strip():
+                print(f"A página {record['url']} está vazia na coluna 'content'.")
+            self.pages[record["url"]] = {"hash": content_hash(record["content"]), "ids": []}
+
+        documents = []
+        for chunk in chunk_records(records, **self.chunking):
+            self.pages[chunk["url"]]["ids"].append(chunk["chunk_id"])
+            metadata = {"url": chunk["url"], "title": chunk["title"], "chunk_id": chunk["chunk_id"]}
+            documents.append(Document(page_content=chunk["chunk_content"], metadata=metadata))
+
+        if not documents:
+            return 0
+
+        ids = [doc.metadata["chunk_id"] for doc in documents]
+        if self.vectorstore is None:
+            self.vectorstore = FAISS.from_documents(documents, self.embeddings, ids=ids)
+        elif self._is_approximate():
+            self._add_approximate(documents, ids)
+        else:
+            self.vectorstore.add_documents(documents, ids=ids)
+        self.sparse.add_documents(documents)
+        return len(documents)
+
+    def sync(self, records, mmap=True):
+        """
+        Sincroniza o índice em disco com os registos do último crawl.
+
+        Se nada mudou, o índice é apenas carregado (por omissão em memory-map);
+        caso contrário, só as páginas novas, alteradas ou removidas são processadas.
+        """
+        records = list(records)
+        manifest = self._read_manifest() if self.exists() else None
+        if manifest is not None:
+            self.pages = manifest["pages"]
+        added, changed, removed = self.diff(records)
+        stats = {"added": len(added), "changed": len(changed), "removed": len(removed),
+                 "deleted_chunks": 0, "embedded_chunks": 0}
+
+        if manifest is not None and not (added or changed or removed):
+            self.load(mmap=mmap)
+            return stats
+
+        if manifest is not None:
+            self.load(mmap=False)
+        else:
+            self.vectorstore = None
+            self.sparse = BM25Index()
+            self.pages = {}
+            added, changed, removed = records, [], []
+
+        stats["deleted_chunks"] = self.delete(removed)
+        stats["embedded_chunks"] = self.upsert(added + changed)
+        self.save()
+        return stats
+
+    def get_documents(self, chunk_ids):
+        """Devolve os documentos (chunks) guardados no docstore, pela ordem dos IDs."""
+        docs = (self.vectorstore.docstore.search(chunk_id) for chunk_id in chunk_ids)
+        return [doc for doc in docs if isinstance(doc, Document)]
+
+    def as_retriever(self, search_kwargs=None):
+        """
+        Retriever do LangChain que pesquisa com `similarity_search_by_vector`.
+
+        O `vectorstore.as_retriever` pesquisaria o índice FAISS diretamente e podia
+        devolver chunks já removidos de um HNSW.
+        """
+        if self.vectorstore is None:
+            return None
+        return StoreRetriever(store=self, **(search_kwargs or {}))
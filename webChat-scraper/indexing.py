@@ -0,0 +1,43 @@
+import argparse
+
+from dotenv import load_dotenv, find_dotenv
+
+from embedding_cache import EMBEDDING_CACHE_PATH, load_embeddings
+from ann_index import INDEX_TYPES, load_index_config
+from embedding_engine import BACKENDS
+from index_store import INDEX_DIR, IndexStore, load_records
+
+load_dotenv(find_dotenv())
+
+parser = argparse.ArgumentParser(description="Cria ou atualiza o índice FAISS persistente a partir do CSV do scraping.")
+parser.add_argument("--csv", default="scraped_data.csv", help="CSV gerado pelo scraping.py")
+parser.add_argument("--index-dir", default=INDEX_DIR, help="Pasta onde o índice é guardado")
+parser.add_argument("--cache", default=EMBEDDING_CACHE_PATH, help="Ficheiro SQLite do cache de embeddings")
+parser.add_argument("--cache-max-mb", type=int, default=512, help="Tamanho máximo do cache de embeddings (MB)")
+parser.add_argument("--backend", choices=BACKENDS, help="Backend de embeddings (por omissão EMBEDDING_BACKEND ou torch)")
+parser.add_argument("--model-dir", help="Pasta local do modelo (obrigatória nos backends ONNX)")
+parser.add_argument("--batch-size", type=int, help="Chunks por lote de inferência")
+parser.add_argument("--threads", type=int, help="Threads de CPU usadas pelo modelo")
+parser.add_argument("--index-type", choices=INDEX_TYPES, help="Tipo de índice FAISS (por omissão INDEX_TYPE ou flat)")
+parser.add_argument("--nlist", type=int, help="Listas do IVF (por omissão ~4·√chunks)")
+parser.add_argument("--nprobe", type=int, help="Listas visitadas por pesquisa no IVF")
+parser.add_argument("--pq-m", type=int, help="Sub-quantizadores do IVF-PQ (por omissão dimensão/8)")
+parser.add_argument("--hnsw-m", type=int, help="Ligações por nó do HNSW")
+args = parser.parse_args()
+
+engine_options = {"backend": args.backend, "model_dir": args.model_dir,
+                  "batch_size": args.batch_size, "num_threads": args.threads}
+embeddings = load_embeddings(path=args.cache, max_bytes=args.cache_max_mb * 1024 * 1024,
+                             **{key: value for key, value in engine_options.items() if value is not None})
+index_config, search_params = load_index_config(index_type=args.index_type, nlist=args.nlist, nprobe=args.nprobe,
+                                                 pq_m=args.pq_m, hnsw_m=args.hnsw_m)
+store = IndexStore(embeddings, index_dir=args.index_dir, model_name=embeddings.model_name,
+                   index_config=index_config, search_params=search_params)
+stats = store.sync(load_records(args.csv), mmap=False)
+
+print(f"Páginas novas: {stats['added']}, alteradas: {stats['changed']}, removidas: {stats['removed']}")
+print(f"Chunks com novos embeddings: {stats['embedded_chunks']}")
+cache_stats = embeddings.stats()
+print(f"Cache de embeddings: {cache_stats['hits']} acertos, {cache_stats['misses']} falhas, "
+      f"{cache_stats['entries']} entradas ({cache_stats['bytes'] / 1024 / 1024:.1f} MB)")
+print(f"Índice {index_config['type']} guardado em '{args.index_dir}'")
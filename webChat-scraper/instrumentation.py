@@ -0,0 +1,132 @@
+import contextlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+
+# Limites dos histogramas de latência (segundos), como os do cliente oficial do Prometheus
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+logger = logging.getLogger("rag.trace")
+
+
+class Trace:
+    """
+    Tempos por etapa e contagens de tokens de um pedido de chat.
+
+    `stage(nome)` mede a duração de um bloco; `mark(nome)` regista o tempo desde o
+    início do pedido (por exemplo `ttft`, o tempo até ao primeiro token). Etapas
+    podem estar dentro de outras: `search` inclui `dense_search` e `sparse_search`.
+    """
+
+    def __init__(self, session_id=None, request_id=None):
+        self.request_id = request_id or uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.stages = {}  # etapa -> segundos
+        self.counts = {}
+        self.attributes = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def mark(self, name):
+        self.stages.setdefault(name, time.perf_counter() - self.started)
+
+    def to_dict(self):
+        return {
+            "request_id": self.request_id,
+            "session_id": self.session_id,
+            "timestamp": round(self.timestamp, 3),
+            "stages_ms": {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()},
+            "counts": self.counts,
+            **self.attributes,
+        }
+
+
+class NullTrace:
+    """Trace que não regista nada, para chamadas fora de um pedido (avaliação, benchmarks)."""
+
+    def __init__(self):
+        self.counts = {}
+        self.attributes = {}
+
+    def stage(self, name):
+        return contextlib.nullcontext()
+
+    def mark(self, name):
+        pass
+
+
+NULL_TRACE = NullTrace()
+
+
+class Metrics:
+    """Histogramas de latência por etapa e contadores, exportados no formato de texto do Prometheus."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.histograms = {}  # etapa -> {"buckets": [...], "sum": ..., "count": ...}
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def observe(self, trace):
+        with self._lock:
+            for name, seconds in trace.stages.items():
+                histogram = self.histograms.setdefault(
+                    name, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                )
+                for i, bound in enumerate(self.buckets):
+                    if seconds <= bound:
+                        histogram["buckets"][i] += 1
+                histogram["sum"] += seconds
+                histogram["count"] += 1
+
+            self.counters["requests_total"] += 1
+            for name, value in trace.counts.items():
+                if name.endswith("_tokens"):
+                    self.counters[f"{name}_total"] += value
+            if trace.attributes.get("cache_hit"):
+                self.counters["answer_cache_hits_total"] += 1
+            if trace.attributes.get("status", "ok") != "ok":
+                self.counters[f"requests_{trace.attributes['status']}_total"] += 1
+
+    def render(self):
+        with self._lock:
+            lines = [
+                "# HELP rag_stage_seconds Duração de cada etapa dos pedidos de chat.",
+                "# TYPE rag_stage_seconds histogram",
+            ]
+            for name, histogram in sorted(self.histograms.items()):
+                for bound, count in zip(self.buckets, histogram["buckets"]):
+                    lines.append(f'rag_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+                lines.append(f'rag_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'rag_stage_seconds_sum{{stage="{name}"}} {histogram["sum"]:.6f}')
+                lines.append(f'rag_stage_seconds_count{{stage="{name}"}} {histogram["count"]}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE rag_{name} counter")
+                lines.append(f"rag_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def configure_logging(path=None):
+    """Escreve um JSON por pedido em `path` (ou no stderr). Pode ser chamada mais de uma vez."""
+    if logger.handlers:
+        return
+    handler = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def log_trace(trace):
+    logger.info(json.dumps(trace.to_dict(), ensure_ascii=False))
@@ -0,0 +1,22 @@
+import sys
+
+
+def peak_memory_mb():
+    """Pico de memória residente (RSS) do processo atual, em MB, ou None se indisponível."""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Em Linux o valor vem em KB, em macOS em bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+    # Windows: usa o psutil se estiver instalado
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
@@ -0,0 +1,246 @@
+import asyncio
+import contextlib
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from extraction import extract_batch
+from fetcher import AsyncFetcher
+
+FIELDNAMES = ["url", "title", "content", "links", "changed"]
+
+
+def _last_record_end(f):
+    """Posição (em bytes) do fim do último registo CSV completo de `f` (aberto em modo binário)."""
+    consumed = 0
+    line_complete = False
+
+    def lines():
+        nonlocal consumed, line_complete
+        for line in f:
+            consumed += len(line)
+            line_complete = line.endswith(b"\n")
+            yield line.decode("utf-8", errors="replace")
+
+    end = 0
+    # Com strict=True, um campo entre aspas que não foi fechado (registo cortado) dá erro
+    reader = csv.reader(lines(), strict=True)
+    try:
+        for _ in reader:
+            if line_complete:
+                end = consumed
+    except csv.Error:
+        pass
+    return end
+
+
+def _migrate_header(output_path, header):
+    """Reescreve um CSV com colunas antigas no formato de FIELDNAMES (as colunas em falta ficam vazias)."""
+    tmp_path = f"{output_path}.tmp"
+    with open(output_path, "r", newline="", encoding="utf-8") as src, \
+            open(tmp_path, "w", newline="", encoding="utf-8") as dst:
+        writer = csv.DictWriter(dst, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        for row in csv.DictReader(src):
+            # As páginas antigas não têm estado anterior, por isso contam como alteradas
+            writer.writerow({**row, "changed": row.get("changed") or True})
+    os.replace(tmp_path, output_path)
+    print(f"CSV '{output_path}' convertido das colunas {header} para {FIELDNAMES}.")
+
+
+def completed_urls(output_path):
+    """
+    Lê os URLs já escritos num CSV anterior, para retomar um crawl interrompido.
+
+    Se o último registo ficou incompleto (por exemplo, após um crash), é removido.
+    Um CSV de uma versão anterior, sem algumas colunas, é convertido; um CSV
+    com outras colunas é recusado, para não misturar formatos no mesmo ficheiro.
+    """
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return set()
+
+    # Os campos entre aspas podem ter quebras de linha, por isso o corte segue o parser de CSV
+    with open(output_path, "rb+") as f:
+        end = _last_record_end(f)
+        f.truncate(end)
+    if end == 0:
+        return set()
+
+    with open(output_path, "r", newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f))
+    if header != FIELDNAMES:
+        if set(header) < set(FIELDNAMES):
+            _migrate_header(output_path, header)
+        else:
+            raise ValueError(
+                f"O CSV '{output_path}' tem as colunas {header}, esperadas {FIELDNAMES}. "
+                "Use outro ficheiro de saída ou corra sem --resume."
+            )
+
+    with open(output_path, "r", newline="", encoding="utf-8") as f:
+        return {row["url"] for row in csv.DictReader(f) if row.get("url")}
+
+
+async def _write_rows(queue, output_path, append, stats):
+    """Consome a fila e escreve cada página no CSV assim que chega."""
+    mode = "a" if append else "w"
+    with open(output_path, mode, newline="", encoding="utf-8") as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=FIELDNAMES)
+        if not append:
+            writer.writeheader()
+        while True:
+            page = await queue.get()
+            if page is None:
+                break
+            writer.writerow(page)
+            csvfile.flush()
+            stats["written"] += 1
+            stats["changed"] += bool(page["changed"])
+
+
+async def _watch(awaitable, consumers):
+    """
+    Espera por `awaitable`, mas desiste se uma das tarefas `consumers` terminar antes.
+
+    Os consumidores das filas só terminam no fim, por isso terminar antes é uma
+    falha: `awaitable` é cancelado (senão ficaria bloqueado numa fila cheia) e
+    a exceção do consumidor é lançada.
+    """
+    task = asyncio.ensure_future(awaitable)
+    consumers = [consumer for consumer in consumers if consumer is not None]
+    await asyncio.wait([task, *consumers], return_when=asyncio.FIRST_COMPLETED)
+    if task.done():
+        return task.result()
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+    for consumer in consumers:
+        if consumer.done():
+            consumer.result()
+    raise RuntimeError("Uma tarefa do pipeline terminou antes do fim dos downloads.")
+
+
+async def _parse_batches(parse_queue, write_queue, fetcher, pool, workers, batch_size, extractor):
+    """
+    Agrupa as páginas descarregadas em lotes e processa-as no pool de processos.
+
+    O número de lotes em curso é limitado, para que a memória continue limitada
+    quando o processamento é mais lento do que os downloads.
+    """
+    loop = asyncio.get_running_loop()
+    in_flight = asyncio.Semaphore(workers * 2)
+    tasks = set()
+    errors = []
+
+    async def run_batch(batch):
+        try:
+            items = [(raw["url"], raw["html"]) for raw in batch]
+            results = await loop.run_in_executor(pool, extract_batch, items, extractor)
+            for raw, (page, error) in zip(batch, results):
+                if error is not None:
+                    fetcher.log_error(raw["url"], error)
+                else:
+                    await write_queue.put(fetcher.store(raw, page))
+        finally:
+            in_flight.release()
+
+    def batch_done(task):
+        tasks.discard(task)
+        # Guarda a exceção de um lote que falhou, para a lançar em vez de a perder
+        if not task.cancelled() and task.exception() is not None:
+            errors.append(task.exception())
+
+    try:
+        finished = False
+        while not finished and not errors:
+            batch = []
+            raw = await parse_queue.get()
+            # Junta ao lote o que já estiver na fila, sem esperar por mais páginas
+            while raw is not None:
+                batch.append(raw)
+                if len(batch) >= batch_size or parse_queue.empty():
+                    break
+                raw = parse_queue.get_nowait()
+            finished = raw is None
+            if batch:
+                await in_flight.acquire()
+                task = asyncio.ensure_future(run_batch(batch))
+                tasks.add(task)
+                task.add_done_callback(batch_done)
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if errors:
+            raise errors[0]
+    finally:
+        for task in list(tasks):
+            task.cancel()
+
+
+async def stream_to_csv(urls, output_path, resume=False, queue_size=100, progress=None,
+                        parse_workers=0, parse_batch_size=16, extractor="auto", **fetcher_kwargs):
+    """
+    Descarrega os URLs e escreve as páginas no CSV à medida que ficam prontas.
+
+    Os downloads e a escrita comunicam por uma fila limitada (`queue_size`), por
+    isso a memória usada não cresce com o tamanho do site. Com `resume=True`, os
+    URLs que já estão no CSV são ignorados e as novas linhas são acrescentadas.
+
+    Com `parse_workers > 0`, o HTML é processado num `ProcessPoolExecutor` em lotes
+    de `parse_batch_size` páginas, em paralelo com os downloads; caso contrário é
+    processado no próprio ciclo de eventos.
+    """
+    done = completed_urls(output_path) if resume else set()
+    pending = [url for url in urls if url not in done]
+    stats = {"skipped": len(done), "written": 0, "changed": 0}
+    if progress is not None:
+        progress.total = len(pending)
+        progress.refresh()
+
+    write_queue = asyncio.Queue(maxsize=queue_size)
+    parse_queue = asyncio.Queue(maxsize=queue_size)
+    writer = asyncio.ensure_future(_write_rows(write_queue, output_path, append=bool(done), stats=stats))
+    pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+
+    async with AsyncFetcher(extractor=extractor, **fetcher_kwargs) as fetcher:
+        url_iter = iter(pending)
+        parser = None
+        if pool is not None:
+            parser = asyncio.ensure_future(
+                _parse_batches(parse_queue, write_queue, fetcher, pool, parse_workers, parse_batch_size, extractor)
+            )
+
+        async def worker():
+            for url in url_iter:
+                if pool is None:
+                    page = await fetcher.fetch_page(url)
+                else:
+                    fetched = await fetcher.fetch_raw(url)
+                    page = None
+                    if fetched is not None and "page" in fetched:
+                        page = fetched["page"]
+                    elif fetched is not None:
+                        await parse_queue.put(fetched["raw"])
+                if progress is not None:
+                    progress.update(1)
+                if page:
+                    # Bloqueia quando a fila está cheia, travando os downloads
+                    await write_queue.put(page)
+
+        try:
+            # Se o escritor ou o parser falharem, os workers não ficam bloqueados à espera de espaço nas filas
+            await _watch(asyncio.gather(*(worker() for _ in range(fetcher.concurrency))), [writer, parser])
+            if parser is not None:
+                await _watch(parse_queue.put(None), [writer, parser])
+                await _watch(parser, [writer])
+        finally:
+            if parser is not None and not parser.done():
+                parser.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await parser
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            if not writer.done():
+                await write_queue.put(None)
+            await writer
+    return stats
@@ -0,0 +1,293 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from ann_index import load_index_config
+from answer_cache import SemanticAnswerCache, astream_with_cache, normalize_question, stream_with_cache
+from context_builder import ContextBuilder, RollingSummary, extractive_summarizer, llm_summarizer
+from embedding_cache import load_embeddings
+from hybrid_retriever import load_retriever
+from index_store import INDEX_DIR, IndexStore, load_records
+from instrumentation import NULL_TRACE, Metrics, Trace, configure_logging, log_trace
+
+# Template do prompt RAG
+RAG_TEMPLATE = """
+És um(a) assistente virtual de um website, com acesso a toda a informação relevante da empresa, incluindo **serviços**, **áreas de atuação** e outros dados essenciais para apoio ao cliente. O teu papel é responder de forma clara, objetiva e profissional, baseando-te sempre no **contexto fornecido**. Segue estas orientações:
+
+1. **Idioma**:  
+   - Responde no mesmo idioma da pergunta.  
+   - Se a pergunta estiver em português, utiliza **Português de Portugal**, evitando o "você", o gerúndio e expressões do português do Brasil.
+
+2. **Saudação**:  
+   - Cumprimenta o utilizador apenas na **primeira interação**, de forma formal e profissional.  
+   - Nas respostas seguintes, evita saudações ou introduções longas e segue diretamente para o conteúdo relevante.
+
+3. **Respostas Concisas**:  
+   - Responde **diretamente ao que foi perguntado**, sem repetir desnecessariamente informações já mencionadas na interação anterior.  
+   - Sempre que necessário, complementa a resposta com informações adicionais relevantes, mas evita copiar e colar trechos extensos de conteúdo de forma repetitiva.  
+
+4. **Restrições**:  
+   - Responde apenas com base no **contexto fornecido**. Se não encontrares a resposta no contexto, indica de forma educada que não dispões dessa informação.  
+
+5. **Estilo**:  
+   - Mantém a resposta objetiva, formal e focada no que o cliente procura.  
+   - Evita repetições desnecessárias de conteúdos ou introduções.  
+
+**Contexto**: {context}  
+
+**Pergunta do cliente**: {question}
+"""
+
+STUB_ANSWER = (
+    "Esta é uma resposta de teste gerada sem modelo de linguagem. "
+    "Serve para medir a latência do serviço sem depender de uma API externa."
+)
+
+
+def load_llm(provider=None):
+    """
+    Cria o modelo de chat indicado por LLM_PROVIDER: "groq" (por omissão), "ollama" ou "stub".
+
+    O "stub" devolve sempre a mesma resposta, carácter a carácter com uma pausa de
+    STUB_LLM_DELAY segundos, para testes e testes de carga sem chamadas externas.
+    """
+    provider = provider or os.getenv("LLM_PROVIDER", "groq")
+    if provider == "groq":
+        from langchain_groq import ChatGroq
+        return ChatGroq(model=os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile"))
+    if provider == "ollama":
+        from langchain_community.chat_models import ChatOllama
+        return ChatOllama(model=os.getenv("OLLAMA_MODEL", "llama3.1:8b"), base_url=os.getenv("OLLAMA_SERVER_URL"))
+    if provider == "stub":
+        from langchain_core.language_models import FakeListChatModel
+        return FakeListChatModel(responses=[STUB_ANSWER], sleep=float(os.getenv("STUB_LLM_DELAY", "0.005")))
+    raise ValueError(f"LLM_PROVIDER desconhecido: {provider}. Opções: groq, ollama, stub")
+
+
+def load_store(csv_path="scraped_data.csv", index_dir=INDEX_DIR):
+    """Carrega o índice FAISS do disco, atualizando-o só com as páginas alteradas no CSV."""
+    # Cria embeddings e vetoriza (backend configurado pelas variáveis EMBEDDING_*)
+    embeddings = load_embeddings()
+    # Tipo de índice (exato ou aproximado) configurado pelas variáveis INDEX_*
+    config, search_params = load_index_config()
+    store = IndexStore(embeddings, index_dir=index_dir, model_name=embeddings.model_name,
+                       index_config=config, search_params=search_params)
+
+    if os.path.exists(csv_path):
+        stats = store.sync(load_records(csv_path))
+        print(f"Índice sincronizado: {stats}")
+        print(f"Cache de embeddings: {embeddings.stats()}")
+    elif not (store.exists() and store.load(mmap=True)):
+        print(f"ERRO: não existe '{csv_path}' nem um índice em '{index_dir}'.")
+        return None
+
+    if store.vectorstore is None:
+        print("Nenhum documento válido para criar embeddings. Verifique o CSV.")
+        return None
+    return store
+
+
+def check_retriever(retriever, user_input, question_vector, trace=NULL_TRACE, debug=False):
+    # 1) Usar os documentos relevantes para a pergunta (pesquisa híbrida; o embedding é calculado uma só vez)
+    with trace.stage("search"):
+        retrieved_docs = retriever.search(user_input, question_vector, trace=trace)
+
+    # 2) Mostrar no console quais documentos foram retornados (só com RAG_DEBUG=1)
+    if debug:
+        print("Documentos retornados pelo retriever:")
+        for i, doc in enumerate(retrieved_docs, start=1):
+            print(f"Doc {i}:")
+            print("---------- page_content ----------")
+            print(doc.page_content[:200], "...")
+            print("---------- metadata --------------")
+            print(doc.metadata)
+            print("----------------------------------\n")
+
+    # Retorna os documentos recuperados
+    return retrieved_docs
+
+
+class SessionStore:
+    """Histórico e resumo de cada sessão de chat, em memória, com limite de sessões e expiração."""
+
+    def __init__(self, max_sessions=10000, ttl=3600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sessions = OrderedDict()  # session_id -> {"messages", "summary", "last_used"}
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.time()
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+            if session is None:
+                session = {"messages": [], "summary": RollingSummary()}
+            session["last_used"] = now
+            self.sessions[session_id] = session
+            # A sessão mais antiga está no início do OrderedDict
+            while self.sessions:
+                oldest = next(iter(self.sessions.values()))
+                if len(self.sessions) <= self.max_sessions and now - oldest["last_used"] <= self.ttl:
+                    break
+                self.sessions.popitem(last=False)
+            return session
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+class RAGPipeline:
+    """
+    Pesquisa, montagem do contexto e geração da resposta, independente da interface.
+
+    O índice, o modelo e os caches são carregados uma vez e partilhados por
+    todas as sessões. Em `astream`, o embedding da pergunta e a pesquisa correm
+    num thread pool (são bloqueantes) e o LLM é chamado com `chain.astream`,
+    por isso muitas sessões podem ser servidas em simultâneo.
+    """
+
+    def __init__(self, store, llm, retriever=None, answer_cache=None, context_builder=None, sessions=None,
+                 workers=None, metrics=None, debug=False):
+        self.store = store
+        self.retriever = retriever or (load_retriever(store) if store else None)
+        self.answer_cache = answer_cache or SemanticAnswerCache()
+        self.context_builder = context_builder or ContextBuilder()
+        self.sessions = sessions or SessionStore()
+        self.metrics = metrics or Metrics()
+        self.debug = debug
+        self.prompt = ChatPromptTemplate.from_template(RAG_TEMPLATE)
+        # O dicionário {"context", "question"} vai diretamente para o prompt
+        self.chain = self.prompt | llm
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4))
+
+    def prepare(self, question, session, trace):
+        """Pesquisa os documentos e monta o contexto (bloqueante). Devolve os dados do pedido."""
+        trace.mark("queue_wait")  # Tempo à espera de uma thread livre
+        session["messages"].append({"role": "user", "content": question})
+        if not self.store:
+            # Se não temos índice, não conseguimos RAG
+            context = "Sem documentos para contexto."
+            return {"inputs": {"context": context, "question": question}}
+
+        with trace.stage("embed_query"):
+            question_vector = self.store.embeddings.embed_query(normalize_question(question))
+        retrieved_docs = check_retriever(self.retriever, question, question_vector, trace, self.debug)
+        with trace.stage("context"):
+            context, token_counts = self.context_builder.build(retrieved_docs, session["messages"], session["summary"])
+        trace.counts.update(token_counts)
+
+        # Perguntas repetidas com os mesmos documentos reutilizam a resposta guardada
+        self.answer_cache.check_index(self.store.fingerprint)
+        return {
+            "inputs": {"context": context, "question": question},
+            "question_vector": question_vector,
+            "doc_ids": [doc.metadata.get("chunk_id", "") for doc in retrieved_docs],
+        }
+
+    def finish(self, session, request, answer, trace, status="ok"):
+        """
+        Guarda a resposta no histórico e regista as métricas do pedido.
+
+        Num pedido interrompido (`status` "disconnected" ou "error"), a resposta
+        parcial fica no histórico; se não houver nenhuma, a pergunta é retirada,
+        para a sessão não ficar com uma pergunta sem resposta.
+        """
+        if answer or status == "ok":
+            session["messages"].append({"role": "assistant", "content": answer})
+        elif session["messages"] and session["messages"][-1]["role"] == "user":
+            session["messages"].pop()
+        trace.attributes["status"] = status
+        if request is not None:
+            trace.counts["prompt_tokens"] = self.context_builder.count(self.prompt.format(**request["inputs"]))
+        trace.counts["answer_tokens"] = self.context_builder.count(answer)
+        trace.mark("total")
+        self.metrics.observe(trace)
+        log_trace(trace)
+        if self.debug:
+            stages = ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in trace.stages.items())
+            print(f"Pedido {trace.request_id} ({status}): {stages}; tokens {trace.counts}")
+
+    def _chunks(self, request, trace, asynchronous):
+        """Pedaços da resposta: do cache de respostas ou do LLM (`chain.stream`/`chain.astream`)."""
+        if "question_vector" not in request:
+            return self.chain.astream(request["inputs"]) if asynchronous else self.chain.stream(request["inputs"])
+        stream = astream_with_cache if asynchronous else stream_with_cache
+        return stream(self.answer_cache, self.chain, request["inputs"], request["question_vector"],
+                      request["doc_ids"], info=trace.attributes)
+
+    def stream(self, question, session_id, trace=None):
+        """Gera a resposta em pedaços de texto (versão síncrona)."""
+        trace = trace or Trace(session_id)
+        session = self.sessions.get(session_id)
+        request, parts, status = None, [], "disconnected"
+        try:
+            request = self.prepare(question, session, trace)
+            for chunk in self._chunks(request, trace, asynchronous=False):
+                if not parts:
+                    trace.mark("ttft")
+                    first_token = time.perf_counter()
+                parts.append(str(chunk.content))
+                yield parts[-1]
+            status = "ok"
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            # Também corre se o cliente se desligar (GeneratorExit) ou o LLM falhar
+            if parts:
+                trace.stages["generation"] = time.perf_counter() - first_token
+            self.finish(session, request, "".join(parts), trace, status)
+
+    async def astream(self, question, session_id, trace=None):
+        """Gera a resposta em pedaços de texto, sem bloquear o event loop."""
+        trace = trace or Trace(session_id)
+        loop = asyncio.get_running_loop()
+        session = self.sessions.get(session_id)
+        request, parts, status = None, [], "disconnected"
+        try:
+            request = await loop.run_in_executor(self.executor, self.prepare, question, session, trace)
+            async for chunk in self._chunks(request, trace, asynchronous=True):
+                if not parts:
+                    trace.mark("ttft")
+                    first_token = time.perf_counter()
+                parts.append(str(chunk.content))
+                yield parts[-1]
+            status = "ok"
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            if parts:
+                trace.stages["generation"] = time.perf_counter() - first_token
+            if status == "ok":
+                await loop.run_in_executor(self.executor, self.finish, session, request, "".join(parts), trace)
+            else:
+                # Cliente desligado (pedido cancelado) ou erro: sem esperar pelo executor
+                self.finish(session, request, "".join(parts), trace, status)
+
+
+def load_pipeline(csv_path="scraped_data.csv", index_dir=INDEX_DIR, llm=None):
+    """Cria o pipeline a partir do CSV/índice e das variáveis de ambiente (ver env_example)."""
+    llm = llm or load_llm()
+    store = load_store(csv_path, index_dir)
+    answer_cache = SemanticAnswerCache(
+        threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+        ttl=int(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600))),
+        max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+    )
+    # Contexto limitado por um orçamento de tokens (ver context_builder.py)
+    context_builder = ContextBuilder(
+        budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000")),
+        recent_messages=int(os.getenv("CONTEXT_RECENT_MESSAGES", "4")),
+        summarize=llm_summarizer(llm) if os.getenv("CONTEXT_SUMMARY") == "llm" else extractive_summarizer,
+    )
+    # Um JSON por pedido (tempos por etapa e tokens) em TRACE_LOG, ou no stderr
+    configure_logging(os.getenv("TRACE_LOG") or None)
+    workers = os.getenv("RAG_WORKERS")
+    return RAGPipeline(store, llm, answer_cache=answer_cache, context_builder=context_builder,
+                       workers=int(workers) if workers else None, debug=os.getenv("RAG_DEBUG") == "1")
@@ -1,70 +1,83 @@
+import argparse
+import asyncio
 import json
 import os
-import requests
-from bs4 import BeautifulSoup
-import csv
-from concurrent.futures import ThreadPoolExecutor
+import time
 from tqdm import tqdm
 from dotenv import load_dotenv
-load_dotenv(override=True)
-# Carregar o JSON com os links extraídos
-with open("output.json", "r") as f:
-    data = json.load(f)
 
-# Extraindo links únicos e filtrar apenas os do domínio desejado
-base_url = os.getenv('URL_SCRAPING')
-links = set()  # Usar um set para evitar duplicados
-for entry in data:
-    for link in entry["links"]:
-        print(link)
-        if link.startswith(base_url):  # Filtrar links do domínio desejado
-            links.add(link)
+from crawl_state import CRAWL_STATE_PATH, CrawlState
+from extraction import EXTRACTORS
+from memory_usage import peak_memory_mb
+from pipeline import stream_to_csv
 
-print(f"Total de links únicos para processar: {len(links)}")
 
-# Função para processar cada URL
-def fetch_url(url, retries=3):
-    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
-    for _ in range(retries):
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, "html.parser")
-                
-                # Extrair título
-                title = soup.title.string.strip() if soup.title else "Sem título"
-                
-                # Extrair conteúdo da página
-                content = soup.get_text(separator=" ").strip()
-                content = " ".join(content.split())[:5000]  # Limitar para 5000 caracteres
-                
-                # Extrair links (href)
-                page_links = [a.get('href') for a in soup.find_all('a', href=True)]
-                page_links = list(set(page_links))  # Remover duplicados
-                
-                return {
-                    "url": url,
-                    "title": title,
-                    "content": content,
-                    "links": "; ".join(page_links)  # Concatenar links com separador
-                }
-        except Exception as e:
-            with open("errors.log", "a", encoding="utf-8") as error_log:
-                error_log.write(f"Erro ao processar {url}: {e}\n")
-    return None
+def load_links(output_path, base_url):
+    """Lê o JSON com os links extraídos e devolve os links únicos do domínio desejado."""
+    with open(output_path, "r") as f:
+        data = json.load(f)
 
-# Processar URLs em paralelo usando ThreadPoolExecutor
-scraped_data = []
-with ThreadPoolExecutor(max_workers=10) as executor:
-    results = list(tqdm(executor.map(fetch_url, links), total=len(links)))
-    scraped_data = [result for result in results if result]  # Filtrar resultados válidos
+    links = set()  # Usar um set para evitar duplicados
+    for entry in data:
+        for link in entry["links"]:
+            if link.startswith(base_url):  # Filtrar links do domínio desejado
+                links.add(link)
+    return links
 
-# Guardar os dados extraídos em um arquivo CSV
-with open("scraped_data.csv", "w", newline="", encoding="utf-8") as csvfile:
-    fieldnames = ["url", "title", "content", "links"]
-    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-    
-    writer.writeheader()
-    writer.writerows(scraped_data)
 
-print("Dados salvos em scraped_data.csv")
+def main():
+    load_dotenv(override=True)
+
+    parser = argparse.ArgumentParser(description="Descarrega e processa as páginas encontradas pelo crawling.py.")
+    parser.add_argument("--input", default="output.json", help="JSON com os links extraídos")
+    parser.add_argument("--output", default="scraped_data.csv", help="CSV de saída")
+    parser.add_argument("--concurrency", "--fetch-workers", type=int, default=50, help="Máximo de downloads simultâneos")
+    parser.add_argument("--per-host", type=int, default=10, help="Máximo de pedidos simultâneos por host")
+    parser.add_argument("--rate", type=float, default=None, help="Máximo de pedidos por segundo por host")
+    parser.add_argument("--retries", type=int, default=3, help="Número de tentativas por URL (pelo menos 1)")
+    parser.add_argument("--state", default=CRAWL_STATE_PATH, help="Base SQLite com o estado do crawl anterior")
+    parser.add_argument("--full", action="store_true", help="Ignora o estado guardado e volta a processar tudo")
+    parser.add_argument("--resume", action="store_true", help="Retoma um crawl interrompido a partir das linhas já escritas no CSV")
+    parser.add_argument("--queue-size", type=int, default=100, help="Máximo de páginas em memória à espera de escrita")
+    parser.add_argument("--extractor", default="auto", choices=["auto", *EXTRACTORS],
+                        help="Backend de extração do HTML (auto escolhe o mais rápido instalado)")
+    parser.add_argument("--parse-workers", type=int, default=0,
+                        help="Processos dedicados ao processamento do HTML (por omissão 0 = no processo principal; "
+                             "só compensa com várias CPUs e páginas pesadas, ver benchmarks/bench_pipeline.py)")
+    parser.add_argument("--parse-batch-size", type=int, default=16, help="Páginas enviadas a cada processo de uma vez")
+    args = parser.parse_args()
+
+    # Extraindo links únicos e filtrar apenas os do domínio desejado
+    base_url = os.getenv('URL_SCRAPING')
+    links = load_links(args.input, base_url)
+    print(f"Total de links únicos para processar: {len(links)}")
+
+    # Com --full o estado é reconstruído: pedidos sem cabeçalhos condicionais
+    state = CrawlState(args.state)
+    if args.full:
+        state.clear()
+
+    # Descarregar as páginas com o motor assíncrono e escrevê-las no CSV à medida que chegam
+    start = time.perf_counter()
+    try:
+        with tqdm(total=len(links)) as progress:
+            stats = asyncio.run(stream_to_csv(
+                links, args.output, resume=args.resume, queue_size=args.queue_size, progress=progress,
+                parse_workers=args.parse_workers, parse_batch_size=args.parse_batch_size,
+                concurrency=args.concurrency, per_host=args.per_host,
+                rate_per_host=args.rate, retries=args.retries, state=state, extractor=args.extractor,
+            ))
+    finally:
+        state.close()
+    elapsed = time.perf_counter() - start
+
+    if stats["skipped"]:
+        print(f"Páginas já existentes no CSV (retomadas): {stats['skipped']}")
+    print(f"Páginas alteradas: {stats['changed']}, sem alterações: {stats['written'] - stats['changed']}")
+    peak = peak_memory_mb()
+    print(f"Tempo total: {elapsed:.1f}s, pico de memória: {f'{peak:.1f} MB' if peak is not None else 'n/d'}")
+    print(f"Dados salvos em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import heapq
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+
+SPARSE_FILE = "bm25.json"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Palavras em minúsculas e sem acentos, para que "serviços" e "servicos" coincidam."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _TOKEN_RE.findall(text)
+
+
+class BM25Index:
+    """
+    Índice invertido (BM25) dos chunks, guardado ao lado do índice FAISS.
+
+    Usa os mesmos IDs dos chunks (`chunk_id`) que o FAISS, por isso os
+    resultados de ambos podem ser combinados diretamente. Suporta inserções e
+    remoções incrementais, como o `IndexStore`.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # termo -> {chunk_id: frequência}
+        self.lengths = {}  # chunk_id -> número de termos
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, chunk_id, text):
+        if chunk_id in self.lengths:
+            self.delete([chunk_id])
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[chunk_id] = tf
+        length = sum(counts.values())
+        self.lengths[chunk_id] = length
+        self.total_length += length
+
+    def add_documents(self, documents):
+        for doc in documents:
+            self.add(doc.metadata["chunk_id"], doc.page_content)
+
+    def delete(self, chunk_ids):
+        chunk_ids = {chunk_id for chunk_id in chunk_ids if chunk_id in self.lengths}
+        if not chunk_ids:
+            return
+        # Percorrer os termos é mais barato do que guardar a lista de termos de cada chunk
+        for term in list(self.postings):
+            docs = self.postings[term]
+            for chunk_id in chunk_ids & docs.keys():
+                del docs[chunk_id]
+            if not docs:
+                del self.postings[term]
+        for chunk_id in chunk_ids:
+            self.total_length -= self.lengths.pop(chunk_id)
+
+    def search(self, query, k=20):
+        """Devolve os `k` melhores resultados como [(chunk_id, pontuação)]."""
+        n = len(self.lengths)
+        if not n:
+            return []
+        avg_length = self.total_length / n
+        scores = Counter()
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for chunk_id, tf in docs.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[chunk_id] / avg_length)
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def save(self, index_dir):
+        path = os.path.join(index_dir, SPARSE_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "lengths": self.lengths, "postings": self.postings},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, index_dir):
+        """Carrega o índice de `index_dir`, ou devolve None se ainda não existir."""
+        path = os.path.join(index_dir, SPARSE_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.postings = data["postings"]
+        index.lengths = data["lengths"]
+        index.total_length = sum(index.lengths.values())
+        return index
@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+import tiktoken
+
+# Os módulos do projeto são scripts na pasta acima, não um pacote
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture
+def byte_encoding(monkeypatch):
+    """Codificação do tiktoken byte a byte, para contar tokens sem descarregar o cl100k_base."""
+    import context_builder
+
+    encoding = tiktoken.Encoding("bytes", pat_str=r"\S+|\s+", mergeable_ranks={bytes([i]): i for i in range(256)},
+                                 special_tokens={})
+    monkeypatch.setattr(context_builder, "get_encoding", lambda name=None: encoding)
+    return encoding
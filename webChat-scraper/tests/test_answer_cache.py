@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+
+from answer_cache import SemanticAnswerCache, astream_with_cache, normalize_question, stream_with_cache
+
+ANSWER = "O horário de atendimento é das 9h às 18h."
+DOC_IDS = ["abc-0", "abc-1"]
+
+
+@pytest.fixture
+def embeddings():
+    return DeterministicFakeEmbedding(size=32)
+
+
+@pytest.fixture
+def llm():
+    return FakeListChatModel(responses=[ANSWER, "Outra resposta."])
+
+
+def ask(cache, llm, embeddings, question, doc_ids=DOC_IDS):
+    """Faz uma pergunta através do cache; devolve (resposta, info)."""
+    info = {}
+    vector = embeddings.embed_query(normalize_question(question))
+    chunks = stream_with_cache(cache, llm, question, vector, doc_ids, info=info)
+    return "".join(str(chunk.content) for chunk in chunks), info
+
+
+def test_miss_streams_from_model_and_stores(llm, embeddings):
+    cache = SemanticAnswerCache()
+    answer, info = ask(cache, llm, embeddings, "Qual é o horário?")
+    assert answer == ANSWER
+    assert info["cache_hit"] is False
+    assert llm.i == 1
+    assert cache.stats() == {"hits": 0, "misses": 1, "hit_rate": 0.0, "entries": 1}
+
+
+def test_near_duplicate_with_same_docs_replays_without_model(llm, embeddings):
+    cache = SemanticAnswerCache()
+    ask(cache, llm, embeddings, "Qual é o horário?")
+    answer, info = ask(cache, llm, embeddings, "  qual é o   HORÁRIO ")
+    assert answer == ANSWER
+    assert info["cache_hit"] is True
+    # O modelo só foi chamado na primeira pergunta
+    assert llm.i == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_different_doc_ids_miss(llm, embeddings):
+    cache = SemanticAnswerCache()
+    ask(cache, llm, embeddings, "Qual é o horário?")
+    answer, info = ask(cache, llm, embeddings, "Qual é o horário?", doc_ids=["xyz-0"])
+    assert answer == "Outra resposta."
+    assert info["cache_hit"] is False
+    assert cache.stats()["entries"] == 2
+
+
+def test_doc_ids_order_does_not_matter(llm, embeddings):
+    cache = SemanticAnswerCache()
+    ask(cache, llm, embeddings, "Qual é o horário?")
+    _, info = ask(cache, llm, embeddings, "Qual é o horário?", doc_ids=list(reversed(DOC_IDS)))
+    assert info["cache_hit"] is True
+
+
+def test_new_index_fingerprint_invalidates_cache(llm, embeddings):
+    cache = SemanticAnswerCache()
+    cache.check_index("indice-1")
+    ask(cache, llm, embeddings, "Qual é o horário?")
+    cache.check_index("indice-1")
+    assert cache.stats()["entries"] == 1
+
+    cache.check_index("indice-2")
+    assert cache.stats()["entries"] == 0
+    _, info = ask(cache, llm, embeddings, "Qual é o horário?")
+    assert info["cache_hit"] is False
+    assert llm.i == 0  # Voltou a chamar o modelo (segunda resposta da lista)
+
+
+def test_expired_entries_miss(llm, embeddings):
+    cache = SemanticAnswerCache(ttl=0)
+    ask(cache, llm, embeddings, "Qual é o horário?")
+    _, info = ask(cache, llm, embeddings, "Qual é o horário?")
+    assert info["cache_hit"] is False
+
+
+def test_astream_with_cache_replays(llm, embeddings):
+    cache = SemanticAnswerCache()
+    vector = embeddings.embed_query(normalize_question("Qual é o horário?"))
+
+    async def collect(info):
+        chunks = astream_with_cache(cache, llm, "Qual é o horário?", vector, DOC_IDS, info=info)
+        return "".join([str(chunk.content) async for chunk in chunks])
+
+    first, second = {}, {}
+    assert asyncio.run(collect(first)) == ANSWER
+    assert asyncio.run(collect(second)) == ANSWER
+    assert (first["cache_hit"], second["cache_hit"]) == (False, True)
+    assert llm.i == 1
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListChatModel
+from starlette.testclient import TestClient
+
+from api import create_app
+from index_store import IndexStore
+from rag_pipeline import RAGPipeline
+
+ANSWER = "A empresa presta serviços de consultoria e desenvolvimento de software."
+RECORDS = [
+    {"url": "https://exemplo.pt/servicos", "title": "Serviços",
+     "content": "Consultoria em tecnologia e desenvolvimento de software à medida."},
+    {"url": "https://exemplo.pt/contactos", "title": "Contactos",
+     "content": "O horário de atendimento é das 9h às 18h, de segunda a sexta."},
+]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.delenv("RERANK_MODEL", raising=False)
+    store = IndexStore(DeterministicFakeEmbedding(size=32), index_dir=tmp_path / "index", model_name="fake")
+    store.sync(RECORDS)
+    return store
+
+
+@pytest.fixture
+def stub_llm():
+    return FakeListChatModel(responses=[ANSWER, "Segunda resposta."])
+
+
+@pytest.fixture
+def pipeline(store, stub_llm, byte_encoding):
+    return RAGPipeline(store, stub_llm)
+
+
+@pytest.fixture
+def client(pipeline):
+    with TestClient(create_app(pipeline=pipeline)) as client:
+        yield client
+
+
+def test_chat_streams_answer(client, stub_llm):
+    with client.stream("POST", "/chat", json={"question": "Que serviços prestam?", "session_id": "s1"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert response.headers["x-session-id"] == "s1"
+        chunks = list(response.iter_text())
+    assert "".join(chunks) == ANSWER
+    assert stub_llm.i == 1
+
+
+def test_astream_yields_answer_in_chunks(pipeline):
+    # O TestClient junta o corpo todo; os pedaços são verificados no gerador que o /chat devolve
+    async def collect():
+        return [chunk async for chunk in pipeline.astream("Que serviços prestam?", "s1")]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) > 1
+    assert "".join(chunks) == ANSWER
+    assert [msg["role"] for msg in pipeline.sessions.get("s1")["messages"]] == ["user", "assistant"]
+
+
+def test_chat_creates_session_id(client):
+    response = client.post("/chat", json={"question": "Que serviços prestam?"})
+    assert response.status_code == 200
+    assert response.headers["x-session-id"]
+
+
+def test_repeated_question_served_from_answer_cache(client, pipeline, stub_llm):
+    first = client.post("/chat", json={"question": "Qual é o horário?", "session_id": "a"})
+    second = client.post("/chat", json={"question": "qual é o horário", "session_id": "b"})
+    assert first.text == second.text == ANSWER
+    # O modelo só respondeu à primeira pergunta
+    assert stub_llm.i == 1
+    assert pipeline.answer_cache.stats()["hits"] == 1
+
+
+def test_health_stats_and_metrics(client):
+    assert client.get("/health").json() == {"status": "ok", "index_loaded": True}
+    client.post("/chat", json={"question": "Que serviços prestam?", "session_id": "s1"})
+
+    stats = client.get("/stats").json()
+    assert stats["sessions"] == 1
+    assert stats["answer_cache"]["misses"] == 1
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert "rag_requests_total 1" in metrics.text
+    assert 'rag_stage_seconds_count{stage="ttft"} 1' in metrics.text
+
+
+@pytest.mark.parametrize("body", ["não é JSON", "[1, 2]", '"hi"', "{}", '{"question": "   "}'])
+def test_invalid_input_returns_400(client, body):
+    response = client.post("/chat", content=body, headers={"content-type": "application/json"})
+    assert response.status_code == 400
+    assert "error" in response.json()
+
+
+def test_disconnect_keeps_partial_answer(pipeline):
+    stream = pipeline.stream("Que serviços prestam?", "s1")
+    partial = next(stream) + next(stream)
+    stream.close()
+    messages = pipeline.sessions.get("s1")["messages"]
+    assert [msg["role"] for msg in messages] == ["user", "assistant"]
+    assert messages[-1]["content"] == partial
+    assert pipeline.metrics.counters["requests_disconnected_total"] == 1
+
+
+def test_llm_error_removes_unanswered_question(store, byte_encoding):
+    pipeline = RAGPipeline(store, FakeListChatModel(responses=[ANSWER], error_on_chunk_number=0))
+    with pytest.raises(Exception):
+        list(pipeline.stream("Que serviços prestam?", "s1"))
+    assert pipeline.sessions.get("s1")["messages"] == []
+    assert pipeline.metrics.counters["requests_error_total"] == 1
+    assert pipeline.metrics.counters["requests_total"] == 1
@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from embedding_cache import CachedEmbeddings
+
+SIZE = 16
+VECTOR_BYTES = SIZE * 4
+
+
+def table_bytes(cache):
+    return cache._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+
+
+def test_running_total_matches_table(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = CachedEmbeddings(DeterministicFakeEmbedding(size=SIZE), "fake", path=path, max_bytes=10 * VECTOR_BYTES)
+    cache.embed_documents([f"texto {i}" for i in range(6)])
+    assert cache.stats()["bytes"] == table_bytes(cache) == 6 * VECTOR_BYTES
+
+    # Passa o limite: as entradas mais antigas saem até ficar em 90% dele
+    cache.embed_documents([f"outro {i}" for i in range(6)])
+    assert cache.stats()["bytes"] == table_bytes(cache) <= 9 * VECTOR_BYTES
+    assert cache.stats()["misses"] == 12
+
+    # Ao abrir de novo, o total é lido do ficheiro
+    assert CachedEmbeddings(DeterministicFakeEmbedding(size=SIZE), "fake", path=path).stats()["bytes"] == \
+        table_bytes(cache)
+
+
+def test_counters_from_several_threads(tmp_path):
+    cache = CachedEmbeddings(DeterministicFakeEmbedding(size=SIZE), "fake", path=tmp_path / "cache.sqlite")
+    texts = [f"texto {i}" for i in range(20)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(cache.embed_documents, [texts] * 40))
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 20 * 40
+    assert stats["entries"] == 20
+    assert stats["bytes"] == table_bytes(cache) == 20 * VECTOR_BYTES
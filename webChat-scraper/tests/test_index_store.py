@@ -0,0 +1,34 @@
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from ann_index import MIN_VECTORS
+from index_store import IndexStore
+
+
+@pytest.fixture
+def hnsw_store(tmp_path):
+    """Índice HNSW com páginas suficientes para não cair no índice exato."""
+    store = IndexStore(DeterministicFakeEmbedding(size=16), index_dir=tmp_path,
+                       index_config={"type": "hnsw", "hnsw_m": 16})
+    records = [{"url": f"https://exemplo.pt/{i}", "title": f"Página {i}", "content": f"conteúdo da página {i}"}
+               for i in range(MIN_VECTORS["hnsw"] + 50)]
+    store.upsert(records)
+    # O HNSW só é construído ao gravar
+    store.save()
+    return store
+
+
+def urls(docs):
+    return [doc.metadata["url"] for doc in docs]
+
+
+def test_retriever_skips_deleted_chunks(hnsw_store):
+    target = "https://exemplo.pt/7"
+    query = hnsw_store.get_documents(hnsw_store.pages[target]["ids"])[0].page_content
+    retriever = hnsw_store.as_retriever(search_kwargs={"k": 3})
+    assert urls(retriever.invoke(query))[0] == target
+
+    hnsw_store.delete([target])
+    assert hnsw_store.tombstones
+    assert target not in urls(retriever.invoke(query))
+    assert len(retriever.invoke(query)) == 3